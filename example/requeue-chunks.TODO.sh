@@ -1,5 +1,7 @@
 #!/bin/bash
 # Requeue chunks
+# WARNING: release all locked chunks, even those of running transactions,
+# prefer "replctl queue requeue" which only releases chunks of aborted ones
 
 set -euxo pipefail
 
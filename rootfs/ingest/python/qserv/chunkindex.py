@@ -0,0 +1,227 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Read the chunk index files written by the Qserv partitioner, i.e.
+``chunk_index.bin``.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import bisect
+import logging
+import mmap
+import sys
+import urllib.parse
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+import requests
+
+from . import util
+from .exception import IngestError
+from .httpcache import HttpCache
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+# Each entry of the index is made of three little-endian unsigned 64 bits
+# integers: (chunk_id << 32 | subchunk_id), rows count, overlap rows count
+_ENTRY_WORDS = 3
+_WORD_TYPECODE = "Q"
+_ENTRY_SIZE = _ENTRY_WORDS * array(_WORD_TYPECODE).itemsize
+
+_CHUNK_ID_TYPECODE = "I"
+
+
+@dataclass(frozen=True)
+class ChunkCount:
+    """Number of rows of a chunk, as counted by the partitioner."""
+
+    chunk_id: int
+    """ Chunk id """
+
+    rows: int
+    """ Number of rows in the chunk file """
+
+    overlap_rows: int
+    """ Number of rows in the overlap file of the chunk """
+
+
+class ChunkIndex:
+    """Rows counts of each chunk of a table, read from a partitioner chunk
+    index.
+
+    The partitioner writes an entry for each sub-chunk, entries are summed up
+    by chunk. The index is decoded without per-entry unpacking, by casting its
+    content to an array of 64 bits integers and reading entry fields with
+    strided views.
+
+    Parameters
+    ----------
+    data : `bytes`, `mmap.mmap`
+        Content of a chunk index file
+
+    Raises
+    ------
+    IngestError
+        Raised if the data size is not a multiple of the entry size
+
+    """
+
+    def __init__(self, data: Union[bytes, mmap.mmap]):
+        if len(data) % _ENTRY_SIZE != 0:
+            raise IngestError("Invalid chunk index size", len(data))
+        words: Sequence[int]
+        if sys.byteorder == "little":
+            words = memoryview(data).cast("Q")
+        else:
+            words = array(_WORD_TYPECODE, data)
+            words.byteswap()
+        keys = words[0::_ENTRY_WORDS]
+        rows = words[1::_ENTRY_WORDS]
+        overlap_rows = words[2::_ENTRY_WORDS]
+
+        counts: Dict[int, List[int]] = {}
+        for key, n, n_overlap in zip(keys, rows, overlap_rows):
+            count = counts.setdefault(key >> 32, [0, 0])
+            count[0] += n
+            count[1] += n_overlap
+        if isinstance(words, memoryview):
+            words.release()
+
+        self._chunk_ids = array(_CHUNK_ID_TYPECODE, sorted(counts))
+        self._rows = array(_WORD_TYPECODE, (counts[c][0] for c in self._chunk_ids))
+        self._overlap_rows = array(_WORD_TYPECODE, (counts[c][1] for c in self._chunk_ids))
+
+    @classmethod
+    def read(cls, path: str) -> "ChunkIndex":
+        """Read a local chunk index file, which is memory-mapped.
+
+        Parameters
+        ----------
+        path : `str`
+            Path to the chunk index file
+
+        Returns
+        -------
+        chunk_index : `ChunkIndex`
+            Rows counts of each chunk
+
+        """
+        with open(path, "rb") as f:
+            # Empty files can not be mapped
+            if f.seek(0, 2) == 0:
+                return cls(b"")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return cls(mm)
+
+    def __len__(self) -> int:
+        return len(self._chunk_ids)
+
+    def __iter__(self) -> Iterator[ChunkCount]:
+        for chunk_id, rows, overlap_rows in zip(self._chunk_ids, self._rows, self._overlap_rows):
+            yield ChunkCount(chunk_id, rows, overlap_rows)
+
+    def _find(self, chunk_id: int) -> Optional[int]:
+        i = bisect.bisect_left(self._chunk_ids, chunk_id)
+        if i < len(self._chunk_ids) and self._chunk_ids[i] == chunk_id:
+            return i
+        return None
+
+    def rows(self, chunk_id: int) -> int:
+        """Return the number of rows of a chunk, 0 if it is not indexed."""
+        i = self._find(chunk_id)
+        return 0 if i is None else self._rows[i]
+
+    def overlap_rows(self, chunk_id: int) -> int:
+        """Return the number of overlap rows of a chunk, 0 if it is not
+        indexed."""
+        i = self._find(chunk_id)
+        return 0 if i is None else self._overlap_rows[i]
+
+    @property
+    def chunk_ids(self) -> Sequence[int]:
+        """Ids of the chunks which have a chunk file, i.e. at least one row"""
+        return array(_CHUNK_ID_TYPECODE, (c for c, n in zip(self._chunk_ids, self._rows) if n > 0))
+
+    @property
+    def overlap_chunk_ids(self) -> Sequence[int]:
+        """Ids of the chunks which have an overlap file, i.e. at least one
+        overlap row"""
+        return array(_CHUNK_ID_TYPECODE, (c for c, n in zip(self._chunk_ids, self._overlap_rows) if n > 0))
+
+    @property
+    def total_rows(self) -> int:
+        """Number of rows in all chunk files"""
+        return sum(self._rows)
+
+    @property
+    def total_overlap_rows(self) -> int:
+        """Number of rows in all overlap files"""
+        return sum(self._overlap_rows)
+
+
+def load_chunk_index(base_url: str, filename: str, cache: Optional[HttpCache] = None) -> ChunkIndex:
+    """Load a chunk index file located at a given URL.
+
+    Parameters
+    ----------
+    base_url: `str`
+        Chunk index file location
+    filename: `str`
+        Chunk index file name
+    cache: `HttpCache`, optional
+        Cache for files served over http(s)
+
+    Returns
+    -------
+    chunk_index : `ChunkIndex`
+        Rows counts of each chunk
+
+    Raises
+    ------
+    IngestError:
+        Raise is URI scheme is not in http://, https://, file://
+
+    """
+    str_url = urllib.parse.urljoin(util.trailing_slash(base_url), filename)
+    url = urllib.parse.urlsplit(str_url, scheme="file")
+    _LOG.debug("Load chunk index %s", str_url)
+    if url.scheme in ["http", "https"]:
+        if cache is not None:
+            return ChunkIndex(cache.get(str_url))
+        r = requests.get(str_url)
+        r.raise_for_status()
+        return ChunkIndex(r.content)
+    elif url.scheme == "file":
+        return ChunkIndex.read(url.path)
+    else:
+        raise IngestError("Unsupported URI scheme for ", url)
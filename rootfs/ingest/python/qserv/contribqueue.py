@@ -29,25 +29,33 @@ on the client side.
 # -------------------------------
 #  Imports of standard modules --
 # -------------------------------
+import csv
 import datetime
+import gzip
 import logging
+import math
 import socket
 import time
 import typing
+from dataclasses import dataclass
 
-import sqlalchemy
-from sqlalchemy import MetaData, Table, event, update
-from sqlalchemy.engine.url import make_url
-from sqlalchemy.exc import OperationalError, PendingRollbackError
+from sqlalchemy import bindparam, case, event, or_, update
+from sqlalchemy.exc import IntegrityError, OperationalError, PendingRollbackError
 from sqlalchemy.sql import func, select
 
-from . import util
 
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
+from .contribution import Contribution
 from .exception import QueueError
+from .filesplit import FileSplitter, split_range_filepath
+from .ingestconfig import QueuePoolConfig
 from .metadata import ContributionMetadata
+from .preflight import FileCheck
+from .queuebackend import new_backend
+from .queuemetrics import QueueMetrics, StatementKind
+from .retrypolicy import RetryPolicy, classify_error
 
 # ---------------------------------
 # Local non-exported definitions --
@@ -57,53 +65,346 @@ _LOG = logging.getLogger(__name__)
 
 _MAX_RETRY_ATTEMPTS = 100
 
+# Statement kinds whose retries are not limited by the error class
+_UNBOUNDED_RETRY_KINDS = (StatementKind.LOCK, StatementKind.UNLOCK)
+
+_T = typing.TypeVar("_T")
+
+# Time window, in seconds, used to measure ingest throughput of all pods
+_THROUGHPUT_WINDOW_SEC = 600
+
+# Weight of the latest transaction in the pod throughput moving average
+_THROUGHPUT_SMOOTHING = 0.5
+
+# Time, in seconds, during which ingest throughput of all pods is reused
+# to size batches, instead of being computed again over the whole queue
+_THROUGHPUT_CACHE_SEC = 10
+
+# Number of rows fetched or inserted at once during queue export or import
+_SNAPSHOT_BATCH_SIZE = 10000
+
+# Representation of NULL in queue snapshot files, same as "mysql --batch"
+_SNAPSHOT_NULL = "\\N"
+
+# Columns of the contribution queue which record timing and outcome
+# of each contribution, for post-run analytics
+_STATS_COLUMNS = {"attempts", "lock_time", "start_time", "end_time", "transaction_id", "worker", "error"}
+
 # remove pylint message for sqlalchemy.Table().insert() method
 # see https://github.com/sqlalchemy/sqlalchemy/issues/4656
 # noqa pylint: disable=E1120
 # noqa pylint: disable=no-value-for-parameter
 
 
+_ContribFileKey = typing.Tuple[str, str, typing.Optional[bool]]
+
+
+def _contribfile_key(table: str, filepath: str, is_overlap: typing.Optional[bool]) -> _ContribFileKey:
+    """Key identifying a contribution file inside the queue of a
+    database."""
+    if is_overlap is not None:
+        is_overlap = bool(is_overlap)
+    return (table, filepath, is_overlap)
+
+
+@dataclass
+class ContribFilesDiff:
+    """Difference between contribution files specified in metadata and
+    contribution files in queue, for a table.
+    """
+
+    added: int = 0
+    """ Contribution files specified in metadata and added to queue, split
+    files count for their number of byte ranges """
+
+    queued: int = 0
+    """ Contribution files already in queue and not ingested """
+
+    succeed: int = 0
+    """ Contribution files already in queue and successfully ingested """
+
+    obsolete: int = 0
+    """ Contribution files in queue but not specified in metadata """
+
+
+@dataclass
+class RequeueFilter:
+    """Criteria selecting locked contribution files to release in queue.
+    Unset criteria match all contribution files.
+    """
+
+    tables: typing.Optional[typing.List[str]] = None
+    """ Tables of the contribution files """
+
+    chunk_min: typing.Optional[int] = None
+    """ Lowest chunk id of the contribution files """
+
+    chunk_max: typing.Optional[int] = None
+    """ Highest chunk id of the contribution files """
+
+    pod: typing.Optional[str] = None
+    """ Pod which has locked the contribution files """
+
+    error: typing.Optional[str] = None
+    """ Substring of the latest ingest error of the contribution files """
+
+    lock_age: typing.Optional[float] = None
+    """ Minimal time, in seconds, since the contribution files were locked """
+
+
 class QueueManager:
     """Class implementing contributions queue manager for Qserv ingest
     process.
+
+    The queue is hosted by a MariaDB server or by an embedded SQLite file,
+    depending on the scheme of the connection URL.
     """
 
     current_table: typing.Optional[str]
 
-    def __init__(self, connection_url: str, contribution_metadata: ContributionMetadata):
+    def __init__(
+        self,
+        connection_url: str,
+        contribution_metadata: ContributionMetadata,
+        retry_policy: typing.Optional[RetryPolicy] = None,
+        pool_config: typing.Optional[QueuePoolConfig] = None,
+    ):
 
-        db_url = make_url(connection_url)
-        self.engine = sqlalchemy.create_engine(db_url, pool_recycle=3600, future=True)
+        self.backend = new_backend(connection_url, pool_config)
+        self.engine = self.backend.engine
 
-        @event.listens_for(self.engine, "before_cursor_execute")
-        # type: ignore
-        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
-            conn.info.setdefault("query_start_time", []).append(time.time())
-            _LOG.debug("Query (400 chars max): %s", statement[:400])
-            _LOG.debug("Parameters (first 30):%s", parameters[:30])
+        # Number of statements sent to the queue database
+        self.statements_count = 0
+        # Number of statements sent during the latest lock cycle
+        self.lock_statements_count = 0
 
-        @event.listens_for(self.engine, "after_cursor_execute")
-        # type: ignore
-        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
-            total = time.time() - conn.info["query_start_time"].pop(-1)
-            _LOG.debug("Query total time: %f", total)
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def count_statement(
+            conn: typing.Any,
+            cursor: typing.Any,
+            statement: str,
+            parameters: typing.Any,
+            context: typing.Any,
+            executemany: bool,
+        ) -> None:
+            self.statements_count += 1
+
+        # Statements are only traced in debug mode, so that hooks cost
+        # nothing otherwise
+        if _LOG.isEnabledFor(logging.DEBUG):
+
+            @event.listens_for(self.engine, "before_cursor_execute")
+            # type: ignore
+            def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+                conn.info.setdefault("query_start_time", []).append(time.time())
+                _LOG.debug("Query (400 chars max): %s", statement[:400])
+                _LOG.debug("Parameters (first 30):%s", parameters[:30])
+
+            @event.listens_for(self.engine, "after_cursor_execute")
+            # type: ignore
+            def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+                total = time.time() - conn.info["query_start_time"].pop(-1)
+                _LOG.debug("Query total time: %f", total)
+
+        # Decide if, and when, failed database transactions are retried
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+
+        # Statement latencies and retries, recorded once enabled
+        self.metrics: typing.Optional[QueueMetrics] = None
 
         self.pod = socket.gethostname()
 
-        db_meta = MetaData(bind=self.engine)
-        self.queue = Table("contribfile_queue", db_meta, autoload=True)
-        self.mutex = Table("mutex", db_meta, autoload=True)
+        self.queue = self.backend.queue
+        self.mutex = self.backend.mutex
+        # Each database has its own mutex, so that ingests of different
+        # databases do not block each other, legacy queue schema has a single
+        # mutex shared by all databases
+        self.has_database_mutex = "database" in self.mutex.c
+        self.has_stats = _STATS_COLUMNS.issubset(self.queue.c.keys())
+        self.has_size = "size" in self.queue.c
+        if not self.has_stats:
+            _LOG.warning("No statistics columns in contribution queue, contributions timing is not recorded")
         self.contribution_metadata = contribution_metadata
+
+        self._contribfiles_queue_fraction = 1
+        # Throughput of current pod, in contribution files per second
+        self._throughput: typing.Optional[float] = None
+        self._lock_time: typing.Optional[float] = None
+        self._locked_count = 0
+        # Time of the latest computation of all pods throughput, and number
+        # of remaining contribution files and all pods throughput
+        self._throughput_all: typing.Optional[typing.Tuple[float, int, float]] = None
+
         self.ordered_tables_to_load = self.contribution_metadata.table_names
         _LOG.debug("Ordered tables to load: %s", self.ordered_tables_to_load)
         self._pop_current_table()
 
+    def enable_metrics(self) -> QueueMetrics:
+        """Record latency of each statement sent to the queue database, and
+        retries of database transactions, by statement kind.
+
+        Returns
+        -------
+        metrics : `QueueMetrics`
+            Metrics, which can be sampled using `QueueMetrics.snapshot`
+
+        """
+        if self.metrics is not None:
+            return self.metrics
+        metrics = QueueMetrics()
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def start_timer(
+            conn: typing.Any,
+            cursor: typing.Any,
+            statement: str,
+            parameters: typing.Any,
+            context: typing.Any,
+            executemany: bool,
+        ) -> None:
+            conn.info["queue_statement_start"] = time.perf_counter()
+
+        @event.listens_for(self.engine, "after_cursor_execute")
+        def record_latency(
+            conn: typing.Any,
+            cursor: typing.Any,
+            statement: str,
+            parameters: typing.Any,
+            context: typing.Any,
+            executemany: bool,
+        ) -> None:
+            latency = time.perf_counter() - conn.info.pop("queue_statement_start")
+            kind = conn.get_execution_options().get("queue_statement", StatementKind.OTHER)
+            metrics.observe_latency(kind, latency)
+
+        self.metrics = metrics
+        return metrics
+
+    def _connect(self, kind: StatementKind) -> typing.Any:
+        """Connect to the queue database, statements sent using this connection
+        are recorded in metrics with the given kind, as well as the time
+        spent to check out the connection from the pool."""
+        if self.metrics is None:
+            return self.engine.connect()
+        start = time.perf_counter()
+        connection = self.engine.connect()
+        self.metrics.observe_checkout(time.perf_counter() - start)
+        connection.execution_options(queue_statement=kind)
+        return connection
+
+    def pool_stats(self) -> typing.Dict[str, typing.Any]:
+        """Return checkout statistics of the queue database connection pool,
+        see `queuebackend.PoolStats.snapshot`."""
+        return self.backend.pool_stats.snapshot()
+
     def set_transaction_size(self, contributions_queue_fraction: int) -> None:
-        """Set number of contributions managed by a single transaction."""
+        """Set maximum number of contributions managed by a single transaction.
+
+        Actual number of contributions locked for a transaction is adapted
+        to pod throughput, see `_contribfiles_to_lock_count`.
+        """
         contributions_count = self._count_contribfiles()
         _LOG.debug("Contributions queue size: %s", contributions_count)
+        self._contribfiles_queue_fraction = contributions_queue_fraction
         self._contribfiles_to_lock_number = int(contributions_count / contributions_queue_fraction) + 1
 
+    def _throughput_all_pods(self) -> typing.Tuple[int, float]:
+        """Return the number of remaining contribution files and the
+        throughput of all pods, in contribution files per second, over the
+        latest throughput time window.
+
+        Both are computed with an aggregate over the whole queue of current
+        database, so the result is reused during a few seconds.
+
+        Returns
+        -------
+        remaining : `int`
+            Number of contribution files which are not locked
+        throughput_all : `float`
+            Throughput of all pods, 0 if no contribution file was recently
+            ingested
+        """
+        now = time.time()
+        if self._throughput_all is not None and now - self._throughput_all[0] < _THROUGHPUT_CACHE_SEC:
+            return self._throughput_all[1:]
+
+        since = now - _THROUGHPUT_WINDOW_SEC
+        q = self.queue.c
+        recent = q.end_time >= since
+        query = select(
+            [
+                func.sum(case([(q.locking_pod.is_(None), 1)], else_=0)),
+                func.sum(case([(recent & q.error.is_(None), 1)], else_=0)),
+                func.min(case([(recent, q.start_time)], else_=None)),
+            ]
+        )
+        query = query.where(q.database == self.contribution_metadata.database)
+        with self._connect(StatementKind.COUNT) as connection:
+            (remaining, recent_count, first_start) = connection.execute(query).one()
+
+        throughput_all = 0.0
+        if recent_count:
+            start = since if first_start is None else max(since, first_start)
+            if now > start:
+                throughput_all = recent_count / (now - start)
+        self._throughput_all = (now, remaining or 0, throughput_all)
+        return self._throughput_all[1:]
+
+    def _contribfiles_to_lock_count(self) -> int:
+        """Size a batch of contribution files to lock using current pod
+        throughput, throughput of all pods and remaining contribution files.
+
+        Each batch is sized so that the pod could run a number of transactions
+        equal to the contributions queue fraction before the end of the
+        ingest. Slow pods therefore lock fewer contribution files than fast
+        ones and batches shrink near the end of the ingest, so that remaining
+        contribution files are spread across all pods.
+
+        Batch size is the fixed size set by `set_transaction_size` for the
+        first transaction of a pod, or if contribution queue has no
+        statistics, and never exceeds it. It is computed before the lock
+        cycle, so that pods do not wait for it behind the ``mutex`` row.
+
+        Returns
+        -------
+        count : `int`
+            Number of contribution files to lock
+
+        """
+        max_count = self._contribfiles_to_lock_number
+        if not self.has_stats or self._throughput is None:
+            return max_count
+
+        (remaining, throughput_all) = self._throughput_all_pods()
+        if not remaining or not throughput_all:
+            return max_count
+        remaining_time = remaining / throughput_all
+        count = math.ceil(self._throughput * remaining_time / self._contribfiles_queue_fraction)
+        _LOG.debug(
+            "Adaptive batch size: %s (pod throughput: %f/s, all pods throughput: %f/s, remaining: %s)",
+            count,
+            self._throughput,
+            throughput_all,
+            remaining,
+        )
+        return max(1, min(count, max_count))
+
+    def _update_throughput(self) -> None:
+        """Update current pod throughput, using the latest transaction
+        duration and number of contribution files."""
+        if self._lock_time is None or self._locked_count == 0:
+            return
+        duration = time.time() - self._lock_time
+        if duration <= 0:
+            return
+        throughput = self._locked_count / duration
+        if self._throughput is None:
+            self._throughput = throughput
+        else:
+            self._throughput = (
+                _THROUGHPUT_SMOOTHING * throughput + (1 - _THROUGHPUT_SMOOTHING) * self._throughput
+            )
+
     def _count_contribfiles(self, not_succeed: bool = False) -> int:
         """Count contributions for current database if not_succeed is 'True'
         count contributions which are not ingested else count all
@@ -114,7 +415,7 @@ class QueueManager:
             query = query.where(self.queue.c.succeed.isnot(True))
 
         query = query.where(self.queue.c.database == self.contribution_metadata.database)
-        with self.engine.connect() as connection:
+        with self._connect(StatementKind.COUNT) as connection:
             result = connection.execute(query)
             contributions_count = next(result)[0]
             result.close()
@@ -143,133 +444,244 @@ class QueueManager:
         else:
             return False
 
-    def _select_locked_contribfiles(self) -> typing.List[typing.Tuple[str, int, str, bool, str]]:
-        query = select(
-            [
-                self.queue.c.database,
-                self.queue.c.chunk_id,
-                self.queue.c.filepath,
-                self.queue.c.is_overlap,
-                self.queue.c.table,
-            ]
-        )
-        query = query.where(self.queue.c.locking_pod == self.pod)
-        query = query.where(self.queue.c.succeed.is_(None))
-        query = query.where(self.queue.c.database == self.contribution_metadata.database)
-        with self.engine.connect() as connection:
-            result = connection.execute(query)
-            contributions = result.fetchall()
-            result.close()
-        return contributions
-
-    def insert_contribfiles(self) -> None:
-        """If queue is empty for current database, then load contribution files
-        specification in queue, else do nothing.
+    def _select_contribfiles_keys(self) -> typing.Dict[_ContribFileKey, bool]:
+        """Return key and state of all contribution files in queue for current
+        database.
 
         Returns
         -------
-        Nothing
+        contribfiles : `Dict[_ContribFileKey, bool]`
+            For each contribution file key, True if it has been successfully
+            ingested, else False
 
         """
+        query = select(
+            [self.queue.c.table, self.queue.c.filepath, self.queue.c.is_overlap, self.queue.c.succeed]
+        )
+        query = query.where(self.queue.c.database == self.contribution_metadata.database)
+        contribfiles: typing.Dict[_ContribFileKey, bool] = dict()
+        with self._connect(StatementKind.SELECT) as connection:
+            result = connection.execution_options(stream_results=True).execute(query)
+            for (table, filepath, is_overlap, succeed) in result:
+                contribfiles[_contribfile_key(table, filepath, is_overlap)] = bool(succeed)
+            result.close()
+        return contribfiles
 
-        contributions_count = self._count_contribfiles()
-        if contributions_count != 0:
-            _LOG.warn("Skip contributions queue load, because it is not empty")
-            return
+    def insert_contribfiles(
+        self, dry_run: bool = False, prune: bool = False, splitter: typing.Optional[FileSplitter] = None
+    ) -> typing.Dict[str, ContribFilesDiff]:
+        """Load in queue the contribution files specified in metadata and not
+        already queued for current database.
 
-        for table_contribs_spec in self.contribution_metadata.table_contribs_spec:
-            contrib_specs = list(table_contribs_spec.get_contrib())
-            with self.engine.begin() as conn:
-                conn.execute(self.queue.insert(), contrib_specs)
+        Contribution files are identified by their database, table, path and
+        overlap flag, so that loading is idempotent and can be used to append
+        new contribution files to an existing database. Queued contribution
+        files, and especially succeeded ones, are left unchanged.
 
-    def _acquire_mutex(self) -> None:
+        Oversized contribution files can be split into byte ranges, which
+        are queued as distinct contribution files, with the chunk id and
+        overlap flag of their file. A file queued as ranges is considered
+        queued, whatever the current split size.
 
-        query = select([func.count("*")]).select_from(self.mutex)
-        with self.engine.connect() as connection:
-            result = connection.execute(query)
-            size_mutex = next(result)[0]
-            result.close()
+        Parameters
+        ----------
+        dry_run : `bool`
+            Only compute the difference between metadata and queue
+        prune : `bool`
+            Remove from queue the contribution files which are not specified
+            in metadata anymore, unless they are locked or succeeded
+        splitter : `FileSplitter`, optional
+            Split contribution files added to queue, not used for dry runs
 
-        if size_mutex != 1:
-            raise QueueError("Invalid mutex size", size_mutex)
+        Returns
+        -------
+        diff : `Dict[str, ContribFilesDiff]`
+            Difference between metadata and queue, for each table
 
-        loop = True
-        wait_sec = 1
-        while loop:
-            query = select([func.count("*")]).select_from(self.mutex)
-            query = query.where(self.mutex.c.pod == self.pod)
-            with self.engine.connect() as connection:
-                result = connection.execute(query)
-                has_mutex = bool(next(result)[0])
-                result.close()
+        """
+        queued = self._select_contribfiles_keys()
+        # Keys of the byte ranges of split contribution files, indexed by
+        # contribution file key
+        queued_ranges: typing.Dict[_ContribFileKey, typing.List[_ContribFileKey]] = dict()
+        for key in queued:
+            (table, filepath, is_overlap) = key
+            base_filepath, byte_range = split_range_filepath(filepath)
+            if byte_range is not None:
+                queued_ranges.setdefault((table, base_filepath, is_overlap), []).append(key)
+        diff: typing.Dict[str, ContribFilesDiff] = dict()
 
-            if has_mutex:
-                loop = False
-            else:
-                acquire_mutex_query = update(self.mutex).values(
-                    pod=self.pod, latest_move=datetime.datetime.now()
+        for table_contribs_spec in self.contribution_metadata.table_contribs_spec:
+            table_diff = diff.setdefault(table_contribs_spec.table, ContribFilesDiff())
+            contrib_specs = []
+            for contrib_spec in table_contribs_spec.get_contrib():
+                key = _contribfile_key(
+                    contrib_spec["table"], contrib_spec["filepath"], contrib_spec["is_overlap"]
                 )
-                acquire_mutex_query = acquire_mutex_query.where(self.mutex.c.pod.is_(None))
+                for range_key in queued_ranges.get(key, []):
+                    if queued.pop(range_key):
+                        table_diff.succeed += 1
+                    else:
+                        table_diff.queued += 1
+                if key in queued_ranges:
+                    continue
+                succeed = queued.pop(key, None)
+                if succeed is None:
+                    contrib_specs.append(contrib_spec)
+                elif succeed:
+                    table_diff.succeed += 1
+                else:
+                    table_diff.queued += 1
+            if not dry_run and splitter is not None and len(contrib_specs) != 0:
+                contrib_specs = splitter.split_all(contrib_specs)
+            if not self.has_size:
+                for contrib_spec in contrib_specs:
+                    contrib_spec.pop("size", None)
+            table_diff.added += len(contrib_specs)
+            if not dry_run and len(contrib_specs) != 0:
                 with self.engine.begin() as conn:
-                    conn.execute(acquire_mutex_query)
-                time.sleep(wait_sec)
-                # Sleep for longer and longer
-                wait_sec = util.increase_wait_time(wait_sec)
-
-    def _release_mutex(self) -> None:
-        release_mutex_query = update(self.mutex).values(pod=None, latest_move=datetime.datetime.now())
-        release_mutex_query = release_mutex_query.where(self.mutex.c.pod == self.pod)
-        self._safe_execute(release_mutex_query, _MAX_RETRY_ATTEMPTS)
+                    conn.execute(self._insert_ignore(), contrib_specs)
+
+        obsolete: typing.Dict[str, typing.List[str]] = dict()
+        for (table, filepath, _), succeed in queued.items():
+            table_diff = diff.setdefault(table, ContribFilesDiff())
+            table_diff.obsolete += 1
+            if not succeed:
+                obsolete.setdefault(table, []).append(filepath)
+
+        for table, table_diff in diff.items():
+            _LOG.info("Contributions queue load for table %s: %s", table, table_diff)
+
+        if prune and not dry_run:
+            for table, filepaths in obsolete.items():
+                query = self.queue.delete()
+                query = query.where(self.queue.c.database == self.contribution_metadata.database)
+                query = query.where(self.queue.c.table == table)
+                query = query.where(self.queue.c.filepath.in_(filepaths))
+                query = query.where(self.queue.c.locking_pod.is_(None))
+                self._safe_execute(query, _MAX_RETRY_ATTEMPTS)
+        return diff
+
+    def _insert_ignore(self) -> typing.Any:
+        """Insert statement which skips contribution files already queued,
+        if the queue has a unique key on contribution files."""
+        query = self.queue.insert()
+        query = query.prefix_with("IGNORE", dialect="mysql")
+        query = query.prefix_with("IGNORE", dialect="mariadb")
+        query = query.prefix_with("OR IGNORE", dialect="sqlite")
+        return query
+
+    def _update_mutex(self) -> typing.Any:
+        """Update statement for the mutex of current database."""
+        query = update(self.mutex).values(pod=None, latest_move=datetime.datetime.now())
+        if self.has_database_mutex:
+            query = query.where(self.mutex.c.database == self.contribution_metadata.database)
+        return query
 
     def init_mutex(self) -> None:
-        """Initialize mutex in queue database Queue database has a table
-        ``mutex`` which contain only one row.
+        """Initialize mutex for current database in queue database. Queue
+        database has a table ``mutex`` which contain one row per database,
+        created on demand.
 
         This row is used to enable only one pod to lock contribution file in
-        queue at a time and need to be initialized at ingest startup.
+        queue at a time for a given database and need to be initialized at
+        ingest startup.
 
         """
-        release_mutex_query = update(self.mutex).values(pod=None, latest_move=datetime.datetime.now())
-        self._safe_execute(release_mutex_query, _MAX_RETRY_ATTEMPTS)
 
-    def _run_lock_queries(self, contribfiles_to_lock_count: int) -> int:
+        def init(connection: typing.Any) -> None:
+            size_mutex = connection.execute(self._update_mutex()).rowcount
+            if size_mutex == 0 and self.has_database_mutex:
+                _LOG.debug("Create mutex for database %s", self.contribution_metadata.database)
+                mutex = {
+                    "database": self.contribution_metadata.database,
+                    "pod": None,
+                    "latest_move": datetime.datetime.now(),
+                }
+                try:
+                    connection.execute(self.mutex.insert(), mutex)
+                except IntegrityError:
+                    # An other pod has created the mutex since the update,
+                    # only the failed insert is rolled back
+                    _LOG.debug("Mutex for database %s already created", self.contribution_metadata.database)
+                    connection.execute(self._update_mutex())
+
+        self._safe_run(init, _MAX_RETRY_ATTEMPTS)
+
+    def _run_lock_queries(
+        self, contribfiles_to_lock_count: typing.Optional[int] = None
+    ) -> typing.List[typing.Tuple[str, int, str, bool, str]]:
         """Assign contribfiles to a pod inside ingest queue.
 
+        The whole lock cycle runs on a single connection, inside a single
+        database transaction:
+
+        1. update the ``mutex`` row of current database, which locks it until
+           commit and so serializes lock cycles across pods ingesting this
+           database,
+        2. select contribution files which are not locked,
+        3. lock them for current pod.
+
+        The batch of contribution files to lock is sized before, outside of
+        the lock cycle.
+
         Parameters
         ----------
-        contribfiles_to_lock_count: `int`
-            Maximum number of contribfile to lock
+        contribfiles_to_lock_count: `int`, optional
+            Maximum number of contribfile to lock, computed from current pod
+            throughput if not set
 
         Returns
         -------
-        contribfiles_locked_count: int
-            Number of contribfiles locked
+        contribfiles_locked: `List[Tuple[str, int, str, bool, str]]`
+            Contribution files locked for current pod
 
-        """
+        Raises
+        ------
+        QueueError
+            Raised if the ``mutex`` table does not contain exactly one row
+            for current database
 
-        try:
-            self._acquire_mutex()
+        """
 
-            select_query = select([self.queue.c.id])
-            select_query = select_query.limit(contribfiles_to_lock_count)
+        if contribfiles_to_lock_count is None:
+            limit = self._contribfiles_to_lock_count()
+        else:
+            limit = contribfiles_to_lock_count
+
+        def lock_cycle(connection: typing.Any) -> typing.List[typing.Tuple[str, int, str, bool, str]]:
+            size_mutex = connection.execute(self._update_mutex()).rowcount
+            if size_mutex != 1:
+                raise QueueError("Invalid mutex size", self.contribution_metadata.database, size_mutex)
+
+            select_query = select(
+                [
+                    self.queue.c.id,
+                    self.queue.c.database,
+                    self.queue.c.chunk_id,
+                    self.queue.c.filepath,
+                    self.queue.c.is_overlap,
+                    self.queue.c.table,
+                ]
+            )
+            select_query = select_query.limit(limit)
             select_query = select_query.where(self.queue.c.locking_pod.is_(None))
             select_query = select_query.where(self.queue.c.database == self.contribution_metadata.database)
-
-            with self.engine.connect() as connection:
-                rows = connection.execute(select_query)
-                ids = []
-                for e in rows:
-                    ids.append(e[0])
-                rows.close()
+            rows = connection.execute(select_query).fetchall()
+            if len(rows) == 0:
+                return []
 
             update_query = update(self.queue).values(locking_pod=self.pod)
-            update_query = update_query.where(self.queue.c.id.in_(ids))
+            if self.has_stats:
+                update_query = update_query.values(
+                    lock_time=time.time(),
+                    attempts=func.coalesce(self.queue.c.attempts, 0) + 1,
+                    transaction_id=None,
+                )
+            update_query = update_query.where(self.queue.c.id.in_([row.id for row in rows]))
+            connection.execute(update_query)
+            return [tuple(row)[1:] for row in rows]
 
-            self._safe_execute(update_query, _MAX_RETRY_ATTEMPTS)
-        finally:
-            self._release_mutex()
-        contribfiles_locked_count = len(ids)
-        return contribfiles_locked_count
+        return self._safe_run(lock_cycle, _MAX_RETRY_ATTEMPTS, StatementKind.LOCK)
 
     def lock_contribfiles(self) -> typing.List[typing.Tuple[str, int, str, bool, str]]:
         """Lock a batch of contribution files and returns their representation,
@@ -283,26 +695,43 @@ class QueueManager:
 
         """
 
-        # Lock contributions for one or more tables
-        contribfiles_locked_count_expected = self._run_lock_queries(self._contribfiles_to_lock_number)
-
-        contribfiles_locked = self._select_locked_contribfiles()
-        contribfiles_locked_count = len(contribfiles_locked)
-        # Non expensive check, should be useless and can be removed
-        # in the long term
-        if contribfiles_locked_count_expected != contribfiles_locked_count:
-            _LOG.fatal(
-                "Unexpected number of locked contributions for pod %s (is: %s, should be: %s)",
-                self.pod,
-                contribfiles_locked_count,
-                contribfiles_locked_count_expected,
-            )
-        _LOG.debug("contributions_locked_count: %s", contribfiles_locked_count)
-        _LOG.debug("%s contribution files locked by pod %s", contribfiles_locked_count, self.pod)
+        statements_count = self.statements_count
+        contribfiles_locked = self._run_lock_queries()
+        self._lock_time = time.time()
+        self._locked_count = len(contribfiles_locked)
+        self.lock_statements_count = self.statements_count - statements_count
+        _LOG.debug(
+            "%s contribution files locked by pod %s, using %s statements",
+            len(contribfiles_locked),
+            self.pod,
+            self.lock_statements_count,
+        )
 
         return contribfiles_locked
 
-    def unlock_contribfiles(self, ingest_success: bool) -> None:
+    def set_transaction_id(self, transaction_id: int) -> None:
+        """Record the super-transaction ingesting the contribution files
+        locked by current pod, so that `requeue_contribfiles` only releases
+        them if this super-transaction is aborted.
+
+        Parameters
+        ----------
+        transaction_id : `int`
+            Id of the super-transaction
+
+        """
+        if not self.has_stats:
+            return
+        query = update(self.queue).values(transaction_id=transaction_id)
+        query = query.where(self.queue.c.locking_pod == self.pod)
+        self._safe_execute(query, _MAX_RETRY_ATTEMPTS, kind=StatementKind.LOCK)
+
+    def unlock_contribfiles(
+        self,
+        ingest_success: bool,
+        transaction_id: typing.Optional[int] = None,
+        contributions: typing.Optional[typing.List[Contribution]] = None,
+    ) -> None:
         """Mark contributions as "succeed" in contribution queue if super-
         transaction has been successfully commited. Release contributions in
         queue when the super-transaction has been aborted.
@@ -310,7 +739,22 @@ class QueueManager:
         WARN: this operation will be retried until it succeed
         so that contribution queue state is consistent with ingest state
 
+        Parameters
+        ----------
+        ingest_success : `bool`
+            True if the super-transaction has been commited
+        transaction_id : `int`, optional
+            Id of the super-transaction
+        contributions : `List[Contribution]`, optional
+            Contributions ingested during the super-transaction, their timing
+            and outcome are recorded in queue
+
         """
+        if contributions:
+            self._record_contribfiles_stats(transaction_id, contributions)
+        if ingest_success:
+            self._update_throughput()
+
         if ingest_success:
             logging.debug("Mark contributions as 'succeed' in queue")
             query = update(self.queue).values(succeed=1)
@@ -320,7 +764,141 @@ class QueueManager:
 
         query = query.where(self.queue.c.locking_pod == self.pod)
 
-        self._safe_execute(query, _MAX_RETRY_ATTEMPTS)
+        self._safe_execute(query, _MAX_RETRY_ATTEMPTS, kind=StatementKind.UNLOCK)
+
+    def _record_contribfiles_stats(
+        self, transaction_id: typing.Optional[int], contributions: typing.List[Contribution]
+    ) -> None:
+        """Write timing and outcome of contributions locked by current pod,
+        using a single bulk statement.
+
+        A contribution file for a regular table is ingested by all workers,
+        its start time is the earliest one and its end time the latest one.
+
+        """
+        if not self.has_stats:
+            return
+        stats: typing.Dict[typing.Tuple[str, str], typing.Dict[str, typing.Any]] = dict()
+        for c in contributions:
+            key = (c.table, c.filepath)
+            stat = stats.get(key)
+            if stat is None:
+                stats[key] = {
+                    "b_table": c.table,
+                    "b_filepath": c.filepath,
+                    "start_time": c.start_time,
+                    "end_time": c.end_time,
+                    "transaction_id": transaction_id,
+                    "worker": c.worker_host,
+                    "error": c.error,
+                }
+                continue
+            if c.start_time is not None:
+                if stat["start_time"] is None or c.start_time < stat["start_time"]:
+                    stat["start_time"] = c.start_time
+            if c.end_time is not None:
+                if stat["end_time"] is None or c.end_time > stat["end_time"]:
+                    stat["end_time"] = c.end_time
+            if c.error is not None:
+                stat["error"] = c.error
+            if c.worker_host:
+                workers = [stat["worker"], c.worker_host] if stat["worker"] else [c.worker_host]
+                stat["worker"] = ",".join(workers)[:255]
+
+        query = update(self.queue).values(
+            start_time=bindparam("start_time"),
+            end_time=bindparam("end_time"),
+            transaction_id=bindparam("transaction_id"),
+            worker=bindparam("worker"),
+            error=bindparam("error"),
+        )
+        query = query.where(self.queue.c.locking_pod == self.pod)
+        query = query.where(self.queue.c.database == self.contribution_metadata.database)
+        query = query.where(self.queue.c.table == bindparam("b_table"))
+        query = query.where(self.queue.c.filepath == bindparam("b_filepath"))
+        self._safe_execute(query, _MAX_RETRY_ATTEMPTS, list(stats.values()), StatementKind.UNLOCK)
+
+    def report(self) -> typing.Dict[str, typing.List[typing.Any]]:
+        """Compute ingest analytics for current database from contribution
+        queue statistics.
+
+        Contribution files of regular tables are ingested by all workers and
+        record a comma-separated list of workers, they are left out of the
+        ``throughput_per_worker`` section which only counts contribution files
+        ingested by a single worker.
+
+        Returns
+        -------
+        report : `Dict[str, List[Any]]`
+            For each report section name, the list of result rows
+
+        Raises
+        ------
+        QueueError
+            Raised if the contribution queue has no statistics columns
+
+        """
+        if not self.has_stats:
+            raise QueueError("Contribution queue has no statistics columns")
+
+        q = self.queue.c
+        duration = q.end_time - q.start_time
+        database = q.database == self.contribution_metadata.database
+        succeed = q.succeed.is_(True)
+
+        def throughput(column: typing.Any, *criteria: typing.Any) -> typing.Any:
+            query = select(
+                [
+                    column,
+                    func.count().label("contributions"),
+                    func.sum(duration).label("ingest_time"),
+                    (func.count() / (func.max(q.end_time) - func.min(q.start_time))).label(
+                        "contributions_per_sec"
+                    ),
+                ]
+            )
+            query = query.where(database).where(succeed)
+            for criterion in criteria:
+                query = query.where(criterion)
+            return query.group_by(column).order_by(column)
+
+        queries = {
+            "throughput_per_table": throughput(q.table),
+            "throughput_per_worker": throughput(q.worker, q.worker.notlike("%,%")),
+            "throughput_per_pod": throughput(q.locking_pod),
+            "lock_wait_per_pod": select(
+                [
+                    q.locking_pod,
+                    func.avg(q.start_time - q.lock_time).label("avg_lock_wait"),
+                    func.max(q.start_time - q.lock_time).label("max_lock_wait"),
+                ]
+            )
+            .where(database)
+            .where(succeed)
+            .group_by(q.locking_pod)
+            .order_by(q.locking_pod),
+            "failures": select(
+                [
+                    q.table,
+                    q.worker,
+                    q.error,
+                    func.count().label("contributions"),
+                    func.max(q.attempts).label("max_attempts"),
+                ]
+            )
+            .where(database)
+            .where(q.error.isnot(None))
+            .group_by(q.table, q.worker, q.error)
+            .order_by(func.count().desc()),
+        }
+
+        report = dict()
+        with self._connect(StatementKind.SELECT) as connection:
+            for name, query in queries.items():
+                result = connection.execute(query)
+                report[name] = result.fetchall()
+                result.close()
+        return report
 
     def _is_queue_empty(self) -> bool:
         if self.current_table is None:
@@ -342,7 +920,7 @@ class QueueManager:
         )
         query = query.where(self.queue.c.succeed.isnot(True))
         query = query.where(self.queue.c.database == self.contribution_metadata.database)
-        with self.engine.connect() as connection:
+        with self._connect(StatementKind.SELECT) as connection:
             result = connection.execute(query)
             contribfiles = result.fetchall()
             result.close()
@@ -369,76 +947,343 @@ class QueueManager:
         query = query.where(self.queue.c.succeed.isnot(True))
         query = query.where(self.queue.c.locking_pod.isnot(None))
         query = query.where(self.queue.c.database == self.contribution_metadata.database)
-        with self.engine.connect() as connection:
+        with self._connect(StatementKind.SELECT) as connection:
             result = connection.execute(query)
             contribfiles = result.fetchall()
             result.close()
         return contribfiles
 
-    def _safe_execute(self, query: typing.Any, max_retry: int = 0) -> None:
+    def select_preflight_contribfiles(self) -> typing.List[typing.Tuple[str, str]]:
+        """Return table and path of all contribution files in queue not
+        successfully loaded for current database, each file is returned once
+        even if it contains both chunk and overlap rows for a table."""
+        query = select([self.queue.c.table, self.queue.c.filepath]).distinct()
+        query = query.where(self.queue.c.succeed.isnot(True))
+        query = query.where(self.queue.c.database == self.contribution_metadata.database)
+        with self._connect(StatementKind.SELECT) as connection:
+            result = connection.execute(query)
+            contribfiles = [(row.table, row.filepath) for row in result]
+            result.close()
+        return contribfiles
+
+    def record_preflight(self, checks: typing.List[FileCheck]) -> None:
+        """Record size and availability of contribution files in queue, using
+        bulk statements.
+
+        Errors are recorded in the ``error`` column, the latest ingest error
+        of contribution files which pass the check is kept.
+
+        Parameters
+        ----------
+        checks : `List[FileCheck]`
+            Outcome of the pre-flight check of contribution files
+
+        Raises
+        ------
+        QueueError
+            Raised if the contribution queue has no size or statistics
+            columns
+
+        """
+        if not self.has_stats or not self.has_size:
+            raise QueueError(
+                "Contributions queue schema does not track file sizes and errors",
+                sorted(_STATS_COLUMNS | {"size"}),
+            )
+        base_query = update(self.queue)
+        base_query = base_query.where(self.queue.c.database == self.contribution_metadata.database)
+        base_query = base_query.where(self.queue.c.table == bindparam("b_table"))
+        base_query = base_query.where(self.queue.c.filepath == bindparam("b_filepath"))
+        succeed_query = base_query.values(size=bindparam("size"))
+        failed_query = base_query.values(size=bindparam("size"), error=bindparam("error"))
+        for i in range(0, len(checks), _SNAPSHOT_BATCH_SIZE):
+            batch = checks[i:i + _SNAPSHOT_BATCH_SIZE]
+            succeed = [
+                {"b_table": c.table, "b_filepath": c.filepath, "size": c.size}
+                for c in batch
+                if c.error is None
+            ]
+            failed = [
+                {"b_table": c.table, "b_filepath": c.filepath, "size": c.size, "error": c.error[:255]}
+                for c in batch
+                if c.error is not None
+            ]
+            if succeed:
+                self._safe_execute(succeed_query, _MAX_RETRY_ATTEMPTS, succeed)
+            if failed:
+                self._safe_execute(failed_query, _MAX_RETRY_ATTEMPTS, failed)
+
+    def requeue_contribfiles(
+        self,
+        criteria: RequeueFilter,
+        transactions_aborted: typing.List[int],
+        dry_run: bool = False,
+    ) -> int:
+        """Release locked contribution files which have not been ingested, so
+        that they are ingested again, using a single UPDATE statement.
+
+        Only contribution files ingested by an aborted super-transaction are
+        released: those of a finished super-transaction may not be marked as
+        succeeded yet. Contribution files locked by a pod which has not
+        started its super-transaction yet can not be distinguished from those
+        locked by a crashed pod, they are only released if
+        ``criteria.lock_age`` or ``criteria.pod`` is set.
+
+        Parameters
+        ----------
+        criteria : `RequeueFilter`
+            Criteria selecting contribution files to release
+        transactions_aborted : `List[int]`
+            Ids of the aborted super-transactions for current database
+        dry_run : `bool`
+            Only count contribution files which would be released
+
+        Returns
+        -------
+        count : `int`
+            Number of released contribution files
+
+        Raises
+        ------
+        QueueError
+            Raised if statistics columns, which track super-transactions, are
+            missing in queue
+
+        """
+        q = self.queue
+        if not self.has_stats:
+            raise QueueError(
+                "Contributions queue schema does not track transactions and errors", sorted(_STATS_COLUMNS)
+            )
+
+        clauses = [
+            q.c.database == self.contribution_metadata.database,
+            q.c.locking_pod.isnot(None),
+            q.c.succeed.isnot(True),
+        ]
+        if criteria.tables:
+            clauses.append(q.c.table.in_(criteria.tables))
+        if criteria.chunk_min is not None:
+            clauses.append(q.c.chunk_id >= criteria.chunk_min)
+        if criteria.chunk_max is not None:
+            clauses.append(q.c.chunk_id <= criteria.chunk_max)
+        if criteria.pod is not None:
+            clauses.append(q.c.locking_pod == criteria.pod)
+        if criteria.error is not None:
+            clauses.append(q.c.error.contains(criteria.error, autoescape=True))
+        if criteria.lock_age is not None:
+            clauses.append(q.c.lock_time <= time.time() - criteria.lock_age)
+        aborted = q.c.transaction_id.in_(transactions_aborted)
+        if criteria.lock_age is not None or criteria.pod is not None:
+            clauses.append(or_(q.c.transaction_id.is_(None), aborted))
+        else:
+            clauses.append(aborted)
+
+        if dry_run:
+            query = select([func.count()]).select_from(q).where(*clauses)
+            count = self._safe_run(lambda connection: connection.execute(query).scalar())
+        else:
+            update_query = update(q).values(locking_pod=None).where(*clauses)
+            count = self._safe_run(
+                lambda connection: connection.execute(update_query).rowcount, _MAX_RETRY_ATTEMPTS
+            )
+        _LOG.info(
+            "%s contribution files %sreleased in queue for database %s",
+            count,
+            "would be " if dry_run else "",
+            self.contribution_metadata.database,
+        )
+        return count
+
+    def _snapshot_columns(self) -> typing.List[typing.Any]:
+        return [c for c in self.queue.columns if c.name != "id"]
+
+    def export_contribfiles(self, filename: str) -> int:
+        """Export contribution files in queue for current database to a
+        gzip-compressed CSV file, using a server-side cursor.
+
+        Parameters
+        ----------
+        filename : `str`
+            Path of the snapshot file
+
+        Returns
+        -------
+        count : `int`
+            Number of exported contribution files
+
+        """
+        columns = self._snapshot_columns()
+        query = select(columns).where(self.queue.c.database == self.contribution_metadata.database)
+        count = 0
+        with gzip.open(filename, "wt", newline="") as f, self.engine.connect() as connection:
+            writer = csv.writer(f)
+            writer.writerow([c.name for c in columns])
+            result = connection.execution_options(stream_results=True).execute(query)
+            for rows in result.partitions(_SNAPSHOT_BATCH_SIZE):
+                for row in rows:
+                    writer.writerow(
+                        [_SNAPSHOT_NULL if v is None else int(v) if isinstance(v, bool) else v for v in row]
+                    )
+                count += len(rows)
+            result.close()
+        _LOG.info("%s contribution files exported to %s", count, filename)
+        return count
+
+    def import_contribfiles(self, filename: str) -> int:
+        """Import contribution files for current database from a snapshot file
+        created by `export_contribfiles`, using bulk inserts.
+
+        Contribution files which have not been successfully ingested are
+        imported unlocked, so that they are ingested again.
+
+        Parameters
+        ----------
+        filename : `str`
+            Path of the snapshot file
+
+        Returns
+        -------
+        count : `int`
+            Number of imported contribution files
+
+        Raises
+        ------
+        QueueError
+            Raised if the queue is not empty for current database
+
+        """
+        database = self.contribution_metadata.database
+        if self._count_contribfiles() != 0:
+            raise QueueError("Contributions queue is not empty for database", database)
+
+        columns = {c.name: c.type.python_type for c in self._snapshot_columns()}
+
+        def parse(name: str, value: str) -> typing.Any:
+            if value == _SNAPSHOT_NULL:
+                return None
+            python_type = columns[name]
+            if python_type is bool:
+                return bool(int(value))
+            elif python_type is datetime.datetime:
+                return datetime.datetime.fromisoformat(value)
+            return python_type(value)
+
+        count = 0
+        with gzip.open(filename, "rt", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            unknown_columns = set(header) - set(columns)
+            if unknown_columns:
+                raise QueueError("Unknown columns in contributions queue snapshot", unknown_columns)
+            batch = []
+            for values in reader:
+                contribfile = {name: parse(name, value) for name, value in zip(header, values)}
+                if contribfile["database"] != database:
+                    continue
+                if not contribfile["succeed"]:
+                    contribfile["locking_pod"] = None
+                batch.append(contribfile)
+                if len(batch) == _SNAPSHOT_BATCH_SIZE:
+                    self._safe_execute(self.queue.insert(), _MAX_RETRY_ATTEMPTS, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._safe_execute(self.queue.insert(), _MAX_RETRY_ATTEMPTS, batch)
+                count += len(batch)
+        _LOG.info("%s contribution files imported from %s", count, filename)
+        return count
+
+    def _safe_execute(
+        self,
+        query: typing.Any,
+        max_retry: int = 0,
+        parameters: typing.Any = None,
+        kind: StatementKind = StatementKind.OTHER,
+    ) -> None:
         """Retry failed update queries.
 
         Parameters
         ----------
-        connection : `Any`
-            Sqlalchemy connection
         query : `Any`
             Sql query
         max_retry : `int`
             Maximum number of retry attempts
+        parameters : `Any`
+            Parameters for the query, a list of parameters
+            runs the query once per element, in bulk
+        kind : `StatementKind`
+            Kind of the query, for metrics
 
         """
-        wait_sec = 1
-        retry_count = 0
-        # See mysql client error codes
+        self._safe_run(lambda connection: connection.execute(query, parameters), max_retry, kind)
+
+    def _safe_run(
+        self,
+        statements: typing.Callable[[typing.Any], _T],
+        max_retry: int = 0,
+        kind: StatementKind = StatementKind.OTHER,
+    ) -> _T:
+        """Run statements inside a database transaction, and retry the whole
+        transaction if it fails.
+
+        Parameters
+        ----------
+        statements : `Callable[[Any], _T]`
+            Function which runs the statements using the sqlalchemy
+            connection passed as argument
+        max_retry : `int`
+            Maximum number of retry attempts
+        kind : `StatementKind`
+            Kind of the statements, for metrics
+
+        Returns
+        -------
+        result : `_T`
+            Value returned by ``statements``
+
+        """
+        # Giving up a lock or unlock transaction leaves the contribution
+        # files locked by a pod which will die, so only the time budget of
+        # the retry policy bounds them
+        retry_state = self.retry_policy.start(kind not in _UNBOUNDED_RETRY_KINDS)
+        attempt = 0
 
-        loop = True
         connection: typing.Any
-        while loop:
-            retry_count += 1
+        while True:
+            attempt += 1
             try:
-                with self.engine.connect() as connection:
-                    try:
-                        connection.execute(query)
-                    except OperationalError as ex:
-                        connection.rollback()
-                        mysql_retry_err_code = [1205]
-                        util.check_raise(ex, mysql_retry_err_code)
-                        if retry_count < max_retry:
-                            _LOG.error(
-                                "Database statement execution error: %s - sleeping for %ss"
-                                " and will retry (attempt #%s of %s)",
-                                ex,
-                                wait_sec,
-                                retry_count,
-                                max_retry,
-                            )
-                            time.sleep(wait_sec)
-                            wait_sec = util.increase_wait_time(wait_sec)
-                            continue
-                        else:
-                            raise
+                with self._connect(kind) as connection:
                     try:
+                        result = statements(connection)
                         connection.commit()
-                        loop = False
-                    except PendingRollbackError as ex:
+                        return result
+                    except (OperationalError, PendingRollbackError):
                         connection.rollback()
-                        _LOG.error("Database commit error %s," " transaction has been rolled back", ex)
-                        continue
+                        raise
+            except PendingRollbackError as ex:
+                _LOG.error("Database commit error %s," " transaction has been rolled back", ex)
+                if attempt >= max_retry:
+                    raise
+                if self.metrics is not None:
+                    self.metrics.count_retry(kind, "rollback")
             except OperationalError as ex:
-                mysql_retry_err_code = [2003, 2004, 2005, 2006, 2013]
-                util.check_raise(ex, mysql_retry_err_code)
-                if retry_count < max_retry:
-                    _LOG.error(
-                        "Database connection error: %s - sleeping for %ss"
-                        " and will retry (attempt #%s of %s)",
-                        ex,
-                        wait_sec,
-                        retry_count,
-                        max_retry,
-                    )
-                    time.sleep(wait_sec)
-                    wait_sec = util.increase_wait_time(wait_sec)
-                    continue
-                else:
+                error_class = classify_error(ex)
+                if error_class is None:
+                    raise
+                sleep_sec = retry_state.next_sleep(error_class) if attempt < max_retry else None
+                if sleep_sec is None:
+                    if self.metrics is not None:
+                        self.metrics.count_giveup(kind)
                     raise
+                _LOG.error(
+                    "Database error (%s): %s - sleeping for %.2fs and will retry (attempt #%s of %s)",
+                    error_class.value,
+                    ex,
+                    sleep_sec,
+                    attempt,
+                    max_retry,
+                )
+                if self.metrics is not None:
+                    self.metrics.count_retry(kind, error_class.value)
+                time.sleep(sleep_sec)
@@ -40,6 +40,7 @@ from . import metadata
 # Imports for other modules --
 # ----------------------------
 from .exception import IngestError
+from .filesplit import range_filepath, split_range_filepath
 from .http import Http
 from .jsonparser import ContributionMonitor, ContributionState, raise_error
 from .loadbalancerurl import LoadBalancedURL
@@ -81,6 +82,7 @@ class Contribution:
         self.is_overlap: int
         self.ext: str = ""
         self.chunk_id = chunk_id
+        self.filepath = filepath
         self.http = Http(timeout_read_sec, timeout_write_sec)
 
         if chunk_id is None:
@@ -94,33 +96,52 @@ class Contribution:
             # partitioned tables
             self.is_overlap = int(is_overlap)
 
+        # Byte range of a split file, requested with a range query
+        path, self.byte_range = split_range_filepath(filepath)
+        # Compressed files are decompressed on the fly by the data server,
+        # which serves them under the name of the uncompressed file
+        uncompressed_filepath, self.compression = metadata.split_compression_ext(path)
         for ext in metadata.EXT_LIST:
-            if filepath.endswith(ext):
+            if uncompressed_filepath.endswith(ext):
                 self.ext = ext
 
         if len(self.ext) == 0:
             raise IngestError(
-                f"Unsupported data format for regular table only {metadata.EXT_LIST} are supported"
+                f"Unsupported data format for regular table only {metadata.EXT_LIST} are supported, "
+                f"optionally compressed with {metadata.COMPRESSION_EXT_LIST}"
             )
 
         self.charset_name = charset_name
-        self.load_balanced_url = LoadBalancedURL.new(load_balanced_base_url, filepath)
+        self.load_balanced_url = LoadBalancedURL.new(load_balanced_base_url, uncompressed_filepath)
         self.request_id = None
+        self.worker_host = worker_host
         self.worker_url = f"http://{worker_host}:{worker_port}"
         self.finished = False
+        # Timing and outcome, recorded in the contribution queue
+        # at the end of the transaction
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self.error: Optional[str] = None
 
     def __str__(self) -> str:
         outdict = (self.__dict__).copy()
         outdict.pop("http")
         return f"Contribution({outdict})"
 
+    def _fail(self, error: str) -> None:
+        self.end_time = time.time()
+        self.error = error
+
     def _build_payload(self, transaction_id: int) -> dict:
+        url = self.load_balanced_url.get(self.worker_host)
+        if self.byte_range is not None:
+            url = range_filepath(url, *self.byte_range)
         payload = {
             "transaction_id": transaction_id,
             "table": self.table,
             "chunk": self.chunk_id,
             "overlap": self.is_overlap,
-            "url": self.load_balanced_url.get(),
+            "url": url,
             "charset_name": self.charset_name,
         }
 
@@ -155,6 +176,7 @@ class Contribution:
 
         _LOG.debug("start_async(): payload: %s", payload)
 
+        self.start_time = time.time()
         responseJson = self.http.post_retry(url, payload, auth=True, no_readtimeout=True)
 
         raise_error(responseJson)
@@ -207,6 +229,9 @@ class Contribution:
                 pass
             case ContributionState.FINISHED:
                 contrib_finished = True
+                self.end_time = time.time()
+                if contrib_monitor.read_sec is not None:
+                    self.load_balanced_url.record(True, contrib_monitor.num_bytes, contrib_monitor.read_sec)
             case (
                 ContributionState.CREATE_FAILED
                 | ContributionState.START_FAILED
@@ -224,8 +249,12 @@ class Contribution:
                     noretry_errmsg = "and is not retriable"
                 else:
                     noretry_errmsg = "and has exceeded maximum number of ingest retries"
+                self._fail(contrib_monitor.status.value)
+                if contrib_monitor.status == ContributionState.READ_FAILED:
+                    self.load_balanced_url.record(False)
                 raise IngestError(f"{msg} {noretry_errmsg}")
             case ContributionState.CANCELLED:
+                self._fail(contrib_monitor.status.value)
                 raise IngestError(f"Contribution {self} ingest has been cancelled by a third-party")
             case _:
                 raise IngestError(f"Contribution {self} is in an unmanaged state: {contrib_monitor.status}")
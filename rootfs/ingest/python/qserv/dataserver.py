@@ -0,0 +1,485 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Static HTTP server for input data files, i.e. contribution files pulled
+by Qserv workers during ingest.
+
+Compressed input data files, e.g. ``chunk_1.txt.gz``, are also served under
+the name of the uncompressed file, i.e. ``chunk_1.txt``: as is with a
+``Content-Encoding`` header to clients which accept it, decompressed on the
+fly otherwise. A ``range`` query, e.g. ``chunk_1.txt?range=0-1023``,
+selects the bytes of a file which are sent, see `filesplit`. Parquet input
+data files, e.g. ``Filter.parquet``, are converted on the fly to delimited
+text files with the requested extension, e.g. ``Filter.csv``, using the
+input data file formats.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import email.utils
+import functools
+import gzip
+import http.server
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .exception import MissingDependencyError
+from .filesplit import parse_range_query
+from .metadata import COMPRESSION_EXT_LIST, EXT_LIST, GZ, ZST, FileFormat, default_fileformats
+from .parquetstream import PARQUET, ParquetConverter
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8080
+
+# Path of the throughput counters, in JSON format
+STATS_PATH = "/.stats"
+
+# Maximum number of files with throughput counters
+DEFAULT_STATS_FILES = 1000
+
+# Maximum number of pending connections
+_REQUEST_QUEUE_SIZE = 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# HTTP content coding of each compression extension
+_CONTENT_ENCODINGS = {GZ: "gzip", ZST: "zstd"}
+
+# Size of the chunks of decompressed data sent to clients
+_STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class TransferStats:
+    """Throughput counters of a file, or of all files."""
+
+    requests: int = 0
+    """ Number of GET requests """
+
+    bytes_sent: int = 0
+    """ Number of bytes sent """
+
+    transfer_sec: float = 0.0
+    """ Time spent sending data, in seconds """
+
+    @property
+    def throughput(self) -> float:
+        """Bytes sent per second of transfer"""
+        return self.bytes_sent / self.transfer_sec if self.transfer_sec > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(asdict(self), throughput=self.throughput)
+
+
+class DataServerStats:
+    """Thread-safe throughput counters of a data server, for each file and
+    for all files.
+
+    Only the counters of the most recently transferred files are kept, so
+    that memory use does not grow with the number of served files.
+
+    Parameters
+    ----------
+    max_files : `int`
+        Maximum number of files with throughput counters, 0 to only count
+        transfers of all files
+
+    """
+
+    def __init__(self, max_files: int = DEFAULT_STATS_FILES) -> None:
+        self.start_time = time.monotonic()
+        self.total = TransferStats()
+        self.max_files = max_files
+        # Least recently transferred files first
+        self.files: OrderedDict[str, TransferStats] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, path: str, num_bytes: int, duration_sec: float) -> None:
+        """Record the transfer of a file.
+
+        Parameters
+        ----------
+        path : `str`
+            File path, relative to the served directory
+        num_bytes : `int`
+            Number of bytes sent
+        duration_sec : `float`
+            Duration of the transfer, in seconds
+
+        """
+        with self._lock:
+            stats = [self.total]
+            if self.max_files > 0:
+                file_stats = self.files.pop(path, None) or TransferStats()
+                self.files[path] = file_stats
+                if len(self.files) > self.max_files:
+                    self.files.popitem(last=False)
+                stats.append(file_stats)
+            for s in stats:
+                s.requests += 1
+                s.bytes_sent += num_bytes
+                s.transfer_sec += duration_sec
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return all counters, the aggregate throughput over the server
+        uptime is also reported."""
+        with self._lock:
+            uptime_sec = time.monotonic() - self.start_time
+            total = self.total.to_dict()
+            total["uptime_sec"] = uptime_sec
+            total["uptime_throughput"] = self.total.bytes_sent / uptime_sec if uptime_sec > 0 else 0.0
+            return {"total": total, "files": {p: s.to_dict() for p, s in self.files.items()}}
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single byte range of a ``Range`` header.
+
+    Returns
+    -------
+    range : `Tuple[int, int]`, optional
+        Offset and length of the range, None if the range is not
+        satisfiable
+
+    Raises
+    ------
+    ValueError
+        Raised if the header is not a single byte range
+    """
+    m = _RANGE.match(header.strip())
+    if m is None or m.group(1) == m.group(2) == "":
+        raise ValueError(f"Unsupported range: {header}")
+    first, last = m.group(1), m.group(2)
+    if first == "":
+        # Suffix range, i.e. last bytes of the file
+        length = min(int(last), size)
+        return (size - length, length) if length > 0 else None
+    start = int(first)
+    end = size - 1 if last == "" else min(int(last), size - 1)
+    if start >= size or end < start:
+        return None
+    return start, end - start + 1
+
+
+def _accepted_encodings(header: Optional[str]) -> Set[str]:
+    """Return the content codings accepted by a client, according to its
+    ``Accept-Encoding`` header."""
+    encodings = set()
+    for item in (header or "").split(","):
+        coding, _, params = item.partition(";")
+        name, _, value = params.partition("=")
+        try:
+            if name.strip() == "q" and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def _open_decompressed(f: BinaryIO, compression: str) -> io.BufferedIOBase:
+    """Return a reader of the decompressed content of a file.
+
+    Raises
+    ------
+    MissingDependencyError
+        Raised if the zstandard module is required and not installed
+    """
+    if compression == GZ:
+        return gzip.GzipFile(fileobj=f, mode="rb")
+    if zstandard is None:
+        raise MissingDependencyError("zstandard", "decompress zstd files")
+    return zstandard.ZstdDecompressor().stream_reader(f)
+
+
+def _read_chunks(reader: io.BufferedIOBase) -> Iterator[bytes]:
+    while True:
+        data = reader.read(_STREAM_CHUNK_SIZE)
+        if not data:
+            return
+        yield data
+
+
+class DataRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve files with ``sendfile``, support keep-alive connections and
+    single byte range requests. Directory indexes are served like
+    `http.server.SimpleHTTPRequestHandler` does, so that the input data tree
+    can be scanned over HTTP.
+
+    A request for a missing file is served with its compressed version, if
+    any, either with a ``Content-Encoding`` header or decompressed on the fly
+    with chunked transfer encoding, byte ranges are not supported in the
+    latter case. A request for a missing text file is served with the
+    conversion of the Parquet file having the same name, if any, with chunked
+    transfer encoding."""
+
+    protocol_version = "HTTP/1.1"
+    server: "DataServer"
+
+    def do_GET(self) -> None:
+        self._serve(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._serve(send_body=False)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        _LOG.debug("%s - %s", self.address_string(), format % args)
+
+    def _serve(self, send_body: bool) -> None:
+        if self.path.split("?", 1)[0] == STATS_PATH:
+            self._send_stats(send_body)
+            return
+        path = self.translate_path(self.path)
+        try:
+            query_range = parse_range_query(urllib.parse.urlsplit(self.path).query)
+        except ValueError as e:
+            self.send_error(http.HTTPStatus.BAD_REQUEST, str(e))
+            return
+        if not os.path.isfile(path):
+            if query_range is not None:
+                self.send_error(
+                    http.HTTPStatus.BAD_REQUEST, "Range query is only supported for regular files"
+                )
+                return
+            for compression in COMPRESSION_EXT_LIST:
+                if os.path.isfile(f"{path}.{compression}"):
+                    self._serve_compressed(path, compression, send_body)
+                    return
+            root, ext = os.path.splitext(path)
+            parquet_path = f"{root}.{PARQUET}"
+            if ext.lstrip(".") in EXT_LIST and os.path.isfile(parquet_path):
+                self._serve_parquet(path, parquet_path, send_body)
+                return
+            if send_body:
+                super().do_GET()
+            else:
+                super().do_HEAD()
+            return
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(http.HTTPStatus.NOT_FOUND, "File not found")
+            return
+        with f:
+            self._send_file(f, os.path.relpath(path, self.directory), send_body, query_range=query_range)
+
+    def _serve_compressed(self, path: str, compression: str, send_body: bool) -> None:
+        relpath = os.path.relpath(path, self.directory)
+        content_encoding = _CONTENT_ENCODINGS[compression]
+        try:
+            f = open(f"{path}.{compression}", "rb")
+        except OSError:
+            self.send_error(http.HTTPStatus.NOT_FOUND, "File not found")
+            return
+        with f:
+            if content_encoding in _accepted_encodings(self.headers.get("Accept-Encoding")):
+                self._send_file(f, relpath, send_body, content_encoding)
+                return
+            try:
+                reader = _open_decompressed(f, compression)
+            except MissingDependencyError as e:
+                self.send_error(http.HTTPStatus.NOT_IMPLEMENTED, str(e))
+                return
+            with reader:
+                self._send_stream(_read_chunks(reader), os.fstat(f.fileno()).st_mtime, relpath, send_body)
+
+    def _serve_parquet(self, path: str, parquet_path: str, send_body: bool) -> None:
+        relpath = os.path.relpath(path, self.directory)
+        fileformat = self.server.fileformats.get(os.path.splitext(path)[1].lstrip("."))
+        try:
+            f = open(parquet_path, "rb")
+        except OSError:
+            self.send_error(http.HTTPStatus.NOT_FOUND, "File not found")
+            return
+        with f:
+            try:
+                converter = ParquetConverter(f, fileformat)
+            except MissingDependencyError as e:
+                self.send_error(http.HTTPStatus.NOT_IMPLEMENTED, str(e))
+                return
+            except Exception as e:
+                _LOG.error("Unable to read Parquet file %s: %s", parquet_path, e)
+                self.send_error(http.HTTPStatus.INTERNAL_SERVER_ERROR, "Invalid Parquet file")
+                return
+            self._send_stream(converter, os.fstat(f.fileno()).st_mtime, relpath, send_body)
+
+    def _send_stream(self, chunks: Iterable[bytes], mtime: float, relpath: str, send_body: bool) -> None:
+        """Send a stream of unknown size with chunked transfer encoding."""
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(relpath))
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Last-Modified", email.utils.formatdate(mtime, usegmt=True))
+        self.end_headers()
+        if not send_body:
+            return
+
+        start = time.monotonic()
+        sent = 0
+        try:
+            for data in chunks:
+                if not data:
+                    continue
+                self.wfile.write(b"%X\r\n%b\r\n" % (len(data), data))
+                sent += len(data)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError) as e:
+            _LOG.warning("Transfer of %s to %s interrupted: %s", relpath, self.address_string(), e)
+            self.close_connection = True
+            return
+        except Exception as e:
+            # Headers are sent, so the client only detects the error by the
+            # missing last chunk
+            _LOG.error("Unable to decompress or convert %s: %s", relpath, e)
+            self.close_connection = True
+            return
+        self.server.stats.record(relpath, sent, time.monotonic() - start)
+
+    def _send_file(
+        self,
+        f: BinaryIO,
+        relpath: str,
+        send_body: bool,
+        content_encoding: Optional[str] = None,
+        query_range: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        fs = os.fstat(f.fileno())
+        size = fs.st_size
+        offset, length = 0, size
+        status = http.HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if query_range is not None:
+            # The range is the requested resource, i.e. not a partial content
+            offset = min(query_range[0], size)
+            length = min(query_range[1], size - offset)
+        elif range_header is not None:
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                # Unsupported ranges are ignored, i.e. the whole file is sent
+                byte_range = (0, size)
+            else:
+                if byte_range is None:
+                    self.send_response(http.HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                status = http.HTTPStatus.PARTIAL_CONTENT
+            offset, length = byte_range
+
+        self.send_response(status)
+        self.send_header("Content-Type", self.guess_type(relpath))
+        self.send_header("Content-Length", str(length))
+        self.send_header("Last-Modified", email.utils.formatdate(fs.st_mtime, usegmt=True))
+        self.send_header("Accept-Ranges", "bytes")
+        if content_encoding is not None:
+            self.send_header("Content-Encoding", content_encoding)
+        if status == http.HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {offset}-{offset + length - 1}/{size}")
+        self.end_headers()
+        if not send_body or length == 0:
+            return
+
+        start = time.monotonic()
+        try:
+            sent = self.connection.sendfile(f, offset, length)
+        except (BrokenPipeError, ConnectionResetError) as e:
+            _LOG.warning("Transfer of %s to %s interrupted: %s", relpath, self.address_string(), e)
+            self.close_connection = True
+            return
+        self.server.stats.record(relpath, sent, time.monotonic() - start)
+
+    def _send_stats(self, send_body: bool) -> None:
+        body = json.dumps(self.server.stats.to_dict()).encode()
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class DataServer(http.server.ThreadingHTTPServer):
+    """HTTP server for a directory tree, each connection is handled by a
+    thread.
+
+    Parameters
+    ----------
+    directory : `str`
+        Served directory
+    host : `str`
+        Listening address
+    port : `int`
+        Listening port, 0 to use any free port
+    fileformats : `Dict[str, FileFormat]`, optional
+        Input data file formats, indexed by file extension, used to convert
+        Parquet files, default to `metadata.default_fileformats`
+    stats_files : `int`
+        Maximum number of files with throughput counters, see
+        `DataServerStats`
+
+    """
+
+    daemon_threads = True
+    request_queue_size = _REQUEST_QUEUE_SIZE
+
+    def __init__(
+        self,
+        directory: str,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        fileformats: Optional[Dict[str, FileFormat]] = None,
+        stats_files: int = DEFAULT_STATS_FILES,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.fileformats = fileformats if fileformats is not None else default_fileformats()
+        self.stats = DataServerStats(stats_files)
+        handler = functools.partial(DataRequestHandler, directory=self.directory)
+        super().__init__((host, port), handler)
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        _LOG.info("Serve %s on %s:%s", self.directory, *self.server_address[:2])
+        super().serve_forever(poll_interval)
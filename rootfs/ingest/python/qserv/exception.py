@@ -33,6 +33,15 @@ class IngestError(Exception):
     pass
 
 
+class MissingDependencyError(IngestError):
+    """Error raised when an optional module required by a feature is not
+    installed."""
+
+    def __init__(self, module: str, feature: str):
+        super().__init__(f"{module} module is required to {feature}")
+        self.module = module
+
+
 class QueueError(Exception):
     """Error related to ingest queue."""
 
@@ -0,0 +1,281 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Split oversized contribution files into line-aligned byte ranges, each
+range being ingested as a distinct contribution.
+
+A byte range of a file is identified by a query appended to the file path,
+e.g. ``step1/chunk_1.txt?range=0-1048575``, the range bounds are inclusive
+like in HTTP ``Range`` headers. Data servers must serve such URLs with the
+content of the range only, see `dataserver.DataServer`.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import logging
+import re
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+import requests
+
+from .exception import IngestError
+from .http import ThreadLocalSession, file_size
+from .loadbalancerurl import LoadBalancedURL
+from .metadata import split_compression_ext
+from .parquetstream import PARQUET
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+# Maximum number of contribution files split concurrently
+DEFAULT_WORKERS = 32
+
+# Size of the data read to find the end of a line
+_WINDOW_SIZE = 64 * 1024
+
+_RANGE_QUERY = "range"
+_RANGE_SUFFIX = re.compile(r"\?" + _RANGE_QUERY + r"=(\d+)-(\d+)$")
+
+
+def range_filepath(filepath: str, offset: int, length: int) -> str:
+    """Return the path identifying a byte range of a contribution file.
+
+    Parameters
+    ----------
+    filepath : `str`
+        Path of the contribution file
+    offset : `int`
+        Offset of the range
+    length : `int`
+        Length of the range, in bytes
+
+    Returns
+    -------
+    filepath : `str`
+        Path of the contribution file, with a range query
+
+    """
+    return f"{filepath}?{_RANGE_QUERY}={offset}-{offset + length - 1}"
+
+
+def split_range_filepath(filepath: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+    """Split the byte range of a contribution file path.
+
+    Parameters
+    ----------
+    filepath : `str`
+        Path of the contribution file, with an optional range query
+
+    Returns
+    -------
+    filepath : `str`
+        Path of the contribution file
+    byte_range : `Tuple[int, int]`, optional
+        Offset and length of the range, None if the path is not a range
+
+    """
+    m = _RANGE_SUFFIX.search(filepath)
+    if m is None:
+        return filepath, None
+    first, last = int(m.group(1)), int(m.group(2))
+    return filepath[: m.start()], (first, last - first + 1)
+
+
+def parse_range_query(query: str) -> Optional[Tuple[int, int]]:
+    """Return the byte range of an URL query, see `range_filepath`.
+
+    Parameters
+    ----------
+    query : `str`
+        Query part of an URL
+
+    Returns
+    -------
+    byte_range : `Tuple[int, int]`, optional
+        Offset and length of the range, None if there is no range
+
+    Raises
+    ------
+    ValueError
+        Raised if the range is invalid
+
+    """
+    values = urllib.parse.parse_qs(query).get(_RANGE_QUERY)
+    if not values:
+        return None
+    first, sep, last = values[0].partition("-")
+    if not sep or not first.isdigit() or not last.isdigit() or int(last) < int(first):
+        raise ValueError(f"Invalid range: {values[0]}")
+    return int(first), int(last) - int(first) + 1
+
+
+def is_splittable(filepath: str) -> bool:
+    """Return True if a contribution file can be split, i.e. if it is served
+    as is by data servers, not decompressed or converted on the fly."""
+    _, compression = split_compression_ext(filepath)
+    return compression is None and not filepath.endswith(f".{PARQUET}")
+
+
+class FileSplitter:
+    """Split contribution files larger than a given size into byte ranges
+    which end on line boundaries.
+
+    Parameters
+    ----------
+    lb_url : `LoadBalancedURL`
+        Input data path
+    split_size : `int`
+        Size, in bytes, above which contribution files are split, it is also
+        the approximate size of the ranges
+    workers : `int`
+        Maximum number of contribution files split concurrently
+
+    """
+
+    def __init__(self, lb_url: LoadBalancedURL, split_size: int, workers: int = DEFAULT_WORKERS):
+        if split_size <= 0:
+            raise ValueError(f"Invalid split size: {split_size}")
+        self.lb_url = lb_url
+        self.split_size = split_size
+        self.workers = workers
+        self._sessions = ThreadLocalSession()
+
+    def _size(self, url: str) -> Optional[int]:
+        """Return the size of a file, None if it is unknown."""
+        try:
+            size = file_size(self._sessions.current(), url)
+        except (OSError, requests.RequestException) as e:
+            _LOG.warning("Unable to retrieve size of %s: %s", url, e)
+            return None
+        if size is None:
+            _LOG.warning("Unable to retrieve size of %s: no Content-Length", url)
+        return size
+
+    def _read(self, url: str, offset: int, length: int) -> bytes:
+        split_url = urllib.parse.urlsplit(url, scheme="file")
+        if split_url.scheme == "file":
+            with open(split_url.path, "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        headers = {"Range": f"bytes={offset}-{offset + length - 1}", "Accept-Encoding": "identity"}
+        with self._sessions.current().get(url, headers=headers, stream=True) as r:
+            r.raise_for_status()
+            if r.status_code != 206 and offset != 0:
+                raise IngestError(f"Data server does not support byte ranges for {url}")
+            return r.raw.read(length)
+
+    def _line_end(self, url: str, position: int, size: int) -> int:
+        """Return the offset following the first end of line located at or
+        after a given position, or the file size if there is none."""
+        offset = position
+        while offset < size:
+            data = self._read(url, offset, min(_WINDOW_SIZE, size - offset))
+            i = data.find(b"\n")
+            if i != -1:
+                return offset + i + 1
+            if not data:
+                break
+            offset += len(data)
+        return size
+
+    def ranges(self, filepath: str, size: int) -> List[Tuple[int, int]]:
+        """Compute the byte ranges of a contribution file.
+
+        Parameters
+        ----------
+        filepath : `str`
+            Path of the contribution file, relative to input data path
+        size : `int`
+            Size of the file, in bytes
+
+        Returns
+        -------
+        ranges : `List[Tuple[int, int]]`
+            Offset and length of each range, a single range if the file is not
+            larger than split size
+
+        """
+        if size <= self.split_size:
+            return [(0, size)]
+        url = LoadBalancedURL.new(self.lb_url, filepath).get()
+        ranges = []
+        start = 0
+        while start < size:
+            if size - start <= self.split_size:
+                end = size
+            else:
+                # A range ends after the end of line which contains its last
+                # expected byte
+                end = self._line_end(url, start + self.split_size - 1, size)
+            ranges.append((start, end - start))
+            start = end
+        _LOG.debug("Split %s in %s ranges", filepath, len(ranges))
+        return ranges
+
+    def _split(self, contrib_spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+        filepath = contrib_spec["filepath"]
+        size = contrib_spec.get("size")
+        if not is_splittable(filepath):
+            return [contrib_spec]
+        if size is None:
+            size = self._size(LoadBalancedURL.new(self.lb_url, filepath).get())
+            if size is None:
+                # Left to preflight checks
+                return [contrib_spec]
+        if size <= self.split_size:
+            return [dict(contrib_spec, size=size)]
+        return [
+            dict(contrib_spec, filepath=range_filepath(filepath, offset, length), size=length)
+            for offset, length in self.ranges(filepath, size)
+        ]
+
+    def split_all(self, contrib_specs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace the specifications of oversized contribution files by the
+        specifications of their ranges, concurrently.
+
+        Parameters
+        ----------
+        contrib_specs : `Iterable[Dict[str, Any]]`
+            Contribution specifications, see
+            `metadata.TableContributionsSpec.get_contrib`, the size of files
+            whose ``size`` is not set is retrieved from the data servers
+
+        Returns
+        -------
+        contrib_specs : `List[Dict[str, Any]]`
+            Contribution specifications, chunk id and overlap flag of the
+            ranges are those of their file, and their ``size`` is set if it
+            is known
+
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return [s for specs in executor.map(self._split, contrib_specs) for s in specs]
@@ -34,8 +34,9 @@ import getpass
 import json
 import logging
 import os
+import threading
 import urllib.parse
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 # ----------------------------
 # Imports for other modules --
@@ -48,6 +49,7 @@ from urllib3.util import Retry
 
 from . import util, version
 from .exception import IngestError, ReplicationControllerError
+from .httpcache import HttpCache
 
 DEFAULT_AUTH_PATH = "~/.lsst/qserv"
 DEFAULT_TIMEOUT_READ_SEC = 300.0
@@ -59,6 +61,9 @@ DEFAULT_TIMEOUT_WRITE_SEC = 600.0
 _DEFAULT_CONNECTION_TIMEOUT = 5.0
 _MAX_RETRY_ATTEMPTS = 3
 
+# Timeout, in seconds, of HEAD requests sent to data servers
+_HEAD_TIMEOUT_SEC = 30.0
+
 _LOG = logging.getLogger(__name__)
 
 
@@ -76,7 +81,61 @@ def file_exists(url: str) -> bool:
     return response.status_code == 200
 
 
-def json_load(base_url: str, filename: str) -> Dict[Any, Any]:
+class ThreadLocalSession:
+    """Provide a `requests.Session` to each thread, as sessions can not be
+    shared between threads.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def current(self) -> requests.Session:
+        """Return the session of the current thread."""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+
+def file_size(session: requests.Session, url: str) -> Optional[int]:
+    """Return the size of a file, with ``stat`` for a local file and a HEAD
+    request for a file served over http(s).
+
+    Parameters
+    ----------
+    session : `requests.Session`
+        Session used for the HEAD request
+    url : `str`
+        URL of the file, with file:// or http(s):// scheme, default to file://
+
+    Returns
+    -------
+    size : `int`, optional
+        Size of the file in bytes, None if the server does not provide it
+
+    Raises
+    ------
+    OSError
+        If the local file can not be accessed
+    requests.RequestException
+        If the HEAD request fails, or does not return status 200
+
+    """
+    split_url = urllib.parse.urlsplit(url, scheme="file")
+    if split_url.scheme == "file":
+        return os.stat(split_url.path).st_size
+    r = session.head(url, timeout=_HEAD_TIMEOUT_SEC, allow_redirects=True)
+    if r.status_code != 200:
+        raise requests.HTTPError(f"HTTP error {r.status_code}", response=r)
+    content_length = r.headers.get("Content-Length")
+    return int(content_length) if content_length is not None else None
+
+
+def json_load(
+    base_url: str,
+    filename: str,
+    cache: Optional[HttpCache] = None,
+    object_hook: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Dict[Any, Any]:
     """Load a JSON file located at a given URL.
 
     Parameters
@@ -85,6 +144,10 @@ def json_load(base_url: str, filename: str) -> Dict[Any, Any]:
         JSON file location
     filename: `str`
         JSON file name
+    cache: `HttpCache`, optional
+        Cache for files served over http(s)
+    object_hook: `Callable`, optional
+        Called on each decoded JSON object, see `json.load`
 
     Returns
     -------
@@ -100,11 +163,13 @@ def json_load(base_url: str, filename: str) -> Dict[Any, Any]:
     str_url = urllib.parse.urljoin(util.trailing_slash(base_url), filename)
     url = urllib.parse.urlsplit(str_url, scheme="file")
     if url.scheme in ["http", "https"]:
+        if cache is not None:
+            return json.loads(cache.get(str_url), object_hook=object_hook)
         r = requests.get(str_url)
-        return r.json()
+        return r.json(object_hook=object_hook)
     elif url.scheme == "file":
         with open(url.path, "r") as f:
-            return json.load(f)
+            return json.load(f, object_hook=object_hook)
     else:
         raise IngestError("Unsupported URI scheme for ", url)
 
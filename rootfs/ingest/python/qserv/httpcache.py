@@ -0,0 +1,193 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""On-disk cache for files downloaded from the input data servers.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+import requests
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+# Time, in seconds, during which a cached file is served without revalidation
+DEFAULT_MAX_AGE_SEC = 60.0
+
+_OBJECTS_DIR = "objects"
+_INDEX_DIR = "index"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write a file so that concurrent readers never see it partially
+    written."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class HttpCache:
+    """Content-addressed cache of files served over HTTP, revalidated with
+    conditional GET requests.
+
+    File contents are stored under their SHA-256 digest, and an index entry
+    for each URL records the digest and the validators (``ETag`` and
+    ``Last-Modified``) returned by the server. The cache directory can be
+    shared by several processes, e.g. on a persistent volume, because all
+    files are written atomically.
+
+    An entry revalidated less than ``max_age_sec`` ago is served without
+    contacting the server, so that many pods starting at once do not all
+    send requests. If the server is unreachable, or returns a server error,
+    the cached content is served whatever its age.
+
+    Parameters
+    ----------
+    cache_dir : `str`
+        Cache directory, created if needed
+    max_age_sec : `float`
+        Time, in seconds, during which a cached file is served without
+        revalidation
+
+    """
+
+    def __init__(self, cache_dir: str, max_age_sec: float = DEFAULT_MAX_AGE_SEC):
+        self.cache_dir = cache_dir
+        self.max_age_sec = max_age_sec
+        os.makedirs(os.path.join(cache_dir, _OBJECTS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, _INDEX_DIR), exist_ok=True)
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, _INDEX_DIR, _sha256(url.encode()) + ".json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, _OBJECTS_DIR, digest)
+
+    def _read_entry(self, entry_path: str) -> Optional[Dict[str, Any]]:
+        """Return the index entry for an URL, or None if it does not exist or
+        if its content has been removed."""
+        try:
+            with open(entry_path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._object_path(entry["sha256"])):
+            return None
+        return entry
+
+    def _read_object(self, digest: str) -> bytes:
+        with open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def get(self, url: str) -> bytes:
+        """Return the content of a file, from the cache if it is up to date,
+        else from the server.
+
+        Parameters
+        ----------
+        url : `str`
+            File URL
+
+        Returns
+        -------
+        content : `bytes`
+            File content
+
+        Raises
+        ------
+        requests.RequestException
+            Raised if the file is not in cache and can not be downloaded, or
+            if the server returns a client error
+
+        """
+        entry_path = self._entry_path(url)
+        entry = self._read_entry(entry_path)
+        if entry is not None and time.time() - os.path.getmtime(entry_path) < self.max_age_sec:
+            return self._read_object(entry["sha256"])
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            r = requests.get(url, headers=headers)
+        except requests.RequestException as e:
+            if entry is None:
+                raise
+            _LOG.warning("Unable to revalidate %s, use cached version: %s", url, e)
+            return self._read_object(entry["sha256"])
+
+        if r.status_code == 304:
+            if entry is None:
+                # Not requested, the response has no content
+                raise requests.HTTPError(f"Unexpected 304 response for {url}, not in cache", response=r)
+            _LOG.debug("Cached version of %s is up to date", url)
+            # Restart the freshness period
+            os.utime(entry_path)
+            return self._read_object(entry["sha256"])
+        try:
+            r.raise_for_status()
+        except requests.HTTPError as e:
+            if entry is None or r.status_code < 500:
+                raise
+            _LOG.warning("Unable to revalidate %s, use cached version: %s", url, e)
+            return self._read_object(entry["sha256"])
+
+        content = r.content
+        digest = _sha256(content)
+        if not os.path.exists(self._object_path(digest)):
+            _write_atomic(self._object_path(digest), content)
+        new_entry = {
+            "url": url,
+            "sha256": digest,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+        }
+        _write_atomic(entry_path, json.dumps(new_entry).encode())
+        return content
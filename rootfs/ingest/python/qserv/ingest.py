@@ -29,6 +29,7 @@
 # -------------------------------
 #  Imports of standard modules --
 # -------------------------------
+import json
 import logging
 import time
 from enum import Enum, auto
@@ -37,12 +38,13 @@ from typing import Dict, List, Optional, Tuple
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
-from .contribqueue import QueueManager
+from .contribqueue import QueueManager, RequeueFilter
 from .contribution import Contribution
 from .exception import IngestError
 from .ingestconfig import IngestServiceConfig
 from .jsonparser import DatabaseStatus
 from .metadata import ContributionMetadata
+from .preflight import DEFAULT_WORKERS, FileCheck, PreflightChecker
 from .replicationclient import ReplicationClient
 
 # ---------------------------------
@@ -153,6 +155,56 @@ class Ingester:
             )
         _LOG.info("All contributions in queue successfully ingested")
 
+    def requeue(self, criteria: RequeueFilter, dry_run: bool = False) -> int:
+        """Release locked contribution files whose super-transaction has been
+        aborted, so that they are ingested again.
+
+        Parameters
+        ----------
+        criteria : `RequeueFilter`
+            Criteria selecting contribution files to release
+        dry_run : `bool`
+            Only count contribution files which would be released
+
+        Returns
+        -------
+        count : `int`
+            Number of released contribution files
+
+        """
+        if self.queue_manager is None:
+            raise IngestError("Unitialized queue manager")
+        trans = self.repl_client.get_transactions_aborted(self.contrib_meta.database)
+        _LOG.info("Only contributions of aborted transactions are released: %s", trans)
+        return self.queue_manager.requeue_contribfiles(criteria, trans, dry_run)
+
+    def preflight(self, workers: int = DEFAULT_WORKERS) -> List[FileCheck]:
+        """Check that all contribution files which have not been ingested yet
+        exist and are not empty, and record their size and failures in queue,
+        before ingest starts.
+
+        Parameters
+        ----------
+        workers : `int`
+            Maximum number of contribution files checked concurrently
+
+        Returns
+        -------
+        failures : `List[FileCheck]`
+            Contribution files which can not be ingested
+
+        """
+        if self.queue_manager is None:
+            raise IngestError("Unitialized queue manager")
+        contribfiles = self.queue_manager.select_preflight_contribfiles()
+        checker = PreflightChecker(self.contrib_meta.lb_url, workers)
+        checks = checker.check_all(contribfiles)
+        self.queue_manager.record_preflight(checks)
+        failures = [c for c in checks if c.error is not None]
+        for c in failures:
+            _LOG.error("Contribution file %s for table %s: %s", c.url, c.table, c.error)
+        return failures
+
     def database_publish(self) -> None:
         """Publish a Qserv database inside replication system."""
         database = self.contrib_meta.database
@@ -173,7 +225,7 @@ class Ingester:
         felis: `dict`, optional
             Felis schema for tables. Defaults to None.
         """
-        self.repl_client.database_register(self.contrib_meta._json_db)
+        self.repl_client.database_register(self.contrib_meta.json_db)
         self.repl_client.database_register_tables(self.contrib_meta.ordered_tables_json, felis)
         self.repl_client.database_config(self.contrib_meta.database, replication_config)
 
@@ -202,6 +254,9 @@ class Ingester:
         has_non_ingested_contributions = True
         while has_non_ingested_contributions:
             has_non_ingested_contributions = self._ingest_transaction()
+            if self.queue_manager.metrics is not None:
+                _LOG.info("Queue metrics: %s", json.dumps(self.queue_manager.metrics.snapshot()))
+                _LOG.info("Queue connection pool: %s", json.dumps(self.queue_manager.pool_stats()))
 
     def index(self, secondary: bool = False) -> None:
         """Index Qserv MySQL sharded tables or create secondary index."""
@@ -311,9 +366,11 @@ class Ingester:
 
         transaction_id: Optional[int] = None
         ingest_success: bool = False
+        contributions: List[Contribution] = []
         try:
             transaction_id = self.repl_client.start_transaction(self.contrib_meta.database)
             _LOG.info("Start ingest transaction %s", transaction_id)
+            self.queue_manager.set_transaction_id(transaction_id)
             contributions = self._build_contributions(contribfiles_locked)
 
             ingest_success = self._ingest_all_contributions(transaction_id, contributions)
@@ -333,7 +390,7 @@ class Ingester:
             # Consider that transaction has not been opened
             # if transaction_id is None and so unlock contribution files
             # in any case (success or failure failure)
-            self.queue_manager.unlock_contribfiles(ingest_success)
+            self.queue_manager.unlock_contribfiles(ingest_success, transaction_id, contributions)
         continue_ingest = True
         return continue_ingest
 
@@ -34,16 +34,17 @@ import dataclasses
 import logging
 import os
 import sys
+import urllib.parse
 from dataclasses import dataclass, fields
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
 
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
-from . import http, version
-from .loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
+from . import http, httpcache, version
+from .loadbalancerurl import HealthAwareLoadBalancerAlgorithm, LoadBalancedURL, LoadBalancerAlgorithm
 
 # ---------------------------------
 # Local non-exported definitions --
@@ -51,6 +52,10 @@ from .loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
 _LOG = logging.getLogger(__name__)
 _MIN_SUPPORTED_VERSION = 15
 
+# Load balancing strategies for data servers
+ROUND_ROBIN = "round-robin"
+HEALTH_AWARE = "health-aware"
+
 CWD = os.path.dirname(os.path.abspath(__file__))
 DATADIR = os.path.join(CWD, "testdata")
 
@@ -72,7 +77,33 @@ class IngestConfig:
 
         self.servers = ingest_dict["input"]["servers"]
         self.datapath = ingest_dict["input"]["path"]
-        if "metadata" in ingest_dict:
+        # Optional, selection of the data server for each contribution
+        lb_cfg = ingest_dict["input"].get("loadbalancer", {})
+        self.loadbalancer = LoadBalancerConfig(
+            strategy=lb_cfg.get("strategy"),
+            max_failures=lb_cfg.get("max_failures"),
+            cooldown=lb_cfg.get("cooldown"),
+            locality=lb_cfg.get("locality"),
+        )
+        # Optional, size in bytes above which contribution files are split
+        # into several contributions
+        self.split_size: Optional[int] = ingest_dict["input"].get("split_size")
+        if self.split_size is not None and self.split_size <= 0:
+            _LOG.critical("Invalid split size: %s", self.split_size)
+            sys.exit(1)
+        # Byte ranges are only served by 'replctl serve' data servers
+        urls = self.servers if self.servers else [self.datapath]
+        if self.split_size is not None and any(
+            urllib.parse.urlsplit(url, scheme="file").scheme == "file" for url in urls
+        ):
+            _LOG.critical("Split size requires http(s) input data servers: %s", urls)
+            sys.exit(1)
+        # Optional, local cache for metadata files
+        self.metadata_cache_dir: Optional[str] = ingest_dict.get("metadata", {}).get("cache_dir")
+        self.metadata_cache_max_age: float = ingest_dict.get("metadata", {}).get(
+            "cache_max_age", httpcache.DEFAULT_MAX_AGE_SEC
+        )
+        if "metadata" in ingest_dict and "url" in ingest_dict["metadata"]:
             self.metadata_url = ingest_dict["metadata"]["url"]
         else:
             lbAlgo = LoadBalancerAlgorithm(self.servers)
@@ -85,6 +116,16 @@ class IngestConfig:
         self.queue_url = ingest_dict["qserv"]["queue_url"]
         self.replication_url = ingest_dict["qserv"]["replication_url"]
 
+        # Optional, connection pool of the queue database
+        pool_cfg = ingest_dict.get("queue", {}).get("pool", {})
+        self.queue_pool = QueuePoolConfig(
+            size=pool_cfg.get("size"),
+            max_overflow=pool_cfg.get("max_overflow"),
+            timeout=pool_cfg.get("timeout"),
+            recycle=pool_cfg.get("recycle"),
+            pre_ping=pool_cfg.get("pre_ping"),
+        )
+
         # Section name changed in v15 from "ingest" -> "ingestservice"
         ingestcfg = ingest_dict.get("ingestservice")
         if ingestcfg is not None:
@@ -167,6 +208,111 @@ class IngestServiceConfig:
                 setattr(self, field.name, field.default)
 
 
+@dataclass
+class QueuePoolConfig:
+    """Connection pool parameters for the queue database, see SQLAlchemy
+    `create_engine` documentation for details
+
+    Default value for all parameters are kept, in case `None` value is used in
+    constructor
+
+    Parameters
+    ----------
+    size : `int`
+        Number of connections kept open in the pool
+        Default value: 5
+    max_overflow : `int`
+        Number of connections which can be opened above ``size``
+        Default value: 10
+    timeout : `int`
+        Time, in seconds, to wait for a connection to be available
+        Default value: 30
+    recycle : `int`
+        Time, in seconds, after which a connection is replaced
+        Default value: 3600
+    pre_ping : `bool`
+        Test connections when they are checked out, and replace stale ones
+        Default value: True
+    """
+
+    size: int = 5
+    max_overflow: int = 10
+    timeout: int = 30
+    recycle: int = 3600
+    pre_ping: bool = True
+
+    def __post_init__(self) -> None:
+        """Set default value for all parameters, in case `None` value is used
+        in constructor."""
+        for field in fields(self):
+            if not isinstance(field.default, dataclasses._MISSING_TYPE) and getattr(self, field.name) is None:
+                setattr(self, field.name, field.default)
+
+
+@dataclass
+class LoadBalancerConfig:
+    """Selection of the data server providing each input file
+
+    Default value for all parameters are kept, in case `None` value is used in
+    constructor
+
+    Parameters
+    ----------
+    strategy : `str`
+        "round-robin", or "health-aware" to select servers according to their
+        recent throughput and temporarily stop using failing servers
+        Default value: "round-robin"
+    max_failures : `int`
+        Number of consecutive read failures after which a server is not used,
+        for "health-aware" strategy
+        Default value: 3
+    cooldown : `float`
+        Time, in seconds, during which a failing server is not used, for
+        "health-aware" strategy
+        Default value: 60
+    locality : `Dict[str, List[str]]`
+        Preferred data servers, indexed by Qserv worker host pattern (see
+        `fnmatch`), other data servers are used if no pattern matches
+        Default value: {}
+    """
+
+    strategy: str = ROUND_ROBIN
+    max_failures: int = 3
+    cooldown: float = 60.0
+    locality: Optional[Dict[str, List[str]]] = None
+
+    def __post_init__(self) -> None:
+        """Set default value for all parameters, in case `None` value is used
+        in constructor."""
+        for field in fields(self):
+            if not isinstance(field.default, dataclasses._MISSING_TYPE) and getattr(self, field.name) is None:
+                setattr(self, field.name, field.default)
+        if self.locality is None:
+            self.locality = {}
+        if self.strategy not in (ROUND_ROBIN, HEALTH_AWARE):
+            _LOG.critical("Unsupported load balancing strategy: %s", self.strategy)
+            sys.exit(1)
+
+    def new_algorithm(self, servers: List[str]) -> LoadBalancerAlgorithm:
+        """Create the load balancing algorithm for data servers.
+
+        Parameters
+        ----------
+        servers : `List[str]`
+            Data servers URLs
+
+        Returns
+        -------
+        algorithm : `LoadBalancerAlgorithm`
+            Load balancing algorithm
+        """
+        if self.strategy == HEALTH_AWARE:
+            return HealthAwareLoadBalancerAlgorithm(
+                servers, self.max_failures, self.cooldown, locality=self.locality
+            )
+        return LoadBalancerAlgorithm(servers, self.locality)
+
+
 class IngestConfigAction(argparse.Action):
     """Argparse action to read an ingest client configuration file."""
 
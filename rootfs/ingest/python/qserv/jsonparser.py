@@ -32,7 +32,7 @@ import logging
 #  Imports of standard modules --
 # -------------------------------
 from enum import Enum
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 # ----------------------------
 # Imports for other modules --
@@ -113,6 +113,12 @@ class ContributionMonitor:
     retry_allowed: bool
     """ True if the contribution can be retried """
 
+    num_bytes: int
+    """ Number of bytes read from the input file """
+
+    read_sec: Optional[float]
+    """ Time, in seconds, spent reading the input file, None if unknown """
+
     def __init__(self, response_json: dict):
 
         json_contrib = response_json["contrib"]
@@ -150,6 +156,13 @@ class ContributionMonitor:
 
         self.retry_allowed = bool(int(json_contrib["retry_allowed"]))
 
+        # Timestamps are in milliseconds, read_time is 0 until the input file
+        # has been read
+        self.num_bytes = int(json_contrib.get("num_bytes", 0))
+        start_time = int(json_contrib.get("start_time", 0))
+        read_time = int(json_contrib.get("read_time", 0))
+        self.read_sec = (read_time - start_time) / 1000 if start_time and read_time > start_time else None
+
 
 def filter_transactions(responseJson: Dict, database: str, states: List[TransactionState]) -> List[int]:
     """Filter transactions by state inside json response issued by replication
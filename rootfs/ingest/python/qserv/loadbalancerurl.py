@@ -30,9 +30,14 @@
 # -------------------------------
 from __future__ import annotations
 
+import fnmatch
 import logging
+import random
+import threading
+import time
 import urllib.parse
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
 # ----------------------------
 # Imports for other modules --
@@ -45,24 +50,202 @@ _LOG = logging.getLogger(__name__)
 
 
 class LoadBalancerAlgorithm:
-    """Load balancing algorithm for accessing http servers."""
+    """Load balancing algorithm for accessing http servers.
+
+    Servers are selected with round-robin. An optional locality map restricts
+    the selection, for a given Qserv worker, to the servers which are close to
+    it on the network.
+
+    Parameters
+    ----------
+    loadbalancers : `List[str]`
+        Servers URLs
+    locality : `Dict[str, List[str]]`, optional
+        Preferred servers, indexed by worker host pattern (see `fnmatch`), the
+        first pattern matching a worker host applies
+
+    Raises
+    ------
+    ValueError
+        Raised if a preferred server is not in the servers list
+
+    """
 
     count: int
     loadbalancers: List[str]
 
-    def __init__(self, loadbalancers: List[str]):
+    def __init__(self, loadbalancers: List[str], locality: Optional[Dict[str, List[str]]] = None):
         self.count = 0
         self.loadbalancers = loadbalancers
+        self.locality = locality if locality is not None else {}
+        for pattern, servers in self.locality.items():
+            unknown = [s for s in servers if s not in loadbalancers]
+            if unknown:
+                raise ValueError(f"Unknown data servers {unknown} for worker pattern {pattern}")
+        # Round-robin counters for the preferred servers of each pattern
+        self._locality_counts: Dict[str, int] = {}
+
+    def preferred(self, worker_host: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+        """Return the servers to use for a worker.
 
-    def get(self) -> Optional[str]:
-        loadbalancers_count = len(self.loadbalancers)
+        Parameters
+        ----------
+        worker_host : `str`, optional
+            Host of the Qserv worker which reads the file
+
+        Returns
+        -------
+        pattern : `str`, optional
+            Locality pattern matching the worker host, None if there is none
+        servers : `List[str]`
+            Preferred servers of the worker, all servers if there is no
+            matching pattern
+
+        """
+        if worker_host is not None:
+            for pattern, servers in self.locality.items():
+                if servers and fnmatch.fnmatchcase(worker_host, pattern):
+                    return pattern, servers
+        return None, self.loadbalancers
+
+    def get(self, worker_host: Optional[str] = None) -> Optional[str]:
+        pattern, servers = self.preferred(worker_host)
+        loadbalancers_count = len(servers)
         if loadbalancers_count == 0:
             url = None
-        else:
-            url = self.loadbalancers[self.count % loadbalancers_count]
+        elif pattern is None:
+            url = servers[self.count % loadbalancers_count]
             self.count += 1
+        else:
+            count = self._locality_counts.get(pattern, 0)
+            url = servers[count % loadbalancers_count]
+            self._locality_counts[pattern] = count + 1
         return url
 
+    def record(self, server: str, success: bool, num_bytes: int = 0, duration_sec: float = 0.0) -> None:
+        """Record the outcome of a file transfer from a server, ignored by
+        round-robin load balancing.
+
+        Parameters
+        ----------
+        server : `str`
+            Server returned by `get`
+        success : `bool`
+            False if the file could not be read from the server
+        num_bytes : `int`
+            Number of bytes transferred
+        duration_sec : `float`
+            Duration of the transfer, in seconds
+
+        """
+        pass
+
+
+@dataclass
+class ServerHealth:
+    """Recent outcomes of the transfers from a server."""
+
+    throughput: Optional[float] = None
+    """ Moving average of the transfer throughput, in bytes per second """
+
+    failures: int = 0
+    """ Number of consecutive failed transfers """
+
+    down_until: float = 0.0
+    """ Time until which the server is not used, see `time.monotonic` """
+
+
+class HealthAwareLoadBalancerAlgorithm(LoadBalancerAlgorithm):
+    """Load balancing algorithm which selects servers according to their
+    recent throughput, and which temporarily stops using failing servers.
+
+    Servers are selected randomly, with a probability proportional to their
+    throughput, a server without throughput yet has the average throughput of
+    the others so that it is tried. Round-robin is used when no throughput is
+    known. A server is not used during ``cooldown_sec`` after
+    ``max_failures`` consecutive failed transfers, unless all servers are
+    down.
+
+    Preferred servers of a worker, defined by the locality map, are used
+    while at least one of them is up, the other servers are used otherwise.
+
+    Parameters
+    ----------
+    loadbalancers : `List[str]`
+        Servers URLs
+    max_failures : `int`
+        Number of consecutive failures after which a server is not used
+    cooldown_sec : `float`
+        Time, in seconds, during which a failing server is not used
+    smoothing : `float`
+        Weight of the latest transfer in the throughput moving average
+    locality : `Dict[str, List[str]]`, optional
+        Preferred servers, indexed by worker host pattern
+
+    """
+
+    def __init__(
+        self,
+        loadbalancers: List[str],
+        max_failures: int = 3,
+        cooldown_sec: float = 60.0,
+        smoothing: float = 0.3,
+        locality: Optional[Dict[str, List[str]]] = None,
+    ):
+        super().__init__(loadbalancers, locality)
+        self.max_failures = max_failures
+        self.cooldown_sec = cooldown_sec
+        self.smoothing = smoothing
+        self.health: Dict[str, ServerHealth] = {server: ServerHealth() for server in loadbalancers}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def get(self, worker_host: Optional[str] = None) -> Optional[str]:
+        if len(self.loadbalancers) == 0:
+            return None
+        _, preferred = self.preferred(worker_host)
+        now = time.monotonic()
+        with self._lock:
+            servers = [s for s in preferred if self.health[s].down_until <= now]
+            if len(servers) == 0:
+                servers = [s for s in self.loadbalancers if self.health[s].down_until <= now]
+            if len(servers) == 0:
+                servers = preferred
+            throughputs = [self.health[s].throughput for s in servers]
+            known = [t for t in throughputs if t is not None]
+            if len(known) == 0:
+                url = servers[self.count % len(servers)]
+                self.count += 1
+                return url
+            default = sum(known) / len(known)
+            weights = [default if t is None else t for t in throughputs]
+            return self._random.choices(servers, weights)[0]
+
+    def record(self, server: str, success: bool, num_bytes: int = 0, duration_sec: float = 0.0) -> None:
+        with self._lock:
+            health = self.health.get(server)
+            if health is None:
+                return
+            if not success:
+                health.failures += 1
+                if health.failures >= self.max_failures:
+                    _LOG.warning(
+                        "Data server %s is not used during %ss after %s consecutive failures",
+                        server,
+                        self.cooldown_sec,
+                        health.failures,
+                    )
+                    health.down_until = time.monotonic() + self.cooldown_sec
+                    health.failures = 0
+                return
+            health.failures = 0
+            if num_bytes > 0 and duration_sec > 0:
+                throughput = num_bytes / duration_sec
+                if health.throughput is None:
+                    health.throughput = throughput
+                else:
+                    health.throughput = self.smoothing * throughput + (1 - self.smoothing) * health.throughput
+
 
 class LoadBalancedURL:
     """Manage http(s) load balanced URL. Support http:// https:// and file://
@@ -96,6 +279,8 @@ class LoadBalancedURL:
 
         url = urllib.parse.urlsplit(self.direct_url, scheme="file")
         self.counter = lbAlgo
+        # Server used by the latest call to get(), if any
+        self.server: Optional[str] = None
         self.url_path = url.path
         self.loadBalancerAlgorithm = None
         if url.scheme in ["http", "https"]:
@@ -108,15 +293,38 @@ class LoadBalancedURL:
     def __repr__(self) -> str:
         return f"LoadBalancedURL({self.__dict__})"
 
-    def get(self) -> str:
+    def get(self, worker_host: Optional[str] = None) -> str:
+        """Return the URL of the file, on the server selected by the load
+        balancing algorithm.
+
+        Parameters
+        ----------
+        worker_host : `str`, optional
+            Host of the Qserv worker which reads the file, used to select a
+            server close to it
+
+        Returns
+        -------
+        url : `str`
+            URL of the file
+        """
         if self.loadBalancerAlgorithm is not None:
-            lbUrl = self.loadBalancerAlgorithm.get()
+            lbUrl = self.loadBalancerAlgorithm.get(worker_host)
         if self.loadBalancerAlgorithm is None or lbUrl is None:
             url = self.direct_url
+            self.server = None
         else:
             url = urllib.parse.urljoin(lbUrl, self.url_path)
+            self.server = lbUrl
         return url
 
+    def record(self, success: bool, num_bytes: int = 0, duration_sec: float = 0.0) -> None:
+        """Record the outcome of the transfer of the file from the server
+        returned by the latest call to `get`, see
+        `LoadBalancerAlgorithm.record`."""
+        if self.loadBalancerAlgorithm is not None and self.server is not None:
+            self.loadBalancerAlgorithm.record(self.server, success, num_bytes, duration_sec)
+
     @classmethod
     def new(cls, lb_url: LoadBalancedURL, filepath: str) -> LoadBalancedURL:
         url_path = lb_url.url_path.rstrip("/") + "/" + filepath.strip("/")
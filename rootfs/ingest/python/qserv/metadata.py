@@ -25,16 +25,21 @@
 
 """
 
+import bisect
 import logging
+import os
 import sys
 import urllib.parse
+from array import array
 
 # -------------------------------
 #  Imports of standard modules --
 # -------------------------------
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, overload
 
 from qserv.loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
 
@@ -42,7 +47,10 @@ from qserv.loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
 # Imports for other modules --
 # ----------------------------
 from . import version
+from .chunkindex import ChunkIndex, load_chunk_index
+from .exception import IngestError
 from .http import json_load
+from .httpcache import HttpCache
 
 CSV = "csv"
 TSV = "tsv"
@@ -51,16 +59,137 @@ EXT_LIST: List[str] = [CSV, TSV, TXT]
 """List of supported input data file extensions
 """
 
+GZ = "gz"
+ZST = "zst"
+COMPRESSION_EXT_LIST: List[str] = [GZ, ZST]
+"""List of supported compressed input data file extensions, e.g. chunk_1.txt.gz
+"""
+
 # ---------------------------------
 # Local non-exported definitions --
 # ---------------------------------
 _CHUNKS: str = "chunks"
+_CHUNK_SIZES: str = "chunk_sizes"
+_CHUNK_INDEX: str = "chunk_index"
+_COMPRESSION: str = "compression"
 _FILES: str = "files"
+_FILE_SIZES: str = "file_sizes"
 _METADATA_FILENAME: str = "metadata.json"
 _MIN_SUPPORTED_VERSION = 12
+# Metadata version adding range encoded chunk lists, e.g. ["1-5", 7, "9-12"]
+_CHUNK_RANGES_VERSION = 13
 _OVERLAPS: str = "overlaps"
+_OVERLAP_SIZES: str = "overlap_sizes"
 _LOG = logging.getLogger(__name__)
 
+# Maximum number of metadata files loaded concurrently
+_JSON_LOAD_WORKERS = 8
+
+# Type code of the arrays storing chunk ids, i.e. unsigned 32 bits integers
+_CHUNK_ID_TYPECODE = "I"
+# Type code of the arrays storing file sizes, i.e. unsigned 64 bits integers
+_FILE_SIZE_TYPECODE = "Q"
+
+
+class ChunkRanges(Sequence[int]):
+    """Chunk ids stored as ranges of consecutive ids, which are expanded on
+    access.
+
+    Parameters
+    ----------
+    items : `List[Union[int, str]]`
+        Chunk ids, or ranges of chunk ids with bounds included, e.g.
+        ``["57866-57870", 57900]``
+
+    Raises
+    ------
+    IngestError
+        Raised if a range is not formatted as "<first>-<last>", with
+        first <= last
+
+    """
+
+    def __init__(self, items: List[Union[int, str]]):
+        self._starts = array(_CHUNK_ID_TYPECODE)
+        self._stops = array(_CHUNK_ID_TYPECODE)
+        # Number of chunk ids before each range
+        self._offsets = array("Q")
+        count = 0
+        for item in items:
+            try:
+                if isinstance(item, str):
+                    first, last = (int(bound) for bound in item.split("-"))
+                else:
+                    first = last = int(item)
+            except ValueError:
+                raise IngestError("Invalid chunk range in metadata", item)
+            if first > last:
+                raise IngestError("Invalid chunk range in metadata", item)
+            self._starts.append(first)
+            self._stops.append(last + 1)
+            self._offsets.append(count)
+            count += last + 1 - first
+        self._len = count
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for (start, stop) in zip(self._starts, self._stops):
+            yield from range(start, stop)
+
+    @overload
+    def __getitem__(self, index: int) -> int:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[int]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, Sequence[int]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("chunk index out of range")
+        i = bisect.bisect_right(self._offsets, index) - 1
+        return self._starts[i] + index - self._offsets[i]
+
+
+def _compact_chunk_lists(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace chunk id and file size lists of a decoded ``data`` entry of
+    metadata.json by compact arrays, or by `ChunkRanges` if they contain
+    ranges.
+
+    Used as a JSON decoder object hook, so that each list is converted as soon
+    as it is decoded, and all chunk ids of a catalog are never stored as
+    Python integers at the same time.
+    """
+    for key in (_CHUNKS, _OVERLAPS):
+        chunk_ids = obj.get(key)
+        if isinstance(chunk_ids, list):
+            if any(isinstance(c, str) for c in chunk_ids):
+                obj[key] = ChunkRanges(chunk_ids)
+            else:
+                obj[key] = array(_CHUNK_ID_TYPECODE, chunk_ids)
+    for key in (_CHUNK_SIZES, _OVERLAP_SIZES, _FILE_SIZES):
+        sizes = obj.get(key)
+        if isinstance(sizes, list):
+            obj[key] = array(_FILE_SIZE_TYPECODE, sizes)
+    return obj
+
+
+def _json_load_all(
+    base_url: str, filenames: List[str], cache: Optional[HttpCache] = None
+) -> List[Dict[Any, Any]]:
+    """Load concurrently JSON files located at a given URL, and return them
+    in the order of ``filenames``."""
+    if len(filenames) <= 1:
+        return [json_load(base_url, f, cache) for f in filenames]
+    with ThreadPoolExecutor(max_workers=min(_JSON_LOAD_WORKERS, len(filenames))) as executor:
+        return list(executor.map(lambda f: json_load(base_url, f, cache), filenames))
+
 
 @dataclass
 class FileFormat:
@@ -90,6 +219,67 @@ class FileFormat:
     lines_terminated_by: Optional[str] = None
 
 
+def split_compression_ext(filepath: str) -> Tuple[str, Optional[str]]:
+    """Split the compression extension of an input data file path.
+
+    Parameters
+    ----------
+    filepath : `str`
+        Input data file path, e.g. chunk_1.txt.gz
+
+    Returns
+    -------
+    filepath : `str`
+        Path of the uncompressed file, e.g. chunk_1.txt
+    compression : `str`, optional
+        Compression extension, in `COMPRESSION_EXT_LIST`, None if the file is
+        not compressed
+
+    """
+    root, ext = os.path.splitext(filepath)
+    ext = ext.lstrip(".")
+    if ext in COMPRESSION_EXT_LIST:
+        return root, ext
+    return filepath, None
+
+
+def default_fileformats() -> Dict[str, FileFormat]:
+    """Input data file formats used if metadata do not define them
+
+    Returns
+    -------
+    fileformats: `Dict[str, FileFormat]`
+        File format for each supported file extension
+    """
+    fileformats: Dict[str, FileFormat] = {}
+    for ext in EXT_LIST:
+        if ext == CSV:
+            fields_terminated_by = ","
+        elif ext == TSV:
+            fields_terminated_by = "\\t"
+        else:
+            fields_terminated_by = None
+        fileformats[ext] = FileFormat(fields_terminated_by=fields_terminated_by)
+    return fileformats
+
+
+def _get_size(sizes: Optional[Sequence[int]], index: int) -> Optional[int]:
+    """Return a file size recorded in metadata, None if it is unknown."""
+    return None if sizes is None else sizes[index]
+
+
+def _sizes(d: Dict[str, Any], key: str, items: Sequence[Any]) -> Optional[Sequence[int]]:
+    """Return the file sizes of a ``data`` entry of metadata.json, None if they
+    are missing or do not match the listed items."""
+    sizes = d.get(key)
+    if sizes is None:
+        return None
+    if len(sizes) != len(items):
+        _LOG.warning("Ignore %s of directory %s, which do not match listed files", key, d["directory"])
+        return None
+    return sizes
+
+
 @dataclass
 class TableContributionsSpec:
     """Contain contribution specification for a given table and for a given
@@ -114,16 +304,40 @@ class TableContributionsSpec:
     files: List[str]
     """ Files for regular tables, empty for partitioned tables """
 
-    chunks: List[int]
+    chunks: Sequence[int]
     """Chunks ids for files for partitioned tables,
     empty for non-partitioned tables
     """
 
-    chunks_overlap: List[int]
+    chunks_overlap: Sequence[int]
     """Chunks ids for overlap files for partioned tables,
     empty for non-partitioned tables
     """
 
+    chunk_index: Optional[ChunkIndex] = None
+    """Rows counts of each chunk, if a partitioner chunk index is available
+    """
+
+    compression: Optional[str] = None
+    """Compression extension of chunk files, e.g. "gz" for chunk_1.txt.gz,
+    None if chunk files are not compressed
+    """
+
+    file_sizes: Optional[Sequence[int]] = None
+    """Sizes, in bytes, of files for regular tables, in the order of
+    ``files``, None if they are unknown
+    """
+
+    chunk_sizes: Optional[Sequence[int]] = None
+    """Sizes, in bytes, of chunk files, in the order of ``chunks``, None if
+    they are unknown
+    """
+
+    overlap_sizes: Optional[Sequence[int]] = None
+    """Sizes, in bytes, of overlap files, in the order of ``chunks_overlap``,
+    None if they are unknown
+    """
+
     def get_contrib(self) -> Generator[Dict[str, Any], None, None]:
         """Generator for contribution specifications for a given table and a
         given path.
@@ -131,40 +345,49 @@ class TableContributionsSpec:
         Yields
         ------
         data: `Iterator[List[dict()]]`
-            Iterator on each contribution specifications for a table
+            Iterator on each contribution specifications for a table, with
+            the file size recorded in metadata, None if it is unknown
 
         """
         data: Dict[str, Any]
-        for file in self.files:
+        for i, file in enumerate(self.files):
             data = {
                 "chunk_id": None,
                 "database": self.database,
                 "filepath": self._filepath(file),
                 "is_overlap": None,
                 "table": self.table,
+                "size": _get_size(self.file_sizes, i),
             }
             yield data
 
-        for id in self.chunks:
+        for i, id in enumerate(self.chunks):
             data = {
                 "chunk_id": id,
                 "database": self.database,
-                "filepath": self._filepath(f"chunk_{id}.txt"),
+                "filepath": self._filepath(self._chunk_filename(f"chunk_{id}.txt")),
                 "is_overlap": False,
                 "table": self.table,
+                "size": _get_size(self.chunk_sizes, i),
             }
             yield data
 
-        for id in self.chunks_overlap:
+        for i, id in enumerate(self.chunks_overlap):
             data = {
                 "chunk_id": id,
                 "database": self.database,
-                "filepath": self._filepath(f"chunk_{id}_overlap.txt"),
+                "filepath": self._filepath(self._chunk_filename(f"chunk_{id}_overlap.txt")),
                 "is_overlap": True,
                 "table": self.table,
+                "size": _get_size(self.overlap_sizes, i),
             }
             yield data
 
+    def _chunk_filename(self, filename: str) -> str:
+        if self.compression is None:
+            return filename
+        return f"{filename}.{self.compression}"
+
     def _filepath(self, filename: str) -> str:
         filepath = self.base_path.strip("/") + "/" + filename.strip("/")
         return filepath
@@ -173,6 +396,9 @@ class TableContributionsSpec:
 class TableSpec:
     """Contain table specifications.
 
+    The table schema is loaded at creation, index files and contribution
+    specifications are loaded on first access.
+
     Parameters:
     -----------
     metadata_url : `str`
@@ -180,44 +406,118 @@ class TableSpec:
         configuration files for R-I service
     table_meta : `Dict`
         metadata for a table
+    cache : `HttpCache`, optional
+        Cache for metadata files served over http(s)
+    data_url : `str`, optional
+        url of input data, used to access partitioner chunk indexes,
+        default to ``metadata_url``
 
     """
 
-    def __init__(self, metadata_url: str, table_meta: Dict):
+    def __init__(
+        self,
+        metadata_url: str,
+        table_meta: Dict,
+        cache: Optional[HttpCache] = None,
+        data_url: Optional[str] = None,
+    ):
 
+        self._metadata_url = metadata_url
+        self._data_url = data_url if data_url is not None else metadata_url
+        self._cache = cache
+        self.idx_files: List[str] = table_meta.get("indexes", [])
         self.data: List[Any] = table_meta["data"]
         schema_file: str = table_meta["schema"]
-        self.json_schema: Dict[Any, Any] = json_load(metadata_url, schema_file)
+        self.json_schema: Dict[Any, Any] = json_load(metadata_url, schema_file, cache)
         self.name: str = self.json_schema["table"]
         self.database: str = self.json_schema["database"]
         self.is_partitioned: bool = self.json_schema["is_partitioned"] == 1
         self.is_director: bool = self._is_director()
-        idx_files: List[str] = table_meta.get("indexes", [])
-        self.json_indexes: List[Dict[str, Any]] = []
-        for f in idx_files:
-            self.json_indexes.append(json_load(metadata_url, f))
 
-        self.contrib_specs: List[TableContributionsSpec] = []
-        for d in self.data:
+    @cached_property
+    def json_indexes(self) -> List[Dict[str, Any]]:
+        """Index specifications for the table, in R-I service format"""
+        return _json_load_all(self._metadata_url, self.idx_files, self._cache)
+
+    @cached_property
+    def contrib_specs(self) -> List[TableContributionsSpec]:
+        """Contribution specifications for the table, one for each input data
+        directory
+
+        Chunk ids of a directory are listed in metadata, or read from the
+        partitioner chunk index of the directory if its file name is set
+        instead, chunk indexes of all directories are loaded concurrently.
+        """
+        chunk_indexes = self._load_chunk_indexes()
+        contrib_specs: List[TableContributionsSpec] = []
+        for d, chunk_index in zip(self.data, chunk_indexes):
             path = d["directory"]
-            chunks = []
-            chunks_overlap = []
+            chunks: Sequence[int] = []
+            chunks_overlap: Sequence[int] = []
             files = []
+            chunk_sizes: Optional[Sequence[int]] = None
+            overlap_sizes: Optional[Sequence[int]] = None
+            file_sizes: Optional[Sequence[int]] = None
+            compression = d.get(_COMPRESSION)
+            if compression is not None and compression not in COMPRESSION_EXT_LIST:
+                raise IngestError(f"Unsupported compression {compression} for directory {path}")
+            # Compressed files are decompressed by 'replctl serve' data servers
+            data_scheme = urllib.parse.urlsplit(self._data_url, scheme="file").scheme
+            if compression is not None and data_scheme == "file":
+                raise IngestError(f"Compressed directory {path} requires http(s) input data servers")
             if self.is_partitioned:
-                chunks = d[_CHUNKS]
+                if chunk_index is not None and _CHUNKS not in d:
+                    chunks = chunk_index.chunk_ids
+                else:
+                    chunks = d[_CHUNKS]
+                    chunk_sizes = _sizes(d, _CHUNK_SIZES, chunks)
                 # Only director tables can have (extra) overlaps
                 if self.is_director:
                     # chunk ids for overlaps might be different
                     # of regular chunk ids
                     if d.get(_OVERLAPS):
                         chunks_overlap = d[_OVERLAPS]
+                        overlap_sizes = _sizes(d, _OVERLAP_SIZES, chunks_overlap)
+                    elif chunk_index is not None:
+                        chunks_overlap = chunk_index.overlap_chunk_ids
                     else:
-                        chunks_overlap = d[_CHUNKS]
+                        chunks_overlap = chunks
             else:
                 files = d[_FILES]
-            self.contrib_specs.append(
-                TableContributionsSpec(path, self.database, self.name, files, chunks, chunks_overlap)
+                file_sizes = _sizes(d, _FILE_SIZES, files)
+            contrib_specs.append(
+                TableContributionsSpec(
+                    path,
+                    self.database,
+                    self.name,
+                    files,
+                    chunks,
+                    chunks_overlap,
+                    chunk_index,
+                    compression,
+                    file_sizes,
+                    chunk_sizes,
+                    overlap_sizes,
+                )
             )
+        return contrib_specs
+
+    def _load_chunk_indexes(self) -> List[Optional[ChunkIndex]]:
+        """Load the partitioner chunk index of each input data directory,
+        None for directories which do not declare one."""
+
+        def load(d: Dict[str, Any]) -> Optional[ChunkIndex]:
+            filename = d.get(_CHUNK_INDEX) if self.is_partitioned else None
+            if not filename:
+                return None
+            path = d["directory"].strip("/") + "/" + filename
+            return load_chunk_index(self._data_url, path, self._cache)
+
+        declared = sum(1 for d in self.data if d.get(_CHUNK_INDEX))
+        if declared <= 1:
+            return [load(d) for d in self.data]
+        with ThreadPoolExecutor(max_workers=min(_JSON_LOAD_WORKERS, declared)) as executor:
+            return list(executor.map(load, self.data))
 
     def _is_director(self) -> bool:
         is_director: bool = False
@@ -235,6 +535,9 @@ class ContributionMetadata:
 
     database, tables and contribution files
 
+    Metadata files are loaded on first access and then cached, so that each
+    ingest step only retrieves the files it uses.
+
     """
 
     def __init__(
@@ -243,6 +546,8 @@ class ContributionMetadata:
         datapath: str,
         loadbalancers: List[str] = [],
         auto_build_secondary_index: Optional[int] = None,
+        cache: Optional[HttpCache] = None,
+        lb_algorithm: Optional[LoadBalancerAlgorithm] = None,
     ):
         """Retrieve and store metadata located at 'path' and describing:
 
@@ -256,33 +561,43 @@ class ContributionMetadata:
         ----------
         metadata_url : `str`
             Path to metadata
+        cache : `HttpCache`, optional
+            Cache for metadata files served over http(s)
+        lb_algorithm : `LoadBalancerAlgorithm`, optional
+            Selection of the data server for each input file, round-robin
+            over ``loadbalancers`` if not set
         """
-        self._database: str
-        self._json_db: Dict[str, Any] = {}
-        self.fileformats: Dict[str, FileFormat] = {}
-        self._tableSpecs: List[TableSpec]
+        self._auto_build_secondary_index = auto_build_secondary_index
+        self._cache = cache
 
-        lbAlgo = LoadBalancerAlgorithm(loadbalancers)
+        lbAlgo = lb_algorithm if lb_algorithm is not None else LoadBalancerAlgorithm(loadbalancers)
         self.lb_url = LoadBalancedURL(datapath, lbAlgo)
 
         self.metadata_url = metadata_url
-        # FIXME not all steps require to load full metadata.json
-        self.metadata = json_load(self.metadata_url, _METADATA_FILENAME)
-        self._check_version()
 
-        filename = self.metadata["database"]
-        self._json_db = json_load(self.metadata_url, filename)
-        # Override metadata value for parameter "auto_build_secondary_index"
-        # with ingest.yaml parameter value
-        if auto_build_secondary_index is not None:
-            self._json_db["auto_build_secondary_index"] = auto_build_secondary_index
-        # In Kubernetes context, "1" is a better default value
-        # for this parameter
-        self._json_db["local_load_secondary_index"] = self._json_db.get("local_load_secondary_index", 1)
-        self._database = self._json_db["database"]
-        self.family = "layout_{}_{}".format(self._json_db["num_stripes"], self._json_db["num_sub_stripes"])
-        self._init_tables()
-        self._init_fileformats()
+    @cached_property
+    def metadata(self) -> Dict[str, Any]:
+        """Content of the metadata file, i.e. metadata.json
+
+        Returns
+        -------
+        metadata: `Dict[str, Any]`
+            Metadata for the database, its tables and their input data
+        """
+        metadata = json_load(self.metadata_url, _METADATA_FILENAME, self._cache, _compact_chunk_lists)
+        self._check_version(metadata)
+        return metadata
+
+    @property
+    def family(self) -> str:
+        """Getter for the family property
+
+        Returns
+        -------
+        family: `str`
+            Name of the database family in the replication service
+        """
+        return "layout_{}_{}".format(self.json_db["num_stripes"], self.json_db["num_sub_stripes"])
 
     @property
     def database(self) -> str:
@@ -293,7 +608,7 @@ class ContributionMetadata:
         database: `str`
             List of tables specification available in metadata file
         """
-        return self._database
+        return self.json_db["database"]
 
     @property
     def charset_name(self) -> str:
@@ -307,18 +622,32 @@ class ContributionMetadata:
         """
         return self.metadata.get("charset_name", "")
 
-    @property
+    @cached_property
     def tableSpecs(self) -> List[TableSpec]:
         """Getter for the tableSpecs property
 
         Returns
         -------
         tableSpecs: List[TableSpec]
-            List of table specifications available in metadata file
+            List of table specifications available in metadata file,
+            director tables are at the beginning of the list
         """
-        return self._tableSpecs
+        tables_meta = self.metadata["tables"]
+        data_url = self.lb_url.direct_url
+        # Table schemas are loaded concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(_JSON_LOAD_WORKERS, len(tables_meta)))) as executor:
+            tables = list(
+                executor.map(lambda t: TableSpec(self.metadata_url, t, self._cache, data_url), tables_meta)
+            )
+        tableSpecs: List[TableSpec] = []
+        for table in tables:
+            if table.is_director:
+                tableSpecs.insert(0, table)
+            else:
+                tableSpecs.append(table)
+        return tableSpecs
 
-    @property
+    @cached_property
     def json_db(self) -> Dict[str, Any]:
         """Getter for the json_db property
 
@@ -327,13 +656,22 @@ class ContributionMetadata:
         json_db: Dict[str, Any]
             Database configuration issued from json configuration
         """
-        return self._json_db
+        filename = self.metadata["database"]
+        json_db = json_load(self.metadata_url, filename, self._cache)
+        # Override metadata value for parameter "auto_build_secondary_index"
+        # with ingest.yaml parameter value
+        if self._auto_build_secondary_index is not None:
+            json_db["auto_build_secondary_index"] = self._auto_build_secondary_index
+        # In Kubernetes context, "1" is a better default value
+        # for this parameter
+        json_db["local_load_secondary_index"] = json_db.get("local_load_secondary_index", 1)
+        return json_db
 
-    def _check_version(self) -> None:
+    def _check_version(self, metadata: Dict[str, Any]) -> None:
         """Check metadata file version and exit if its value is not supported"""
         fileversion = None
-        if "version" in self.metadata:
-            fileversion = self.metadata["version"]
+        if "version" in metadata:
+            fileversion = metadata["version"]
 
         if fileversion is None or fileversion < _MIN_SUPPORTED_VERSION:
             _LOG.critical(
@@ -346,6 +684,15 @@ class ContributionMetadata:
             sys.exit(1)
         _LOG.info("Metadata file version: %s", fileversion)
 
+        if fileversion < _CHUNK_RANGES_VERSION:
+            for table_meta in metadata.get("tables", []):
+                for d in table_meta.get("data", []):
+                    if isinstance(d.get(_CHUNKS), ChunkRanges) or isinstance(d.get(_OVERLAPS), ChunkRanges):
+                        raise IngestError(
+                            f"Chunk ranges require metadata file version {_CHUNK_RANGES_VERSION}",
+                            self.metadata_url,
+                        )
+
     @property
     def table_contribs_spec(self) -> Generator[TableContributionsSpec, None, None]:
         """Generator for contribution specifications for the whole database.
@@ -359,7 +706,7 @@ class ContributionMetadata:
             Iterator on each contribution specifications for a database
 
         """
-        for table in self._tableSpecs:
+        for table in self.tableSpecs:
             yield from table.contrib_specs
 
     def file_url(self, path: str) -> str:
@@ -376,16 +723,16 @@ class ContributionMetadata:
             List of table names available in metadata file
         """
         table_names = []
-        for t in self._tableSpecs:
+        for t in self.tableSpecs:
             table_names.append(t.name)
         return table_names
 
-    @property
+    @cached_property
     def json_indexes(self) -> List[Dict[str, Any]]:
-        json_indexes: List[Dict] = []
-        for tbl in self._tableSpecs:
-            json_indexes.extend(tbl.json_indexes)
-        return json_indexes
+        """Index specifications for all tables, director tables first, index
+        files of all tables are loaded concurrently"""
+        idx_files = [f for tbl in self.tableSpecs for f in tbl.idx_files]
+        return _json_load_all(self.metadata_url, idx_files, self._cache)
 
     @property
     def ordered_tables_json(self) -> List[Dict[Any, Any]]:
@@ -401,34 +748,24 @@ class ContributionMetadata:
 
         """
         schema_files = []
-        for t in self._tableSpecs:
+        for t in self.tableSpecs:
             schema_files.append(t.json_schema)
         return schema_files
 
-    def _init_tables(self) -> None:
-        self._tableSpecs = []
-        self._has_extra_overlaps = False
-        for table_meta in self.metadata["tables"]:
-            table = TableSpec(self.metadata_url, table_meta)
-            if table.is_director:
-                self._tableSpecs.insert(0, table)
-            else:
-                self._tableSpecs.append(table)
+    @cached_property
+    def fileformats(self) -> Dict[str, FileFormat]:
+        """Input data file formats, indexed by file extension
 
-    def _init_fileformats(self) -> None:
+        Returns
+        -------
+        fileformats: `Dict[str, FileFormat]`
+            File format for each supported file extension
+        """
+        fileformats = default_fileformats()
         format = self.metadata.get("formats")
         if format:
             for ext in EXT_LIST:
                 format_spec = format.get(ext)
                 if format_spec:
-                    self.fileformats[ext] = FileFormat(**format_spec)
-
-        for ext in EXT_LIST:
-            if self.fileformats.get(ext) is None:
-                if ext == CSV:
-                    fields_terminated_by = ","
-                elif ext == TSV:
-                    fields_terminated_by = "\\t"
-                else:
-                    fields_terminated_by = None
-                self.fileformats[ext] = FileFormat(fields_terminated_by=fields_terminated_by)
+                    fileformats[ext] = FileFormat(**format_spec)
+        return fileformats
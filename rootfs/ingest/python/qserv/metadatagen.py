@@ -0,0 +1,300 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Generate metadata.json by scanning the input data tree produced by the
+partitioner.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import html
+import logging
+import os
+import posixpath
+import re
+import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+import requests
+
+from . import util
+from .exception import IngestError
+from .http import ThreadLocalSession, file_size, json_load
+from .metadata import CSV, EXT_LIST, TXT, split_compression_ext
+from .parquetstream import PARQUET
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+# Maximum number of directories listed concurrently
+DEFAULT_WORKERS = 16
+
+_CHUNK_FILE = re.compile(r"^chunk_(\d+)\.txt$")
+_OVERLAP_FILE = re.compile(r"^chunk_(\d+)_overlap\.txt$")
+
+# Entry of an HTML directory index, i.e. a link optionally followed by its
+# modification date and its size, as rendered by nginx autoindex
+_HTML_ENTRY = re.compile(r'<a href="([^"]+)">[^<]*</a>(?:[ \t]+\S+[ \t]+\S+[ \t]+(\d+|-))?')
+
+
+@dataclass
+class FileEntry:
+    """File or sub-directory of a directory index."""
+
+    name: str
+    is_dir: bool
+    size: Optional[int] = None
+
+
+@dataclass
+class DirectoryContent:
+    """Input data files found in a directory."""
+
+    directory: str
+    """ Directory path, relative to the input data root """
+
+    chunks: Dict[int, int] = field(default_factory=dict)
+    """ Size of chunk files, indexed by chunk id """
+
+    overlaps: Dict[int, int] = field(default_factory=dict)
+    """ Size of overlap files, indexed by chunk id """
+
+    files: Dict[str, int] = field(default_factory=dict)
+    """ Size of regular data files, indexed by file name """
+
+    compression: Optional[str] = None
+    """ Compression extension of chunk and overlap files, None if they are
+    not compressed """
+
+
+def _list_local(path: str) -> List[FileEntry]:
+    entries = []
+    with os.scandir(path) as it:
+        for e in it:
+            is_dir = e.is_dir()
+            entries.append(FileEntry(e.name, is_dir, None if is_dir else e.stat().st_size))
+    return entries
+
+
+def _list_http(session: requests.Session, url: str) -> List[FileEntry]:
+    """List a directory served over http(s), the server must provide an
+    index, either in HTML or in JSON (nginx ``autoindex_format json``).
+    File sizes are None if the index does not provide them in bytes."""
+    r = session.get(url)
+    r.raise_for_status()
+    entries: List[FileEntry] = []
+    if "json" in r.headers.get("Content-Type", ""):
+        for item in r.json():
+            is_dir = item["type"] == "directory"
+            entries.append(FileEntry(item["name"], is_dir, item.get("size")))
+        return entries
+
+    for m in _HTML_ENTRY.finditer(r.text):
+        href = html.unescape(m.group(1))
+        # Skip parent directory, sort links and links outside the directory
+        if href.startswith(("?", "/", "../", ".")) or "://" in href:
+            continue
+        name = urllib.parse.unquote(href)
+        is_dir = name.endswith("/")
+        size = m.group(2)
+        entries.append(
+            FileEntry(name.rstrip("/"), is_dir, int(size) if size is not None and size.isdigit() else None)
+        )
+    return entries
+
+
+class InputScanner:
+    """Scan the input data tree, directories are listed concurrently.
+
+    Parameters
+    ----------
+    data_url : `str`
+        Root of the input data, with file:// or http(s):// scheme, default
+        to file://
+    workers : `int`
+        Maximum number of directories listed concurrently
+
+    """
+
+    def __init__(self, data_url: str, workers: int = DEFAULT_WORKERS):
+        self.data_url = util.trailing_slash(data_url)
+        self.workers = workers
+        url = urllib.parse.urlsplit(self.data_url, scheme="file")
+        if url.scheme not in ["file", "http", "https"]:
+            raise IngestError("Unsupported URI scheme for ", self.data_url)
+        self._scheme = url.scheme
+        self._root_path = url.path
+        self._sessions = ThreadLocalSession()
+
+    def _url(self, directory: str) -> str:
+        if not directory:
+            return self.data_url
+        return urllib.parse.urljoin(self.data_url, urllib.parse.quote(util.trailing_slash(directory)))
+
+    def _list(self, directory: str) -> List[FileEntry]:
+        if self._scheme == "file":
+            return _list_local(os.path.join(self._root_path, directory))
+        return _list_http(self._sessions.current(), self._url(directory))
+
+    def _size(self, directory: str, entry: FileEntry) -> int:
+        """Return the size of a file, retrieved with a HEAD request if the
+        directory index does not provide it."""
+        if entry.size is None:
+            url = urllib.parse.urljoin(self._url(directory), urllib.parse.quote(entry.name))
+            entry.size = file_size(self._sessions.current(), url) or 0
+        return entry.size
+
+    def _scan_directory(self, directory: str) -> Tuple[DirectoryContent, List[str]]:
+        content = DirectoryContent(directory)
+        subdirectories = []
+        for e in self._list(directory):
+            if e.is_dir:
+                subdirectories.append(posixpath.join(directory, e.name))
+                continue
+            name, compression = split_compression_ext(e.name)
+            filename = e.name
+            root, ext = os.path.splitext(name)
+            if ext == f".{PARQUET}" and compression is None:
+                # Parquet files are converted by the data server, and
+                # requested under the name of the text file
+                name = filename = f"{root}.{TXT if root.startswith('chunk_') else CSV}"
+            m = _CHUNK_FILE.match(name)
+            chunks = content.chunks
+            if m is None:
+                m = _OVERLAP_FILE.match(name)
+                chunks = content.overlaps
+            if m:
+                if (content.chunks or content.overlaps) and compression != content.compression:
+                    raise IngestError(
+                        f"Compressed and uncompressed chunk files are mixed in directory {directory}"
+                    )
+                content.compression = compression
+                chunks[int(m.group(1))] = self._size(directory, e)
+                continue
+            if os.path.splitext(name)[1].lstrip(".") in EXT_LIST:
+                content.files[filename] = self._size(directory, e)
+        return content, subdirectories
+
+    def scan(self) -> List[DirectoryContent]:
+        """Walk the input data tree.
+
+        Returns
+        -------
+        contents : `List[DirectoryContent]`
+            Input data files of each directory, sorted by directory path
+
+        """
+        contents: List[DirectoryContent] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending: Set[Future] = {executor.submit(self._scan_directory, "")}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    content, subdirectories = future.result()
+                    contents.append(content)
+                    for d in subdirectories:
+                        pending.add(executor.submit(self._scan_directory, d))
+        _LOG.info("Scanned %s directories in %s", len(contents), self.data_url)
+        return sorted(contents, key=lambda c: c.directory)
+
+
+def generate_metadata(
+    metadata_url: str, template: Dict[str, Any], contents: List[DirectoryContent]
+) -> Dict[str, Any]:
+    """Fill the data section of each table of a metadata file with scanned
+    input data files.
+
+    The partitioner writes the chunk files of each table in a directory named
+    after the table, so directories containing chunk files are assigned to
+    the partitioned table having their name. Data files of regular tables are
+    assigned to the table having their name, without extension. Compressed
+    files are recorded with their compression extension, Parquet files with
+    the extension of the text file they are converted to, and with the size
+    of the Parquet file.
+
+    Parameters
+    ----------
+    metadata_url : `str`
+        url of metadata, used to access tables' json configuration files
+    template : `Dict[str, Any]`
+        Content of the metadata file, i.e. metadata.json, existing data
+        sections are replaced
+    contents : `List[DirectoryContent]`
+        Input data files of each directory
+
+    Returns
+    -------
+    metadata : `Dict[str, Any]`
+        Content of the metadata file, file sizes are recorded along with
+        chunk ids and file names
+
+    """
+    metadata = dict(template)
+    tables = []
+    for table_meta in template["tables"]:
+        json_schema = json_load(metadata_url, table_meta["schema"])
+        name = json_schema["table"]
+        data: List[Dict[str, Any]] = []
+        if json_schema["is_partitioned"] == 1:
+            for c in contents:
+                if posixpath.basename(c.directory) != name or not (c.chunks or c.overlaps):
+                    continue
+                chunks = sorted(c.chunks)
+                d: Dict[str, Any] = {
+                    "directory": c.directory,
+                    "chunks": chunks,
+                    "chunk_sizes": [c.chunks[i] for i in chunks],
+                }
+                # Director tables without overlap ids use chunk ids instead
+                if c.overlaps:
+                    overlaps = sorted(c.overlaps)
+                    d["overlaps"] = overlaps
+                    d["overlap_sizes"] = [c.overlaps[i] for i in overlaps]
+                if c.compression is not None:
+                    d["compression"] = c.compression
+                data.append(d)
+        else:
+            for c in contents:
+                files = sorted(f for f in c.files if os.path.splitext(split_compression_ext(f)[0])[0] == name)
+                if files:
+                    data.append(
+                        {
+                            "directory": c.directory,
+                            "files": files,
+                            "file_sizes": [c.files[f] for f in files],
+                        }
+                    )
+        if not data:
+            _LOG.warning("No input data found for table %s", name)
+        tables.append(dict(table_meta, data=data))
+    metadata["tables"] = tables
+    return metadata
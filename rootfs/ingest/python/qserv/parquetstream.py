@@ -0,0 +1,203 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Convert Parquet input data files to delimited text files which can be
+loaded by mariadb 'LOAD DATA INFILE' statement.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import codecs
+import datetime
+import decimal
+import json
+import logging
+import math
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Union
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+from .exception import MissingDependencyError
+from .metadata import FileFormat
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+PARQUET = "parquet"
+"""Extension of Parquet input data files
+"""
+
+# Number of rows converted at once, i.e. bounds the memory used by the
+# conversion of large row groups
+DEFAULT_BATCH_SIZE = 65536
+
+# Mariadb 'LOAD DATA INFILE' defaults
+_DEFAULT_FIELDS_TERMINATED_BY = "\t"
+_DEFAULT_FIELDS_ESCAPED_BY = "\\"
+_DEFAULT_LINES_TERMINATED_BY = "\n"
+
+
+def _unescape(value: Optional[str], default: str) -> str:
+    """Return the characters of a 'LOAD DATA INFILE' option, which is
+    written in metadata with SQL escape sequences, e.g. "\\\\t"."""
+    if value is None:
+        return default
+    return codecs.decode(value, "unicode_escape")
+
+
+@dataclass(frozen=True)
+class TextFormat:
+    """Delimiters of a text file, as actual characters, and formatting of
+    values with mariadb 'LOAD DATA INFILE' conventions.
+
+    NULL and NaN values are written ``\\N`` and the special characters of
+    strings are escaped with the ``fields_escaped_by`` character. Nested
+    values are written in JSON.
+    """
+
+    fields_terminated_by: str = _DEFAULT_FIELDS_TERMINATED_BY
+    fields_enclosed_by: str = ""
+    fields_escaped_by: str = _DEFAULT_FIELDS_ESCAPED_BY
+    lines_terminated_by: str = _DEFAULT_LINES_TERMINATED_BY
+
+    @classmethod
+    def from_fileformat(cls, fileformat: Optional[FileFormat]) -> "TextFormat":
+        """Build text delimiters from a file format, unset options use mariadb
+        defaults."""
+        if fileformat is None:
+            return cls()
+        return cls(
+            _unescape(fileformat.fields_terminated_by, _DEFAULT_FIELDS_TERMINATED_BY),
+            _unescape(fileformat.fields_enclosed_by, ""),
+            _unescape(fileformat.fields_escaped_by, _DEFAULT_FIELDS_ESCAPED_BY),
+            _unescape(fileformat.lines_terminated_by, _DEFAULT_LINES_TERMINATED_BY),
+        )
+
+    @property
+    def null(self) -> str:
+        """Representation of NULL values"""
+        return f"{self.fields_escaped_by}N" if self.fields_escaped_by else "NULL"
+
+    @cached_property
+    def _specials(self) -> List[str]:
+        """Characters which must be escaped in strings, except the escape
+        character itself"""
+        specials = {self.fields_terminated_by[:1], self.lines_terminated_by[:1], self.fields_enclosed_by}
+        specials.add("\0")
+        return [c for c in specials if c and c != self.fields_escaped_by]
+
+    def escape(self, value: str) -> str:
+        """Escape the special characters of a string."""
+        esc = self.fields_escaped_by
+        if not esc:
+            return value
+        # Escape character first, so that added escape characters are kept
+        value = value.replace(esc, esc * 2)
+        for c in self._specials:
+            # NUL character is written as \0
+            value = value.replace(c, esc + ("0" if c == "\0" else c))
+        return value
+
+    def format_value(self, value: Any) -> str:
+        """Return the text of a value."""
+        if value is None:
+            return self.null
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, float):
+            return self.null if math.isnan(value) else repr(value)
+        if isinstance(value, (int, decimal.Decimal)):
+            return str(value)
+        if isinstance(value, datetime.datetime):
+            text = value.isoformat(sep=" ")
+        elif isinstance(value, (datetime.date, datetime.time)):
+            text = value.isoformat()
+        elif isinstance(value, bytes):
+            text = self.escape(value.decode(errors="replace"))
+        elif isinstance(value, (list, dict)):
+            text = self.escape(json.dumps(value, default=str))
+        else:
+            text = self.escape(str(value))
+        return f"{self.fields_enclosed_by}{text}{self.fields_enclosed_by}"
+
+    def format_rows(self, columns: List[List[Any]]) -> bytes:
+        """Return the text of rows, provided column by column."""
+        format_value: Callable[[Any], str] = self.format_value
+        lines = [
+            self.fields_terminated_by.join(map(format_value, row)) + self.lines_terminated_by
+            for row in zip(*columns)
+        ]
+        return "".join(lines).encode()
+
+
+class ParquetConverter:
+    """Stream a Parquet file as delimited text, batch by batch, so that the
+    memory used does not depend on row groups size.
+
+    Parameters
+    ----------
+    source : `str` or `BinaryIO`
+        Parquet file path, or file object
+    fileformat : `FileFormat`, optional
+        Format of the text file, default to mariadb defaults
+    batch_size : `int`
+        Number of rows converted at once
+
+    Raises
+    ------
+    MissingDependencyError
+        Raised if the pyarrow module is not installed
+
+    """
+
+    def __init__(
+        self,
+        source: Union[str, BinaryIO],
+        fileformat: Optional[FileFormat] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        if pq is None:
+            raise MissingDependencyError("pyarrow", "convert Parquet files")
+        self.parquet_file = pq.ParquetFile(source)
+        self.text_format = TextFormat.from_fileformat(fileformat)
+        self.batch_size = batch_size
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the text of each batch of rows."""
+        rows = 0
+        for batch in self.parquet_file.iter_batches(batch_size=self.batch_size):
+            yield self.text_format.format_rows([column.to_pylist() for column in batch.columns])
+            rows += batch.num_rows
+        _LOG.debug("Converted %s rows from Parquet", rows)
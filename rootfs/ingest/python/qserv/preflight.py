@@ -0,0 +1,157 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Check contribution files are available before ingest starts.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+import requests
+
+from . import metadata
+from .filesplit import split_range_filepath
+from .http import ThreadLocalSession, file_size
+from .loadbalancerurl import LoadBalancedURL
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+# Maximum number of contribution files checked concurrently
+DEFAULT_WORKERS = 32
+
+
+@dataclass
+class FileCheck:
+    """Outcome of the check of a contribution file."""
+
+    table: str
+    """ Table name """
+
+    filepath: str
+    """ Path of the contribution file, relative to input data path """
+
+    url: str
+    """ URL which has been checked """
+
+    size: Optional[int] = None
+    """ File size in bytes, None if it is unknown """
+
+    error: Optional[str] = None
+    """ Error message, None if the file can be ingested """
+
+
+class PreflightChecker:
+    """Check existence and size of contribution files, with ``stat`` for local
+    files and HEAD requests for files served over http(s).
+
+    URLs are built like those sent to the replication service, so that
+    requests are spread across all load balancers and compressed files are
+    checked under the name requested by workers.
+
+    Parameters
+    ----------
+    lb_url : `LoadBalancedURL`
+        Input data path
+    workers : `int`
+        Maximum number of contribution files checked concurrently
+
+    """
+
+    def __init__(self, lb_url: LoadBalancedURL, workers: int = DEFAULT_WORKERS):
+        self.lb_url = lb_url
+        self.workers = workers
+        self._sessions = ThreadLocalSession()
+
+    def check(self, table: str, filepath: str) -> FileCheck:
+        """Check a contribution file.
+
+        Parameters
+        ----------
+        table : `str`
+            Table name
+        filepath : `str`
+            Path of the contribution file, relative to input data path
+
+        Returns
+        -------
+        check : `FileCheck`
+            Size of the file, or of its byte range for a split file, or error
+            if it can not be ingested
+
+        """
+        # The file of a byte range is checked, see `filesplit`
+        path, byte_range = split_range_filepath(filepath)
+        # Compressed files are served under the name of the uncompressed file,
+        # see `contribution.Contribution`
+        uncompressed_filepath, _ = metadata.split_compression_ext(path)
+        url = LoadBalancedURL.new(self.lb_url, uncompressed_filepath).get()
+        result = FileCheck(table, filepath, url)
+        try:
+            result.size = file_size(self._sessions.current(), url)
+        except requests.HTTPError as e:
+            result.error = str(e)
+            return result
+        except (OSError, requests.RequestException) as e:
+            result.error = f"{type(e).__name__}: {e}"
+            return result
+        if byte_range is not None and result.size is not None:
+            (offset, length) = byte_range
+            if offset + length > result.size:
+                result.error = f"Byte range exceeds file size: {result.size}"
+                return result
+            result.size = length
+        if result.size == 0:
+            result.error = "Empty file"
+        return result
+
+    def check_all(self, contribfiles: Iterable[Tuple[str, str]]) -> List[FileCheck]:
+        """Check contribution files concurrently.
+
+        Parameters
+        ----------
+        contribfiles : `Iterable[Tuple[str, str]]`
+            Table name and path of each contribution file
+
+        Returns
+        -------
+        checks : `List[FileCheck]`
+            Outcome of each check, in input order
+
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            checks = list(executor.map(lambda c: self.check(*c), contribfiles))
+        failed = sum(1 for c in checks if c.error is not None)
+        _LOG.info("%s contribution files checked, %s failures", len(checks), failed)
+        return checks
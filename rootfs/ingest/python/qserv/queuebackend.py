@@ -0,0 +1,291 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Database backends for the contributions queue.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import sqlalchemy
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    event,
+)
+from sqlalchemy.engine.url import URL, make_url
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from .exception import QueueError
+from .ingestconfig import QueuePoolConfig
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+_LOG = logging.getLogger(__name__)
+
+# Time, in seconds, a SQLite connection waits for a concurrent writer
+_SQLITE_BUSY_TIMEOUT_SEC = 60
+
+
+def define_tables(db_meta: MetaData) -> None:
+    """Declare the contributions queue schema, i.e. the ``contribfile_queue``
+    and ``mutex`` tables, inside a SQLAlchemy metadata object.
+
+    Parameters
+    ----------
+    db_meta : `MetaData`
+        Metadata which will contain the tables
+
+    """
+    Table(
+        "contribfile_queue",
+        db_meta,
+        Column("id", Integer(), primary_key=True),
+        Column("chunk_id", Integer()),
+        Column("database", String(50)),
+        Column("filepath", String(255)),
+        Column("is_overlap", Boolean()),
+        Column("table", String(50)),
+        Column("locking_pod", String(255), nullable=True),
+        Column("succeed", Boolean()),
+        Column("attempts", Integer()),
+        Column("lock_time", Float()),
+        Column("start_time", Float()),
+        Column("end_time", Float()),
+        Column("transaction_id", Integer()),
+        Column("worker", String(255)),
+        Column("error", String(255)),
+        Column("size", BigInteger(), nullable=True),
+        UniqueConstraint("database", "table", "filepath", "is_overlap"),
+        Index("contribfile_queue_locking_pod", "database", "locking_pod"),
+    )
+    Table(
+        "mutex",
+        db_meta,
+        Column("database", String(50), nullable=True, unique=True),
+        Column("pod", String(255), nullable=True),
+        Column("latest_move", DateTime(), nullable=False),
+    )
+
+
+class PoolStats:
+    """Checkout statistics of a connection pool, updated by pool events.
+
+    Parameters
+    ----------
+    engine : `Any`
+        SQLAlchemy engine owning the pool
+
+    """
+
+    def __init__(self, engine: Any):
+        self._engine = engine
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.invalidations = 0
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+            with self._lock:
+                self.checkouts += 1
+                self.checked_out += 1
+                self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+            with self._lock:
+                self.checked_out -= 1
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+            with self._lock:
+                self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return current checkout statistics.
+
+        Returns
+        -------
+        snapshot : `Dict[str, Any]`
+            Counters of pool events since engine creation, and pool status
+
+        """
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "invalidations": self.invalidations,
+                "status": self._engine.pool.status(),
+            }
+
+
+class QueueBackend(ABC):
+    """Database hosting the contributions queue.
+
+    Provide the SQLAlchemy engine and the ``contribfile_queue`` and ``mutex``
+    tables used by `QueueManager`. Locking of contributions relies on the
+    ``mutex`` table, so all backends share the same locking semantics.
+
+    Parameters
+    ----------
+    db_url : `URL`
+        Queue database URL
+    pool_config : `QueuePoolConfig`, optional
+        Connection pool parameters, default ones if not set
+
+    """
+
+    engine: Any
+    queue: Table
+    mutex: Table
+
+    def __init__(self, db_url: URL, pool_config: Optional[QueuePoolConfig] = None):
+        self.pool_config = pool_config if pool_config is not None else QueuePoolConfig()
+        self.engine = self._create_engine(db_url)
+        self.pool_stats = PoolStats(self.engine)
+        self.db_meta = MetaData(bind=self.engine)
+        self._load_tables()
+        self.queue = self.db_meta.tables["contribfile_queue"]
+        self.mutex = self.db_meta.tables["mutex"]
+
+    @abstractmethod
+    def _create_engine(self, db_url: URL) -> Any:
+        """Create the SQLAlchemy engine for the queue database."""
+
+    @abstractmethod
+    def _load_tables(self) -> None:
+        """Load queue tables inside ``self.db_meta``."""
+
+
+class MariaDBQueueBackend(QueueBackend):
+    """Queue hosted by a MariaDB server, i.e. ``qserv-ingest-db``.
+
+    The schema is managed by the server and reflected at startup. Stale
+    connections, i.e. closed by the server or a proxy, are detected at
+    checkout when pre-ping is enabled.
+
+    """
+
+    def _create_engine(self, db_url: URL) -> Any:
+        cfg = self.pool_config
+        return sqlalchemy.create_engine(
+            db_url,
+            pool_size=cfg.size,
+            max_overflow=cfg.max_overflow,
+            pool_timeout=cfg.timeout,
+            pool_recycle=cfg.recycle,
+            pool_pre_ping=cfg.pre_ping,
+            future=True,
+        )
+
+    def _load_tables(self) -> None:
+        Table("contribfile_queue", self.db_meta, autoload=True)
+        Table("mutex", self.db_meta, autoload=True)
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """Queue embedded in a SQLite file, for single-node ingests and local
+    benchmarks.
+
+    The database uses WAL journal mode so that readers do not block the
+    writer, the schema is created on demand. A new connection is opened for
+    each checkout, so pool size parameters are ignored.
+
+    """
+
+    def _create_engine(self, db_url: URL) -> Any:
+        engine = sqlalchemy.create_engine(
+            db_url, connect_args={"timeout": _SQLITE_BUSY_TIMEOUT_SEC}, future=True
+        )
+
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragma(dbapi_connection: Any, connection_record: Any) -> None:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+
+        return engine
+
+    def _load_tables(self) -> None:
+        define_tables(self.db_meta)
+        self.db_meta.create_all(self.engine, checkfirst=True)
+
+
+def new_backend(connection_url: str, pool_config: Optional[QueuePoolConfig] = None) -> QueueBackend:
+    """Create the queue backend matching a database URL.
+
+    Parameters
+    ----------
+    connection_url : `str`
+        Queue database URL, i.e. ``mysql://...`` or ``sqlite:///path``
+    pool_config : `QueuePoolConfig`, optional
+        Connection pool parameters, default ones if not set
+
+    Returns
+    -------
+    backend : `QueueBackend`
+        Queue backend
+
+    Raises
+    ------
+    QueueError
+        Raised if the database URL scheme is not supported
+
+    """
+    db_url = make_url(connection_url)
+    backend_name = db_url.get_backend_name()
+    if backend_name in ["mysql", "mariadb"]:
+        return MariaDBQueueBackend(db_url, pool_config)
+    elif backend_name == "sqlite":
+        return SQLiteQueueBackend(db_url, pool_config)
+    else:
+        raise QueueError("Unsupported database for contribution queue", connection_url)
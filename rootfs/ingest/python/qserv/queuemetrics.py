@@ -0,0 +1,141 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Instrumentation of the statements sent to the contributions queue
+database.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import bisect
+import threading
+from enum import Enum
+from typing import Any, Dict, List
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+# Upper bounds, in seconds, of the latency histogram buckets
+_LATENCY_BUCKETS_SEC = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0]
+
+
+class StatementKind(str, Enum):
+    """Kind of the statements sent to the queue database, statements of a
+    database transaction all have the same kind."""
+
+    LOCK = "lock"
+    SELECT = "select"
+    UNLOCK = "unlock"
+    COUNT = "count"
+    OTHER = "other"
+
+
+class LatencyHistogram:
+    """Histogram of statement latencies, with fixed buckets."""
+
+    def __init__(self) -> None:
+        # Last bucket counts latencies above all bounds
+        self.buckets: List[int] = [0] * (len(_LATENCY_BUCKETS_SEC) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, latency: float) -> None:
+        self.buckets[bisect.bisect_left(_LATENCY_BUCKETS_SEC, latency)] += 1
+        self.count += 1
+        self.sum += latency
+        if latency > self.max:
+            self.max = latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        bounds = [str(b) for b in _LATENCY_BUCKETS_SEC] + ["+Inf"]
+        return {
+            "buckets": dict(zip(bounds, self.buckets)),
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+        }
+
+
+class QueueMetrics:
+    """Latency histograms and retry counters for each kind of statement sent
+    to the queue database.
+
+    Metrics are recorded by `QueueManager` once `QueueManager.enable_metrics`
+    has been called, and can be sampled at any time with `snapshot`.
+
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies = {kind: LatencyHistogram() for kind in StatementKind}
+        self.checkout_latency = LatencyHistogram()
+        self.retries = {kind: 0 for kind in StatementKind}
+        self.giveups = {kind: 0 for kind in StatementKind}
+        self.retry_reasons: Dict[str, int] = {}
+
+    def observe_latency(self, kind: StatementKind, latency: float) -> None:
+        """Record the latency, in seconds, of a statement."""
+        with self._lock:
+            self.latencies[kind].observe(latency)
+
+    def observe_checkout(self, latency: float) -> None:
+        """Record the time, in seconds, spent to check out a connection from
+        the pool, including pre-ping."""
+        with self._lock:
+            self.checkout_latency.observe(latency)
+
+    def count_retry(self, kind: StatementKind, reason: str) -> None:
+        """Record the retry of a database transaction, and the class of the
+        error which made it fail."""
+        with self._lock:
+            self.retries[kind] += 1
+            self.retry_reasons[reason] = self.retry_reasons.get(reason, 0) + 1
+
+    def count_giveup(self, kind: StatementKind) -> None:
+        """Record a database transaction which has failed after exhausting its
+        retries."""
+        with self._lock:
+            self.giveups[kind] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a copy of current metrics, which can be serialized to JSON.
+
+        Returns
+        -------
+        snapshot : `Dict[str, Any]`
+            Latency histograms, retry and give-up counts, indexed by
+            statement kind, retry counts indexed by error class, and
+            connection checkout latency histogram
+
+        """
+        with self._lock:
+            return {
+                "latency": {kind.value: h.snapshot() for kind, h in self.latencies.items()},
+                "checkout_latency": self.checkout_latency.snapshot(),
+                "retries": {kind.value: n for kind, n in self.retries.items()},
+                "giveups": {kind.value: n for kind, n in self.giveups.items()},
+                "retry_reasons": dict(self.retry_reasons),
+            }
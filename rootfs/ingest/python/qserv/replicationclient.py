@@ -290,6 +290,23 @@ class ReplicationClient:
         _LOG.debug(f"IDs of transactions not in FINISHED, ABORTED state: {trans} for {database} database.")
         return trans
 
+    def get_transactions_aborted(self, database: str) -> List[int]:
+        """Get aborted transactions for a given database
+
+        Parameters
+        ----------
+        database : str
+            target database
+
+        Returns
+        -------
+        List[int]
+            List of transactions
+        """
+        trans = self._get_transactions([jsonparser.TransactionState.ABORTED], database)
+        _LOG.debug(f"IDs of transactions in ABORTED state: {trans} for {database} database.")
+        return trans
+
     def index_all_tables(self, json_indexes: List[Dict[str, Any]]) -> None:
         for json_idx in json_indexes:
             _LOG.info(f"Create index: {json_idx}")
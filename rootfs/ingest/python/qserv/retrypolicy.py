@@ -0,0 +1,200 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Retry policy for the transactions sent to the contributions queue
+database.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import random
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Optional
+
+from sqlalchemy.exc import DBAPIError
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+# SQLite reports lock contention with this message
+_SQLITE_LOCKED_MESSAGE = "database is locked"
+
+
+class ErrorClass(str, Enum):
+    """Class of the database errors which can be retried."""
+
+    DEADLOCK = "deadlock"
+    """ Transaction rolled back by the server to resolve a deadlock """
+
+    LOCK_WAIT = "lock_wait"
+    """ Lock wait timeout, only the failed statement is rolled back """
+
+    CONNECTION_LOST = "connection_lost"
+    """ Connection to the server is unavailable or has been lost """
+
+
+# See mysql server and client error codes
+_MYSQL_ERROR_CLASSES = {
+    1213: ErrorClass.DEADLOCK,
+    1205: ErrorClass.LOCK_WAIT,
+    2003: ErrorClass.CONNECTION_LOST,
+    2004: ErrorClass.CONNECTION_LOST,
+    2005: ErrorClass.CONNECTION_LOST,
+    2006: ErrorClass.CONNECTION_LOST,
+    2013: ErrorClass.CONNECTION_LOST,
+}
+
+
+def classify_error(exc: Exception) -> Optional[ErrorClass]:
+    """Return the class of a database error, or None if it can not be retried.
+
+    Parameters
+    ----------
+    exc : `Exception`
+        Error raised by SQLAlchemy
+
+    Returns
+    -------
+    error_class : `ErrorClass`, optional
+        Class of the error, None if the error must not be retried
+
+    """
+    if not isinstance(exc, DBAPIError) or exc.orig is None or not exc.orig.args:
+        return None
+    code = exc.orig.args[0]
+    if isinstance(code, int):
+        return _MYSQL_ERROR_CLASSES.get(code)
+    elif isinstance(code, str) and code.startswith(_SQLITE_LOCKED_MESSAGE):
+        return ErrorClass.LOCK_WAIT
+    return None
+
+
+def _default_max_attempts() -> Dict[ErrorClass, int]:
+    return {
+        ErrorClass.DEADLOCK: 20,
+        ErrorClass.LOCK_WAIT: 5,
+        ErrorClass.CONNECTION_LOST: 100,
+    }
+
+
+def _default_base_sec() -> Dict[ErrorClass, float]:
+    return {
+        ErrorClass.DEADLOCK: 0.05,
+        ErrorClass.LOCK_WAIT: 1.0,
+        ErrorClass.CONNECTION_LOST: 1.0,
+    }
+
+
+@dataclass
+class RetryPolicy:
+    """Decide whether, and when, a failed database transaction is retried.
+
+    Sleeps between retries use decorrelated jitter, so that pods failing at
+    the same time do not retry in lockstep: each sleep is drawn uniformly
+    between the base sleep of the error class and three times the previous
+    sleep, and capped.
+
+    """
+
+    budget_sec: float = 1800.0
+    """ Maximum time spent retrying a transaction, since its first failure """
+
+    cap_sec: float = 10.0
+    """ Maximum sleep between two attempts """
+
+    max_attempts: Dict[ErrorClass, int] = field(default_factory=_default_max_attempts)
+    """ Maximum number of retries for each error class """
+
+    base_sec: Dict[ErrorClass, float] = field(default_factory=_default_base_sec)
+    """ Minimal sleep before retrying for each error class """
+
+    def start(self, bound_attempts: bool = True) -> "RetryState":
+        """Return the retry state of a new transaction.
+
+        Parameters
+        ----------
+        bound_attempts : `bool`
+            If False, the number of retries is not limited for any error
+            class, and the transaction is only bounded by ``budget_sec``
+
+        Returns
+        -------
+        retry_state : `RetryState`
+            Retry state of the transaction
+
+        """
+        return RetryState(self, bound_attempts)
+
+
+class RetryState:
+    """Retries of a single database transaction.
+
+    Parameters
+    ----------
+    policy : `RetryPolicy`
+        Policy applied to the transaction
+    bound_attempts : `bool`
+        Apply the attempts limit of each error class of the policy
+
+    """
+
+    def __init__(self, policy: RetryPolicy, bound_attempts: bool = True):
+        self.policy = policy
+        self.bound_attempts = bound_attempts
+        self.attempts: Dict[ErrorClass, int] = {c: 0 for c in ErrorClass}
+        self._first_failure: Optional[float] = None
+        self._sleep_sec = 0.0
+
+    def next_sleep(self, error_class: ErrorClass) -> Optional[float]:
+        """Return time to sleep before retrying the transaction after an
+        error, or None if the transaction must not be retried.
+
+        Parameters
+        ----------
+        error_class : `ErrorClass`
+            Class of the error which made the transaction fail
+
+        Returns
+        -------
+        sleep_sec : `float`, optional
+            Sleep duration in seconds, None to give up
+
+        """
+        now = time.monotonic()
+        if self._first_failure is None:
+            self._first_failure = now
+        self.attempts[error_class] += 1
+        if self.bound_attempts and self.attempts[error_class] > self.policy.max_attempts[error_class]:
+            return None
+        remaining_sec = self.policy.budget_sec - (now - self._first_failure)
+        if remaining_sec <= 0:
+            return None
+        base_sec = self.policy.base_sec[error_class]
+        sleep_sec = random.uniform(base_sec, max(base_sec, self._sleep_sec * 3))
+        self._sleep_sec = min(self.policy.cap_sec, sleep_sec)
+        return min(self._sleep_sec, remaining_sec)
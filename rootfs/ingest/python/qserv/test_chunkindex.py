@@ -0,0 +1,98 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for chunkindex.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import logging
+import pathlib
+import struct
+from typing import List, Tuple
+
+import pytest
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from .chunkindex import ChunkCount, ChunkIndex, load_chunk_index
+from .exception import IngestError
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+
+def write_chunk_index(path: pathlib.Path, entries: List[Tuple[int, int, int, int]]) -> None:
+    """Write a chunk index with the partitioner format, entries are
+    (chunk_id, subchunk_id, rows, overlap_rows)."""
+    with open(path, "wb") as f:
+        for chunk_id, subchunk_id, rows, overlap_rows in entries:
+            f.write(struct.pack("<QQQ", chunk_id << 32 | subchunk_id, rows, overlap_rows))
+
+
+def test_read(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "chunk_index.bin"
+    # Extract from itest/datasets/DC2/step1_1/position/chunk_index.bin
+    write_chunk_index(
+        path,
+        [
+            (57867, 26, 2, 0),
+            (57866, 26, 6, 0),
+            (57867, 25, 2, 0),
+            (57866, 14, 0, 4),
+            (57867, 13, 0, 1),
+            (57900, 1, 0, 3),
+        ],
+    )
+    chunk_index = ChunkIndex.read(str(path))
+    assert len(chunk_index) == 3
+    assert list(chunk_index) == [
+        ChunkCount(57866, 6, 4),
+        ChunkCount(57867, 4, 1),
+        ChunkCount(57900, 0, 3),
+    ]
+    assert list(chunk_index.chunk_ids) == [57866, 57867]
+    assert list(chunk_index.overlap_chunk_ids) == [57866, 57867, 57900]
+    assert chunk_index.rows(57867) == 4
+    assert chunk_index.overlap_rows(57900) == 3
+    assert chunk_index.rows(1) == 0
+    assert chunk_index.total_rows == 10
+    assert chunk_index.total_overlap_rows == 8
+
+    assert list(load_chunk_index(str(tmp_path), "chunk_index.bin")) == list(chunk_index)
+
+
+def test_read_invalid(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "chunk_index.bin"
+    path.write_bytes(b"")
+    assert len(ChunkIndex.read(str(path))) == 0
+
+    path.write_bytes(b"\x00" * 25)
+    with pytest.raises(IngestError):
+        ChunkIndex.read(str(path))
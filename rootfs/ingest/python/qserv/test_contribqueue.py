@@ -42,24 +42,17 @@ import yaml
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
-from sqlalchemy import (
-    Boolean,
-    Column,
-    DateTime,
-    Integer,
-    MetaData,
-    String,
-    Table,
-    create_engine,
-    event,
-    func,
-    select,
-    update,
-)
-from sqlalchemy.exc import StatementError
-
-from . import contribqueue, metadata, util
+from sqlalchemy import MetaData, create_engine, event, false, func, select, update
+from sqlalchemy.exc import OperationalError, StatementError
+
+from . import contribqueue, metadata, queuebackend, util
+from .contribution import Contribution
+from .exception import QueueError
+from .filesplit import FileSplitter
+from .preflight import FileCheck
 from .ingestconfig import IngestConfig
+from .queuemetrics import StatementKind
+from .retrypolicy import ErrorClass, RetryPolicy
 
 # ---------------------------------
 # Local non-exported definitions --
@@ -82,25 +75,9 @@ class MockDataAccessLayer:
     engine: Any
     conn_string = None
     db_meta = MetaData()
-    queue = Table(
-        "contribfile_queue",
-        db_meta,
-        Column("id", Integer(), primary_key=True),
-        Column("chunk_id", Integer()),
-        Column("database", String(50)),
-        Column("filepath", String(255)),
-        Column("is_overlap", Boolean()),
-        Column("table", String(50)),
-        Column("locking_pod", String(255), nullable=True),
-        Column("succeed", Boolean()),
-    )
-
-    mutex = Table(
-        "mutex",
-        db_meta,
-        Column("pod", String(255), nullable=True),
-        Column("latest_move", DateTime(), nullable=False),
-    )
+    queuebackend.define_tables(db_meta)
+    queue = db_meta.tables["contribfile_queue"]
+    mutex = db_meta.tables["mutex"]
 
     def __init__(self, conn_string: str) -> None:
         self.engine = create_engine(conn_string or self.conn_string, future=True)
@@ -112,6 +89,7 @@ class MockDataAccessLayer:
             _LOG.debug("Parameters:%s", parameters)
 
     def create_schema(self) -> None:
+        self.db_meta.drop_all(self.engine)
         self.db_meta.create_all(self.engine)
 
     def empty_queue(self) -> None:
@@ -184,8 +162,9 @@ class MockDataAccessLayer:
         with self.engine.begin() as connection:
             connection.execute(delete)
             ins = self.mutex.insert()
-            mutex = {"pod": None, "latest_move": datetime.datetime.now()}
-            connection.execute(ins, mutex)
+            for db in ["dp01_dc2_catalogs", "mydb"]:
+                mutex = {"database": db, "pod": None, "latest_move": datetime.datetime.now()}
+                connection.execute(ins, mutex)
 
     def log_queue(self) -> None:
         query = select([self.queue])
@@ -223,9 +202,201 @@ def test_insert_contribfiles() -> None:
     data_url = os.path.join(util.DATADIR, _CASE01_DATASET)
     contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
     queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
-    queue_manager.insert_contribfiles()
+    diff = queue_manager.insert_contribfiles()
     count = dal.count_contribfiles()
     assert count == contribfiles_count
+    assert diff["Object"].added == 23
+
+
+@pytest.mark.usefixtures("init_schema")
+def test_insert_contribfiles_incremental() -> None:
+    contribfiles_count = 37
+    dal = MockDataAccessLayer(_SCISQL_QUEUE_URL)
+    data_url = os.path.join(util.DATADIR, _CASE01_DATASET)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager.insert_contribfiles()
+
+    query = update(queue_manager.queue).values(succeed=True)
+    query = query.where(queue_manager.queue.c.table == "Object")
+    queue_manager._safe_execute(query)
+    # Contribution file removed from metadata
+    with dal.engine.begin() as connection:
+        contrib_file = {
+            "chunk_id": 1,
+            "database": contribution_metadata.database,
+            "filepath": "/obsolete/chunk_1.txt",
+            "is_overlap": False,
+            "table": "Source",
+        }
+        connection.execute(dal.queue.insert(), contrib_file)
+    # Contribution file added to metadata
+    with dal.engine.begin() as connection:
+        connection.execute(dal.queue.delete().where(dal.queue.c.filepath == "/Logs.tsv"))
+
+    diff = queue_manager.insert_contribfiles(dry_run=True)
+    assert diff["Object"].succeed == 23
+    assert diff["Logs"].added == 1
+    assert diff["Source"].obsolete == 1
+    assert dal.count_contribfiles() == contribfiles_count
+
+    diff = queue_manager.insert_contribfiles(prune=True)
+    assert dal.count_contribfiles() == contribfiles_count
+    assert dal.count_succeed() == 23
+
+    diff = queue_manager.insert_contribfiles()
+    for table_diff in diff.values():
+        assert table_diff.added == 0
+        assert table_diff.obsolete == 0
+
+
+@pytest.mark.usefixtures("init_schema")
+def test_insert_contribfiles_split(tmp_path: Any) -> None:
+    dal = MockDataAccessLayer(_SCISQL_QUEUE_URL)
+    metadata_url = os.path.join(util.DATADIR, _CASE01_DATASET)
+    contribution_metadata = metadata.ContributionMetadata(metadata_url, str(tmp_path))
+    # Oversized contribution file, other ones are missing and not split
+    object_dir = tmp_path / "partition" / "case01" / "Object"
+    object_dir.mkdir(parents=True)
+    (object_dir / "chunk_6630.txt").write_bytes(b"".join(b"%d\tobject\n" % i for i in range(100)))
+    splitter = FileSplitter(contribution_metadata.lb_url, 256, workers=2)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+
+    diff = queue_manager.insert_contribfiles(dry_run=True, splitter=splitter)
+    assert diff["Object"].added == 23
+    assert dal.count_contribfiles() == 0
+
+    diff = queue_manager.insert_contribfiles(splitter=splitter)
+    ranges = diff["Object"].added - 22
+    assert ranges > 1
+    q = queue_manager.queue
+    with dal.engine.connect() as connection:
+        rows = connection.execute(
+            select([q.c.filepath, q.c.chunk_id]).where(q.c.filepath.like("%?range=%"))
+        ).all()
+    assert len(rows) == ranges
+    assert {chunk_id for _, chunk_id in rows} == {6630}
+
+    # Ranges are queued, whatever the split size
+    query = update(q).values(succeed=True).where(q.c.filepath == rows[0][0])
+    queue_manager._safe_execute(query)
+    splitter = FileSplitter(contribution_metadata.lb_url, 64)
+    diff = queue_manager.insert_contribfiles(prune=True, splitter=splitter)
+    assert diff["Object"].added == 0
+    assert diff["Object"].obsolete == 0
+    assert diff["Object"].succeed == 1
+    assert diff["Object"].queued == 22 + ranges - 1
+    assert dal.count_contribfiles() == 37 - 1 + ranges
+
+
+@pytest.mark.usefixtures("init_schema")
+def test_export_import_contribfiles(tmp_path: Any) -> None:
+    contribfiles_count = 37
+    dal = MockDataAccessLayer(_SCISQL_QUEUE_URL)
+    data_url = os.path.join(util.DATADIR, _CASE01_DATASET)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager.insert_contribfiles()
+
+    query = update(queue_manager.queue).values(succeed=True, locking_pod="pod-0", transaction_id=12)
+    query = query.where(queue_manager.queue.c.table == "Object")
+    queue_manager._safe_execute(query)
+    query = update(queue_manager.queue).values(locking_pod="pod-1")
+    query = query.where(queue_manager.queue.c.table == "Source")
+    queue_manager._safe_execute(query)
+
+    snapshot = str(tmp_path / "queue.csv.gz")
+    assert queue_manager.export_contribfiles(snapshot) == contribfiles_count
+
+    with pytest.raises(QueueError):
+        queue_manager.import_contribfiles(snapshot)
+
+    dal.empty_queue()
+    assert queue_manager.import_contribfiles(snapshot) == contribfiles_count
+    assert dal.count_contribfiles() == contribfiles_count
+    assert dal.count_succeed() == 23
+
+    columns = [queue_manager.queue.c.locking_pod, queue_manager.queue.c.transaction_id]
+    with dal.engine.connect() as connection:
+        rows = connection.execute(select(columns).where(queue_manager.queue.c.table == "Object")).all()
+        assert set(rows) == {("pod-0", 12)}
+        rows = connection.execute(select(columns).where(queue_manager.queue.c.table == "Source")).all()
+        assert set(rows) == {(None, None)}
+
+
+@pytest.mark.usefixtures("init_schema")
+def test_requeue_contribfiles() -> None:
+    dal = MockDataAccessLayer(_SCISQL_QUEUE_URL)
+    data_url = os.path.join(util.DATADIR, _CASE01_DATASET)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager.insert_contribfiles()
+    queue_manager.init_mutex()
+    q = queue_manager.queue
+
+    queue_manager.pod = "pod-0"
+    locked_0 = queue_manager._run_lock_queries(10)
+    queue_manager.set_transaction_id(1)
+    queue_manager.pod = "pod-1"
+    locked_1 = queue_manager._run_lock_queries(10)
+    queue_manager.set_transaction_id(2)
+    query = update(q).values(error="Worker timeout").where(q.c.filepath == locked_1[0][2])
+    queue_manager._safe_execute(query)
+    assert dal.count_locked() == 20
+
+    RequeueFilter = contribqueue.RequeueFilter
+    no_filter = RequeueFilter()
+    # Only contribution files of aborted transactions are released
+    assert queue_manager.requeue_contribfiles(no_filter, [], dry_run=True) == 0
+    assert queue_manager.requeue_contribfiles(RequeueFilter(lock_age=3600), [1], dry_run=True) == 0
+    assert queue_manager.requeue_contribfiles(RequeueFilter(error="timeout"), [1], dry_run=True) == 0
+    assert queue_manager.requeue_contribfiles(RequeueFilter(error="timeout"), [2], dry_run=True) == 1
+    assert queue_manager.requeue_contribfiles(RequeueFilter(pod="pod-1"), [1], dry_run=True) == 0
+    assert dal.count_locked() == 20
+
+    chunk_id = locked_0[0][1]
+    criteria = RequeueFilter(tables=[locked_0[0][4]], chunk_min=chunk_id, chunk_max=chunk_id)
+    assert queue_manager.requeue_contribfiles(criteria, [1]) == 1
+    assert dal.count_locked() == 19
+    assert queue_manager.requeue_contribfiles(no_filter, [1]) == 9
+    assert dal.count_locked() == 10
+
+    # Contribution files locked by a pod which has not started its
+    # transaction yet are only released by lock age or pod
+    queue_manager.pod = "pod-2"
+    queue_manager._run_lock_queries(10)
+    assert dal.count_locked() == 20
+    assert queue_manager.requeue_contribfiles(no_filter, [1, 2], dry_run=True) == 10
+    assert queue_manager.requeue_contribfiles(RequeueFilter(pod="pod-2"), [], dry_run=True) == 10
+    assert queue_manager.requeue_contribfiles(RequeueFilter(lock_age=0), [], dry_run=True) == 10
+    assert queue_manager.requeue_contribfiles(RequeueFilter(lock_age=0), [2], dry_run=True) == 20
+
+
+@pytest.mark.usefixtures("init_schema")
+def test_record_preflight() -> None:
+    data_url = os.path.join(util.DATADIR, _CASE01_DATASET)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager.insert_contribfiles()
+    q = queue_manager.queue
+    query = update(q).values(succeed=True).where(q.c.table == "Object")
+    queue_manager._safe_execute(query)
+
+    contribfiles = queue_manager.select_preflight_contribfiles()
+    assert len(contribfiles) == 14
+    assert {table for table, _ in contribfiles} == {"Source", "Logs"}
+
+    checks = [FileCheck(table, filepath, filepath, 10) for table, filepath in contribfiles]
+    checks[0].size = 0
+    checks[0].error = "Empty file"
+    queue_manager.record_preflight(checks)
+
+    with queue_manager.engine.connect() as connection:
+        rows = connection.execute(select([q.c.filepath, q.c.size, q.c.error]).where(q.c.size.isnot(None)))
+        recorded = {row.filepath: (row.size, row.error) for row in rows}
+    assert len(recorded) == 14
+    assert recorded[checks[0].filepath] == (0, "Empty file")
+    assert recorded[checks[1].filepath] == (10, None)
 
 
 @pytest.mark.usefixtures("init_queue")
@@ -242,6 +413,37 @@ def test_run_lock_queries() -> None:
     assert count == contribfiles_to_lock_count
 
 
+@pytest.mark.usefixtures("init_queue")
+def test_init_mutex() -> None:
+    dal = MockDataAccessLayer(_SCISQL_QUEUE_URL)
+    data_url = os.path.join(util.DATADIR, _CASE01_DATASET)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager.insert_contribfiles()
+
+    with pytest.raises(QueueError):
+        queue_manager._run_lock_queries(1)
+
+    queue_manager.init_mutex()
+    queue_manager.init_mutex()
+    with dal.engine.connect() as connection:
+        query = select([dal.mutex.c.database]).order_by(dal.mutex.c.database)
+        databases = [row.database for row in connection.execute(query)]
+    assert databases == sorted([contribution_metadata.database, _DP01, "mydb"])
+
+    assert len(queue_manager._run_lock_queries(1)) == 1
+
+    # An other pod creates the mutex between the update and the insert
+    update_mutex = queue_manager._update_mutex
+    updates = [update_mutex().where(false()), update_mutex()]
+    setattr(queue_manager, "_update_mutex", lambda: updates.pop(0))
+    queue_manager.init_mutex()
+    assert not updates
+    with dal.engine.connect() as connection:
+        query = select([func.count()]).where(dal.mutex.c.database == contribution_metadata.database)
+        assert connection.execute(query).scalar() == 1
+
+
 @pytest.mark.usefixtures("init_queue")
 def test_count_contribfiles() -> None:
     data_url = os.path.join(util.DATADIR, _DP01)
@@ -268,9 +470,108 @@ def test_lock_contribfiles() -> None:
     contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
     queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
     queue_manager._contribfiles_to_lock_number = 4
-    queue_manager.lock_contribfiles()
+    contribfiles_locked = queue_manager.lock_contribfiles()
     count = dal.count_locked()
     assert count == contribfiles_to_lock_count
+    assert len(contribfiles_locked) == contribfiles_to_lock_count
+    # mutex update, select and update of contribution files
+    assert queue_manager.lock_statements_count == 3
+
+
+@pytest.mark.usefixtures("init_queue")
+def test_metrics() -> None:
+    data_url = os.path.join(util.DATADIR, _DP01)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    assert queue_manager.metrics is None
+    metrics = queue_manager.enable_metrics()
+    assert queue_manager.enable_metrics() is metrics
+
+    queue_manager._run_lock_queries(3)
+    queue_manager.unlock_contribfiles(True)
+    queue_manager.all_succeed()
+    snapshot = metrics.snapshot()
+    assert snapshot["latency"]["lock"]["count"] == 3
+    assert snapshot["latency"]["unlock"]["count"] == 1
+    assert snapshot["latency"]["count"]["count"] == 1
+    assert snapshot["latency"]["select"]["count"] == 0
+    assert sum(snapshot["retries"].values()) == 0
+    assert snapshot["checkout_latency"]["count"] == 3
+
+
+@pytest.mark.usefixtures("init_queue")
+def test_safe_run_retry() -> None:
+    data_url = os.path.join(util.DATADIR, _DP01)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    policy = RetryPolicy(base_sec={c: 0.001 for c in ErrorClass}, cap_sec=0.01)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata, policy)
+    metrics = queue_manager.enable_metrics()
+    failures = [1213, 2006]
+
+    def statements(connection: Any) -> int:
+        if failures:
+            raise OperationalError("", {}, Exception(failures.pop(0), "Injected error"))
+        return 42
+
+    assert queue_manager._safe_run(statements, 10, StatementKind.LOCK) == 42
+    snapshot = metrics.snapshot()
+    assert snapshot["retries"]["lock"] == 2
+    assert snapshot["retry_reasons"] == {"deadlock": 1, "connection_lost": 1}
+
+    failures = [1213, 1213]
+    with pytest.raises(OperationalError):
+        queue_manager._safe_run(statements, 2, StatementKind.UNLOCK)
+    assert metrics.snapshot()["giveups"]["unlock"] == 1
+
+    # Unlock transactions survive more lock wait timeouts than other ones
+    lock_waits = policy.max_attempts[ErrorClass.LOCK_WAIT] + 2
+    failures = [1205] * lock_waits
+    assert queue_manager._safe_run(statements, 100, StatementKind.UNLOCK) == 42
+    assert metrics.snapshot()["retry_reasons"]["lock_wait"] == lock_waits
+    failures = [1205] * lock_waits
+    with pytest.raises(OperationalError):
+        queue_manager._safe_run(statements, 100, StatementKind.OTHER)
+
+    failures = [1064]
+    with pytest.raises(OperationalError):
+        queue_manager._safe_run(statements, 10)
+
+
+@pytest.mark.usefixtures("init_queue")
+def test_contribfiles_to_lock_count() -> None:
+    data_url = os.path.join(util.DATADIR, _DP01)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager._contribfiles_to_lock_number = 10
+    # First transaction of the pod
+    assert queue_manager._contribfiles_to_lock_count() == 10
+
+    # 4 contribution files ingested by an other pod in the latest 100 seconds
+    now = time.time()
+    query = update(queue_manager.queue).values(
+        locking_pod="other-pod", succeed=True, start_time=now - 100, end_time=now - 10
+    )
+    query = query.where(queue_manager.queue.c.chunk_id < 104)
+    queue_manager._safe_execute(query)
+
+    # 6 remaining contribution files, ingested by all pods in 150 seconds
+    # i.e. current pod could ingest 4.5 contribution files
+    queue_manager._throughput = 0.03
+    statements_count = queue_manager.statements_count
+    assert queue_manager._contribfiles_to_lock_count() == 5
+
+    # All pods throughput is reused
+    queue_manager._throughput = 1
+    assert queue_manager._contribfiles_to_lock_count() == 10
+    assert queue_manager.statements_count == statements_count + 1
+
+    # Contribution files ingested without start time, throughput of all pods
+    # is measured over the whole time window
+    queue_manager._throughput_all = None
+    query = update(queue_manager.queue).values(start_time=None)
+    queue_manager._safe_execute(query)
+    queue_manager._throughput = 0.01
+    assert queue_manager._contribfiles_to_lock_count() == 9
 
 
 def test_unlock_contribfiles() -> None:
@@ -285,6 +586,83 @@ def test_unlock_contribfiles() -> None:
     assert count == contribfiles_to_lock_count
 
 
+@pytest.mark.usefixtures("init_queue")
+def test_unlock_contribfiles_stats() -> None:
+    data_url = os.path.join(util.DATADIR, _DP01)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager._safe_execute(update(queue_manager.queue).values(succeed=None))
+    queue_manager._contribfiles_to_lock_number = 2
+    contribfiles_locked = queue_manager.lock_contribfiles()
+
+    contributions = []
+    for (database, chunk_id, filepath, is_overlap, table) in contribfiles_locked:
+        c = Contribution(
+            "worker-0", 8080, 10, 10, chunk_id, filepath, table, is_overlap, contribution_metadata.lb_url
+        )
+        c.start_time = 10.0
+        c.end_time = 12.0
+        contributions.append(c)
+    contributions[1].error = "READ_FAILED"
+
+    queue_manager.unlock_contribfiles(False, 42, contributions)
+
+    report = queue_manager.report()
+    assert len(report["failures"]) == 1
+    failure = report["failures"][0]
+    assert failure.worker == "worker-0"
+    assert failure.error == "READ_FAILED"
+    assert failure.max_attempts == 1
+
+    contributions[1].error = None
+    queue_manager.lock_contribfiles()
+    queue_manager.unlock_contribfiles(True, 43, contributions)
+    report = queue_manager.report()
+    throughput = report["throughput_per_table"][0]
+    assert throughput.table == "object"
+    assert throughput.contributions == 2
+    assert throughput.ingest_time == 4.0
+    assert throughput.contributions_per_sec == 1.0
+    assert [(t.worker, t.contributions) for t in report["throughput_per_worker"]] == [("worker-0", 2)]
+    assert report["lock_wait_per_pod"][0].locking_pod == queue_manager.pod
+
+
+@pytest.mark.usefixtures("init_queue")
+def test_record_contribfiles_stats_regular() -> None:
+    data_url = os.path.join(util.DATADIR, _DP01)
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    queue_manager = contribqueue.QueueManager(_SCISQL_QUEUE_URL, contribution_metadata)
+    queue_manager._safe_execute(update(queue_manager.queue).values(succeed=None))
+    queue_manager._contribfiles_to_lock_number = 1
+    [(_, chunk_id, filepath, is_overlap, table)] = queue_manager.lock_contribfiles()
+
+    # A regular table file is ingested by all workers, some of them failed
+    # before a worker was assigned
+    contributions = []
+    for worker in ["worker-0", None, "worker-1", None]:
+        c = Contribution(
+            "worker", 8080, 10, 10, chunk_id, filepath, table, is_overlap, contribution_metadata.lb_url
+        )
+        setattr(c, "worker_host", worker)
+        c.start_time = 10.0
+        c.end_time = 12.0
+        contributions.append(c)
+    contributions[1].error = "READ_FAILED"
+    queue_manager._record_contribfiles_stats(42, contributions)
+
+    q = queue_manager.queue
+    query = select([q.c.worker, q.c.error]).where(q.c.filepath == filepath)
+    query = query.where(q.c.database == _DP01)
+    with queue_manager.engine.connect() as connection:
+        assert connection.execute(query).one() == ("worker-0,worker-1", "READ_FAILED")
+
+    # Contribution files ingested by several workers are not counted per worker
+    queue_manager._safe_execute(update(q).values(succeed=True, error=None).where(q.c.filepath == filepath))
+    report = queue_manager.report()
+    assert report["throughput_per_table"][0].contributions == 1
+    assert report["throughput_per_worker"] == []
+
+
 @pytest.mark.dev
 def test_all_succeed() -> None:
     dal = MockDataAccessLayer(_SCISQL_QUEUE_URL)
@@ -32,12 +32,15 @@ import logging
 import os
 from typing import Dict, TypedDict
 
+import pytest
+
 from . import metadata, util
 
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
 from .contribution import Contribution
+from .exception import IngestError
 from .loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
 
 # ---------------------------------
@@ -141,6 +144,45 @@ def test_build_payload() -> None:
     assert payload["lines_terminated_by"] == "\\n"
 
 
+def test_build_payload_locality() -> None:
+    lbAlgo = LoadBalancerAlgorithm(_SERVERS, {"worker-[01].*": ["https://server2", "https://server3"]})
+    params = _PARAMS.copy()
+    params["load_balanced_base_url"] = LoadBalancedURL(_PATH, lbAlgo)
+
+    params["worker_host"] = "worker-1.qserv"
+    urls = [Contribution(**params)._build_payload(1)["url"] for _ in range(3)]
+    assert [u.split("/")[2] for u in urls] == ["server2", "server3", "server2"]
+
+    # Round-robin on all servers for workers without preferred servers
+    params["worker_host"] = "worker-2.qserv"
+    urls = [Contribution(**params)._build_payload(1)["url"] for _ in range(3)]
+    assert [u.split("/")[2] for u in urls] == ["server1", "server2", "server3"]
+
+
+def test_compressed_contribution() -> None:
+    params = _PARAMS.copy()
+    params["filepath"] = "step1_1/chunk_1_overlap.txt.zst"
+    c = Contribution(**params)
+    assert c.ext == "txt"
+    assert c.compression == "zst"
+    assert c.load_balanced_url.get().endswith("/lsst/data/step1_1/chunk_1_overlap.txt")
+
+    params["filepath"] = "step1_1/chunk_1_overlap.gz"
+    with pytest.raises(IngestError):
+        Contribution(**params)
+
+
+def test_range_contribution() -> None:
+    params = _PARAMS.copy()
+    params["filepath"] = "step1_1/chunk_1_overlap.txt?range=100-149"
+    params["load_balanced_base_url"] = LoadBalancedURL(_PATH, LoadBalancerAlgorithm(_SERVERS))
+    c = Contribution(**params)
+    assert c.ext == "txt"
+    assert c.byte_range == (100, 50)
+    payload = c._build_payload(1)
+    assert payload["url"] == "https://server1/lsst/data/step1_1/chunk_1_overlap.txt?range=100-149"
+
+
 def test_print() -> None:
     c = Contribution(**_PARAMS)
     _LOG.debug(c)
@@ -148,6 +190,7 @@ def test_print() -> None:
     params: Dict = dict()
     params["ext"] = "txt"
     params["chunk_id"] = _PARAMS["chunk_id"]
+    params["filepath"] = _PARAMS["filepath"]
     params["table"] = _PARAMS["table"]
 
     if not isinstance(_PARAMS["is_overlap"], int):
@@ -155,10 +198,16 @@ def test_print() -> None:
     else:
         is_overlap = int(_PARAMS["is_overlap"])
     params["is_overlap"] = is_overlap
+    params["byte_range"] = None
+    params["compression"] = None
     params["charset_name"] = ""
     params["load_balanced_url"] = c.load_balanced_url
     params["request_id"] = None
+    params["worker_host"] = "host"
     params["worker_url"] = "http://host:8080"
     params["finished"] = False
+    params["start_time"] = None
+    params["end_time"] = None
+    params["error"] = None
     expected_string = f"Contribution({params})"
     assert expected_string == str(c)
@@ -0,0 +1,229 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for dataserver.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import gzip
+import logging
+import pathlib
+import threading
+from collections.abc import Generator
+
+import pytest
+import requests
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from . import dataserver, parquetstream
+from .dataserver import STATS_PATH, DataServer, DataServerStats, _parse_range
+from .exception import MissingDependencyError
+from .metadatagen import InputScanner
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+_CONTENT = b"0123456789" * 1000
+
+
+@pytest.fixture
+def server_url(tmp_path: pathlib.Path) -> Generator[str, None, None]:
+    (tmp_path / "step1_1").mkdir()
+    (tmp_path / "step1_1" / "chunk_1.txt").write_bytes(_CONTENT)
+    (tmp_path / "step1_1" / "chunk_1_overlap.txt").write_bytes(b"")
+    (tmp_path / "step2_2").mkdir()
+    (tmp_path / "step2_2" / "chunk_2.txt.gz").write_bytes(gzip.compress(_CONTENT))
+    httpd = DataServer(str(tmp_path), "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_parse_range() -> None:
+    assert _parse_range("bytes=0-9", 100) == (0, 10)
+    assert _parse_range("bytes=90-", 100) == (90, 10)
+    assert _parse_range("bytes=90-200", 100) == (90, 10)
+    assert _parse_range("bytes=-10", 100) == (90, 10)
+    assert _parse_range("bytes=-200", 100) == (0, 100)
+    assert _parse_range("bytes=100-", 100) is None
+    assert _parse_range("bytes=10-5", 100) is None
+    with pytest.raises(ValueError):
+        _parse_range("bytes=0-1,5-6", 100)
+    with pytest.raises(ValueError):
+        _parse_range("bytes=-", 100)
+
+
+def test_stats() -> None:
+    stats = DataServerStats(max_files=2)
+    for path in ["a.txt", "b.txt", "a.txt", "c.txt"]:
+        stats.record(path, 10, 1.0)
+    # Least recently transferred file is dropped
+    assert list(stats.to_dict()["files"]) == ["a.txt", "c.txt"]
+    assert stats.files["a.txt"].requests == 2
+    assert stats.total.requests == 4
+
+    stats = DataServerStats(max_files=0)
+    stats.record("a.txt", 10, 1.0)
+    assert stats.to_dict()["files"] == {}
+    assert stats.total.bytes_sent == 10
+
+
+def test_serve(server_url: str) -> None:
+    url = f"{server_url}/step1_1/chunk_1.txt"
+    with requests.Session() as session:
+        r = session.get(url)
+        assert r.status_code == 200
+        assert r.content == _CONTENT
+        assert r.headers["Accept-Ranges"] == "bytes"
+
+        r = session.get(url, headers={"Range": "bytes=10-19"})
+        assert r.status_code == 206
+        assert r.content == _CONTENT[10:20]
+        assert r.headers["Content-Range"] == f"bytes 10-19/{len(_CONTENT)}"
+
+        r = session.get(url, headers={"Range": "bytes=20000-"})
+        assert r.status_code == 416
+        assert r.headers["Content-Range"] == f"bytes */{len(_CONTENT)}"
+
+        r = session.head(url)
+        assert r.status_code == 200
+        assert int(r.headers["Content-Length"]) == len(_CONTENT)
+
+        # Byte range of a split contribution file
+        r = session.get(f"{url}?range=100-149")
+        assert r.status_code == 200
+        assert r.content == _CONTENT[100:150]
+        r = session.get(f"{url}?range=100-99")
+        assert r.status_code == 400
+        r = session.get(f"{server_url}/step2_2/chunk_2.txt?range=0-9")
+        assert r.status_code == 400
+
+        r = session.get(f"{server_url}/step1_1/chunk_1_overlap.txt")
+        assert r.status_code == 200
+        assert r.content == b""
+
+        r = session.get(f"{server_url}/step1_1/missing.txt")
+        assert r.status_code == 404
+
+        stats = session.get(f"{server_url}{STATS_PATH}").json()
+    assert stats["total"]["requests"] == 3
+    assert stats["total"]["bytes_sent"] == len(_CONTENT) + 60
+    assert stats["files"]["step1_1/chunk_1.txt"]["requests"] == 3
+
+
+def test_scan(server_url: str) -> None:
+    contents = InputScanner(server_url, workers=2).scan()
+    assert [c.directory for c in contents] == ["", "step1_1", "step2_2"]
+    assert contents[1].compression is None
+    assert contents[1].chunks == {1: len(_CONTENT)}
+    assert contents[1].overlaps == {1: 0}
+    assert contents[2].compression == "gz"
+    assert list(contents[2].chunks) == [2]
+
+
+def test_serve_compressed(server_url: str) -> None:
+    url = f"{server_url}/step2_2/chunk_2.txt"
+    with requests.Session() as session:
+        # Sent as is, and decoded by the client
+        r = session.get(url, headers={"Accept-Encoding": "gzip"})
+        assert r.status_code == 200
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert r.content == _CONTENT
+
+        # Decompressed by the server
+        r = session.get(url, headers={"Accept-Encoding": "identity"})
+        assert r.status_code == 200
+        assert "Content-Encoding" not in r.headers
+        assert r.headers["Transfer-Encoding"] == "chunked"
+        assert r.content == _CONTENT
+
+        r = session.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+        assert "Content-Encoding" not in r.headers
+        assert r.content == _CONTENT
+
+        # The connection is kept alive after a chunked response
+        r = session.get(f"{server_url}/step1_1/chunk_1.txt")
+        assert r.content == _CONTENT
+
+
+def test_serve_zstd_missing(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "chunk_1.txt.zst").write_bytes(b"")
+    monkeypatch.setattr(dataserver, "zstandard", None)
+    with pytest.raises(MissingDependencyError, match="zstandard"):
+        with open(tmp_path / "chunk_1.txt.zst", "rb") as f:
+            dataserver._open_decompressed(f, "zst")
+    httpd = DataServer(str(tmp_path), "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        r = requests.get(f"http://127.0.0.1:{httpd.server_port}/chunk_1.txt", headers={"Accept-Encoding": ""})
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert r.status_code == 501
+
+
+def test_serve_zstd(tmp_path: pathlib.Path) -> None:
+    zstandard = pytest.importorskip("zstandard")
+    (tmp_path / "chunk_1.txt.zst").write_bytes(zstandard.ZstdCompressor().compress(_CONTENT))
+    httpd = DataServer(str(tmp_path), "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        r = requests.get(f"http://127.0.0.1:{httpd.server_port}/chunk_1.txt", headers={"Accept-Encoding": ""})
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert r.content == _CONTENT
+
+
+def test_serve_parquet(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "Filter.parquet").write_bytes(b"PAR1")
+    httpd = DataServer(str(tmp_path), "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{httpd.server_port}"
+    try:
+        monkeypatch.setattr(parquetstream, "pq", None)
+        assert requests.get(f"{url}/Filter.csv").status_code == 501
+        monkeypatch.undo()
+
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        assert requests.get(f"{url}/Filter.csv").status_code == 500
+        pq.write_table(pa.table({"id": [1, 2], "name": ["u", None]}), tmp_path / "Filter.parquet")
+        assert requests.get(f"{url}/Filter.csv").content == b"1,u\n2,\\N\n"
+        assert requests.get(f"{url}/Filter.tsv").content == b"1\tu\n2\t\\N\n"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,135 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for filesplit.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import logging
+import pathlib
+import threading
+from typing import List, Tuple
+
+import pytest
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from .dataserver import DataServer
+from .filesplit import FileSplitter, is_splittable, parse_range_query, range_filepath, split_range_filepath
+from .loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+# Lines of various lengths, one of them longer than split size
+_CONTENT = b"".join(b"%d\t%s\n" % (i, b"x" * (i % 7 if i != 42 else 300)) for i in range(200))
+
+
+def _check_ranges(ranges: List[Tuple[int, int]], content: bytes) -> None:
+    offset = 0
+    for first, length in ranges:
+        assert first == offset
+        assert length > 0
+        offset += length
+        assert content[offset - 1] == ord("\n")
+    assert offset == len(content)
+
+
+def test_range_filepath() -> None:
+    filepath = range_filepath("step1/chunk_1.txt", 100, 50)
+    assert filepath == "step1/chunk_1.txt?range=100-149"
+    assert split_range_filepath(filepath) == ("step1/chunk_1.txt", (100, 50))
+    assert split_range_filepath("step1/chunk_1.txt") == ("step1/chunk_1.txt", None)
+
+    assert parse_range_query("range=100-149") == (100, 50)
+    assert parse_range_query("") is None
+    for query in ["range=100", "range=100-99", "range=a-b", "range=-10"]:
+        with pytest.raises(ValueError):
+            parse_range_query(query)
+
+
+def test_is_splittable() -> None:
+    assert is_splittable("step1/chunk_1.txt")
+    assert is_splittable("Filter.csv")
+    assert not is_splittable("step1/chunk_1.txt.gz")
+    assert not is_splittable("step1/chunk_1.txt.zst")
+    assert not is_splittable("Filter.parquet")
+
+
+def test_split_local(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "chunk_1.txt").write_bytes(_CONTENT)
+    (tmp_path / "chunk_2.txt").write_bytes(b"1\ta\n")
+    lb_url = LoadBalancedURL(str(tmp_path))
+    splitter = FileSplitter(lb_url, 256, workers=2)
+
+    assert splitter.ranges("chunk_1.txt", 256) == [(0, 256)]
+    ranges = splitter.ranges("chunk_1.txt", len(_CONTENT))
+    assert len(ranges) > 1
+    _check_ranges(ranges, _CONTENT)
+
+    specs = [
+        {"table": "Object", "chunk_id": 1, "filepath": "chunk_1.txt", "is_overlap": False},
+        {"table": "Object", "chunk_id": 2, "filepath": "chunk_2.txt", "is_overlap": False},
+        {"table": "Object", "chunk_id": 3, "filepath": "chunk_3.txt", "is_overlap": False},
+    ]
+    split_specs = splitter.split_all(specs)
+    assert len(split_specs) == len(ranges) + 2
+    filepath = range_filepath("chunk_1.txt", *ranges[0])
+    assert split_specs[0] == dict(specs[0], filepath=filepath, size=ranges[0][1])
+    assert {s["chunk_id"] for s in split_specs[:-2]} == {1}
+    # Small files are not split, and missing ones are left to preflight checks
+    assert split_specs[-2] == dict(specs[1], size=4)
+    assert split_specs[-1] == specs[2]
+
+    # Sizes recorded in metadata are used
+    spec = {"table": "Object", "chunk_id": 4, "filepath": "chunk_4.txt", "is_overlap": False, "size": 10}
+    assert splitter.split_all([spec]) == [spec]
+
+    with pytest.raises(ValueError):
+        FileSplitter(lb_url, 0)
+
+
+def test_split_http(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "chunk_1.txt").write_bytes(_CONTENT)
+    httpd = DataServer(str(tmp_path), "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        lb_url = LoadBalancedURL("/", LoadBalancerAlgorithm([f"http://127.0.0.1:{httpd.server_port}"]))
+        splitter = FileSplitter(lb_url, 256, workers=2)
+        specs = splitter.split_all(
+            [{"table": "Object", "chunk_id": 1, "filepath": "chunk_1.txt", "is_overlap": False}]
+        )
+        ranges = [split_range_filepath(s["filepath"])[1] for s in specs]
+        _check_ranges([r for r in ranges if r is not None], _CONTENT)
+        assert len(ranges) > 1
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
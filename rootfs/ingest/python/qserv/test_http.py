@@ -31,6 +31,8 @@
 import argparse
 import logging
 import os
+import pathlib
+import threading
 
 import pytest
 
@@ -41,6 +43,7 @@ import requests
 from requests import HTTPError
 
 from . import http, util, version
+from .dataserver import DataServer
 
 # ---------------------------------
 # Local non-exported definitions --
@@ -55,6 +58,26 @@ def test_file_exists() -> None:
     assert not http.file_exists("https://www.k8s-school.fr/team/false.html")
 
 
+def test_file_size(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "chunk_1.txt").write_bytes(b"1\ta\n")
+    session = http.ThreadLocalSession().current()
+    assert http.file_size(session, str(tmp_path / "chunk_1.txt")) == 4
+    with pytest.raises(OSError):
+        http.file_size(session, f"file://{tmp_path}/chunk_2.txt")
+
+    httpd = DataServer(str(tmp_path), "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{httpd.server_port}"
+        assert http.file_size(session, f"{url}/chunk_1.txt") == 4
+        with pytest.raises(HTTPError, match="HTTP error 404"):
+            http.file_size(session, f"{url}/chunk_2.txt")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
 def test_json_get() -> None:
     data = http.json_load(util.DATADIR, "servers.json")
     assert data["http_servers"][0] == "https://server1"
@@ -0,0 +1,146 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for httpcache.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import hashlib
+import http.server
+import logging
+import pathlib
+import threading
+from collections.abc import Generator
+from typing import Any, Dict, List, Optional
+
+import pytest
+import requests
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from .httpcache import HttpCache
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+
+class _ETagHandler(http.server.BaseHTTPRequestHandler):
+    """Serve in-memory files, with ETag validation."""
+
+    files: Dict[str, bytes] = {}
+    requests: List[int] = []
+    # Status returned instead of the file, if set
+    status: Optional[int] = None
+
+    def do_GET(self) -> None:
+        if self.status is not None:
+            self.requests.append(self.status)
+            self.send_response(self.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        content = self.files[self.path]
+        etag = '"' + hashlib.md5(content).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.requests.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.requests.append(200)
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Generator[str, None, None]:
+    _ETagHandler.files = {"/metadata.json": b'{"version": 12}'}
+    _ETagHandler.requests = []
+    _ETagHandler.status = None
+    httpd = http.server.HTTPServer(("127.0.0.1", 0), _ETagHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_get(server: str, tmp_path: pathlib.Path) -> None:
+    url = f"{server}/metadata.json"
+    cache = HttpCache(str(tmp_path), max_age_sec=3600)
+    assert cache.get(url) == b'{"version": 12}'
+    # Fresh entry, served without request
+    assert cache.get(url) == b'{"version": 12}'
+    assert _ETagHandler.requests == [200]
+
+    # Revalidated entry, shared with another process
+    cache = HttpCache(str(tmp_path), max_age_sec=0)
+    assert cache.get(url) == b'{"version": 12}'
+    assert _ETagHandler.requests == [200, 304]
+
+    _ETagHandler.files["/metadata.json"] = b'{"version": 13}'
+    assert cache.get(url) == b'{"version": 13}'
+    assert _ETagHandler.requests == [200, 304, 200]
+    assert len(list((tmp_path / "objects").iterdir())) == 2
+
+
+def test_get_server_down(server: str, tmp_path: pathlib.Path) -> None:
+    cache = HttpCache(str(tmp_path), max_age_sec=0)
+    assert cache.get(f"{server}/metadata.json") == b'{"version": 12}'
+    down_url = "http://127.0.0.1:1/metadata.json"
+    for entry in (tmp_path / "index").iterdir():
+        entry.rename(tmp_path / "index" / (hashlib.sha256(down_url.encode()).hexdigest() + ".json"))
+    assert cache.get(down_url) == b'{"version": 12}'
+
+
+def test_get_server_error(server: str, tmp_path: pathlib.Path) -> None:
+    url = f"{server}/metadata.json"
+    cache = HttpCache(str(tmp_path), max_age_sec=0)
+    _ETagHandler.status = 503
+    with pytest.raises(requests.HTTPError):
+        cache.get(url)
+    # Not cached, a 304 response has no content
+    _ETagHandler.status = 304
+    with pytest.raises(requests.HTTPError):
+        cache.get(url)
+
+    _ETagHandler.status = None
+    assert cache.get(url) == b'{"version": 12}'
+    # Server errors fall back to cached content, but not client errors
+    _ETagHandler.status = 503
+    assert cache.get(url) == b'{"version": 12}'
+    _ETagHandler.status = 404
+    with pytest.raises(requests.HTTPError):
+        cache.get(url)
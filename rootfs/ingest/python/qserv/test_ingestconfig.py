@@ -34,10 +34,12 @@ import logging
 # ----------------------------
 import os
 
+import pytest
 import yaml
 
 from . import util
-from .ingestconfig import IngestConfig
+from .ingestconfig import IngestConfig, LoadBalancerConfig, QueuePoolConfig
+from .loadbalancerurl import HealthAwareLoadBalancerAlgorithm, LoadBalancerAlgorithm
 
 # ---------------------------------
 # Local non-exported definitions --
@@ -55,3 +57,70 @@ def test_ingestconfig_metadata_url() -> None:
     config = IngestConfig(yaml_data)
 
     assert config.metadata_url == "https://raw.githubusercontent.com/rubin-in2p3/qserv-ingest-schema/main/"
+
+
+def test_ingestconfig_queue_pool() -> None:
+    """Check support for queue connection pool parameters in configuration"""
+    config_file = os.path.join(util.DATADIR, util.DP02, "ingest.yaml")
+    with open(config_file, "r") as values:
+        yaml_data = yaml.safe_load(values)
+
+    config = IngestConfig(yaml_data)
+    assert config.queue_pool == QueuePoolConfig()
+
+    yaml_data["ingest"]["queue"] = {"pool": {"size": 2, "pre_ping": False}}
+    config = IngestConfig(yaml_data)
+    assert config.queue_pool.size == 2
+    assert config.queue_pool.pre_ping is False
+    assert config.queue_pool.recycle == 3600
+
+
+def test_ingestconfig_loadbalancer() -> None:
+    """Check support for load balancing parameters in configuration"""
+    config_file = os.path.join(util.DATADIR, util.DP02, "ingest.yaml")
+    with open(config_file, "r") as values:
+        yaml_data = yaml.safe_load(values)
+
+    config = IngestConfig(yaml_data)
+    assert config.loadbalancer == LoadBalancerConfig()
+    assert type(config.loadbalancer.new_algorithm(config.servers)) is LoadBalancerAlgorithm
+
+    yaml_data["ingest"]["input"]["loadbalancer"] = {"strategy": "health-aware", "cooldown": 10}
+    config = IngestConfig(yaml_data)
+    algorithm = config.loadbalancer.new_algorithm(config.servers)
+    assert isinstance(algorithm, HealthAwareLoadBalancerAlgorithm)
+    assert algorithm.cooldown_sec == 10
+    assert algorithm.max_failures == 3
+    assert algorithm.locality == {}
+
+    locality = {"qserv-worker-[0-4]*": ["https://ccnetlsst02.in2p3.fr:65101"]}
+    yaml_data["ingest"]["input"]["loadbalancer"] = {"locality": locality}
+    config = IngestConfig(yaml_data)
+    algorithm = config.loadbalancer.new_algorithm(config.servers)
+    assert algorithm.get("qserv-worker-1.qserv-worker") == "https://ccnetlsst02.in2p3.fr:65101"
+    assert algorithm.locality == locality
+
+
+def test_ingestconfig_split_size() -> None:
+    """Check support for split size parameter in configuration"""
+    config_file = os.path.join(util.DATADIR, util.DP02, "ingest.yaml")
+    with open(config_file, "r") as values:
+        yaml_data = yaml.safe_load(values)
+
+    config = IngestConfig(yaml_data)
+    assert config.split_size is None
+
+    yaml_data["ingest"]["input"]["split_size"] = 1073741824
+    config = IngestConfig(yaml_data)
+    assert config.split_size == 1073741824
+
+    yaml_data["ingest"]["input"]["split_size"] = 0
+    with pytest.raises(SystemExit):
+        IngestConfig(yaml_data)
+
+    # Byte ranges are not supported for local input data
+    yaml_data["ingest"]["input"]["split_size"] = 1073741824
+    yaml_data["ingest"]["input"]["servers"] = []
+    yaml_data["ingest"]["input"]["path"] = "/data/dp02"
+    with pytest.raises(SystemExit):
+        IngestConfig(yaml_data)
@@ -34,6 +34,8 @@ import logging
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
+import pytest
+
 from . import http, jsonparser, util
 
 # ---------------------------------
@@ -60,6 +62,8 @@ def test_contribution_monitor() -> None:
         + "LINES TERMINATED BY '\\n'', error: Data truncated for column 'id' at row 1, errno: 1265"
     )
     assert contrib_monitor.system_error == 11
+    assert contrib_monitor.num_bytes == 303244
+    assert contrib_monitor.read_sec == pytest.approx(0.008)
     assert contrib_monitor.http_error == 0
     assert contrib_monitor.retry_allowed is False
 
@@ -30,7 +30,9 @@
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
-from .loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
+import pytest
+
+from .loadbalancerurl import HealthAwareLoadBalancerAlgorithm, LoadBalancedURL, LoadBalancerAlgorithm
 import logging
 
 
@@ -60,3 +62,62 @@ def test_new_loadbalancer_url() -> None:
     lb_url = LoadBalancedURL(base_path, lbAlgo)
     new_url = LoadBalancedURL.new(lb_url, filepath)
     assert new_url.get() == f"https://server1{filepath}"
+
+
+def test_health_aware_loadbalancer() -> None:
+    servers = ["https://server1", "https://server2", "https://server3"]
+    lbAlgo = HealthAwareLoadBalancerAlgorithm(servers, max_failures=2, cooldown_sec=3600)
+    lb_url = LoadBalancedURL("/data/", lbAlgo)
+
+    # Round-robin without throughput
+    urls = [LoadBalancedURL.new(lb_url, "file.txt").get() for _ in range(3)]
+    assert urls == [f"{s}/data/file.txt" for s in servers]
+
+    # Selection is weighted by throughput
+    lbAlgo.record("https://server1", True, 1000, 1.0)
+    lbAlgo.record("https://server2", True, 1, 1.0)
+    lbAlgo.record("https://server3", True, 1, 1.0)
+    selected = [lbAlgo.get() for _ in range(1000)]
+    assert selected.count("https://server1") > 900
+
+    # Failing server is not used during cooldown
+    failing_url = LoadBalancedURL.new(lb_url, "file.txt")
+    while failing_url.get() != "https://server1/data/file.txt":
+        pass
+    failing_url.record(False)
+    assert "https://server1" in [lbAlgo.get() for _ in range(1000)]
+    failing_url.record(False)
+    selected = [lbAlgo.get() for _ in range(1000)]
+    assert "https://server1" not in selected
+    assert set(selected) == {"https://server2", "https://server3"}
+
+    # All servers down, fall back to all servers
+    lbAlgo.record("https://server2", False)
+    lbAlgo.record("https://server2", False)
+    lbAlgo.record("https://server3", False)
+    lbAlgo.record("https://server3", False)
+    assert lbAlgo.get() in servers
+
+
+def test_loadbalancer_locality() -> None:
+    servers = ["https://server1", "https://server2", "https://server3"]
+    locality = {"worker-a*": ["https://server1"], "worker-*": ["https://server2", "https://server3"]}
+    lbAlgo = LoadBalancerAlgorithm(servers, locality)
+    assert lbAlgo.preferred("worker-a0") == ("worker-a*", ["https://server1"])
+    assert [lbAlgo.get("worker-b0") for _ in range(3)] == [
+        "https://server2",
+        "https://server3",
+        "https://server2",
+    ]
+    assert lbAlgo.get("worker-a0") == "https://server1"
+    assert [lbAlgo.get("czar") for _ in range(2)] == ["https://server1", "https://server2"]
+    assert lbAlgo.get() == "https://server3"
+
+    with pytest.raises(ValueError):
+        LoadBalancerAlgorithm(servers, {"worker-*": ["https://unknown"]})
+
+    # Other servers are used when preferred servers are down
+    lbAlgo = HealthAwareLoadBalancerAlgorithm(servers, max_failures=1, cooldown_sec=3600, locality=locality)
+    assert {lbAlgo.get("worker-a0") for _ in range(10)} == {"https://server1"}
+    lbAlgo.record("https://server1", False)
+    assert {lbAlgo.get("worker-a0") for _ in range(10)} == {"https://server2", "https://server3"}
@@ -29,13 +29,24 @@
 #  Imports of standard modules --
 # -------------------------------
 
+import json
 import logging
 import os
+import pathlib
+import shutil
+import tracemalloc
+from array import array
+from typing import Any, Dict, Optional
+
+import pytest
 
 # ----------------------------
 # Imports for other modules --
 # ----------------------------
 from . import metadata, util
+from .test_chunkindex import write_chunk_index
+from .exception import IngestError
+from .httpcache import HttpCache
 
 # ---------------------------------
 # Local non-exported definitions --
@@ -44,6 +55,44 @@ from . import metadata, util
 _LOG = logging.getLogger(__name__)
 
 
+def test_lazy_loading(monkeypatch: pytest.MonkeyPatch) -> None:
+    loaded_files = []
+    json_load = metadata.json_load
+
+    def counting_json_load(
+        url: str, filename: str, cache: Optional[HttpCache] = None, object_hook: Any = None
+    ) -> Dict:
+        loaded_files.append(filename)
+        return json_load(url, filename, cache, object_hook)
+
+    monkeypatch.setattr(metadata, "json_load", counting_json_load)
+    data_url = os.path.join(util.DATADIR, "dp01_dc2_catalogs")
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    assert loaded_files == []
+
+    assert contribution_metadata.database == "dp01_dc2_catalogs"
+    assert loaded_files == ["metadata.json", contribution_metadata.metadata["database"]]
+
+    table_names = contribution_metadata.table_names
+    assert len(loaded_files) == 2 + len(table_names)
+    contribution_metadata.table_names
+    assert len(loaded_files) == 2 + len(table_names)
+
+    json_indexes = contribution_metadata.json_indexes
+    assert len(loaded_files) == 2 + len(table_names) + len(json_indexes)
+
+
+def test_json_indexes_order() -> None:
+    data_url = os.path.join(util.DATADIR, "dp01_dc2_catalogs")
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    json_indexes = contribution_metadata.json_indexes
+    expected = [idx for tbl in contribution_metadata.tableSpecs for idx in tbl.json_indexes]
+    assert json_indexes == expected
+    assert len(json_indexes) == 15
+    # Director table indexes first
+    assert json_indexes[0]["table"] == contribution_metadata.tableSpecs[0].name
+
+
 def test_get_ordered_tables_json() -> None:
     data_url = os.path.join(util.DATADIR, "dp01_dc2_catalogs")
     contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
@@ -92,7 +141,7 @@ def test_override_auto_build_secondary_index() -> None:
     auto_build_secondary_index = 0
     contribution_metadata = metadata.ContributionMetadata(data_url, data_url, [], auto_build_secondary_index)
 
-    assert contribution_metadata._json_db["auto_build_secondary_index"] == 0
+    assert contribution_metadata.json_db["auto_build_secondary_index"] == 0
 
 
 def test_get_contribution_file_specs_case01() -> None:
@@ -215,3 +264,178 @@ def test_get_contribution_file_specs_dp02() -> None:
     assert contrib_director_overlap_count == 2508
     assert contrib_source_count == 1661647
     assert contrib_count == 1692713
+
+
+def test_compact_chunk_lists() -> None:
+    data_url = os.path.join(util.DATADIR, "case01")
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    for table_contrib_spec in contribution_metadata.table_contribs_spec:
+        if table_contrib_spec.chunks:
+            assert isinstance(table_contrib_spec.chunks, array)
+            contribs = list(table_contrib_spec.get_contrib())
+            assert contribs[0]["chunk_id"] == table_contrib_spec.chunks[0]
+
+
+def _write_synthetic_metadata(path: pathlib.Path, chunks_count: int, directories_count: int) -> None:
+    """Write metadata for a catalog with two partitioned tables, having
+    chunks_count chunks each."""
+    case01 = os.path.join(util.DATADIR, "case01")
+    for f in ["database.json", "Object.json", "Source.json"]:
+        shutil.copy(os.path.join(case01, f), path)
+    chunks_per_dir = chunks_count // directories_count
+    tables = []
+    for table in ["Object", "Source"]:
+        data = []
+        for i in range(directories_count):
+            chunks = list(range(i * chunks_per_dir, (i + 1) * chunks_per_dir))
+            data.append({"directory": f"{table}/{i}", "chunks": chunks})
+        tables.append({"schema": f"{table}.json", "indexes": [], "data": data})
+    with open(path / "metadata.json", "w") as metadata_file:
+        json.dump({"version": 12, "database": "database.json", "tables": tables}, metadata_file)
+
+
+@pytest.mark.scale
+def test_benchmark_chunk_lists_memory(tmp_path: pathlib.Path) -> None:
+    """Report memory used to store chunk lists of a 200k-chunk catalog."""
+    chunks_count = 200000
+    _write_synthetic_metadata(tmp_path, chunks_count, 10)
+    data_url = str(tmp_path)
+
+    tracemalloc.start()
+    with open(tmp_path / "metadata.json") as f:
+        plain_metadata = json.load(f)
+    plain_size, plain_peak = tracemalloc.get_traced_memory()
+    del plain_metadata
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+    contribs_count = sum(len(spec.chunks) for spec in contribution_metadata.table_contribs_spec)
+    compact_size, compact_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    _LOG.info("Chunk ids: %s", contribs_count)
+    _LOG.info("Python lists: %.1f MB, peak %.1f MB", plain_size / 1e6, plain_peak / 1e6)
+    _LOG.info("Compact arrays: %.1f MB, peak %.1f MB", compact_size / 1e6, compact_peak / 1e6)
+    assert contribs_count == 2 * chunks_count
+    assert compact_size < plain_size / 3
+
+
+def test_chunk_ranges() -> None:
+    chunks = metadata.ChunkRanges(["57866-57870", 57900, "57902-57903"])
+    assert len(chunks) == 8
+    assert list(chunks) == [57866, 57867, 57868, 57869, 57870, 57900, 57902, 57903]
+    assert chunks[0] == 57866
+    assert chunks[5] == 57900
+    assert chunks[-1] == 57903
+    assert chunks[4:6] == [57870, 57900]
+    assert not metadata.ChunkRanges([])
+    with pytest.raises(IndexError):
+        chunks[8]
+    for invalid in ["5-3", "1-2-3", "a"]:
+        with pytest.raises(IngestError):
+            metadata.ChunkRanges([invalid])
+
+
+def test_chunk_ranges_metadata(tmp_path: pathlib.Path) -> None:
+    case01 = os.path.join(util.DATADIR, "case01")
+    for f in ["database.json", "Object.json"]:
+        shutil.copy(os.path.join(case01, f), tmp_path)
+    data = [
+        {
+            "directory": "Object",
+            "chunks": ["6630-6631", 6800],
+            "chunk_sizes": [10, 20, 30],
+            "overlaps": ["6630-6632"],
+            "overlap_sizes": [1, 2],
+        }
+    ]
+    meta = {"version": 13, "database": "database.json", "tables": [{"schema": "Object.json", "data": data}]}
+    with open(tmp_path / "metadata.json", "w") as metadata_file:
+        json.dump(meta, metadata_file)
+
+    contribution_metadata = metadata.ContributionMetadata(str(tmp_path), str(tmp_path))
+    contribs = [c for spec in contribution_metadata.table_contribs_spec for c in spec.get_contrib()]
+    # Overlap sizes do not match overlap ids and are ignored
+    assert [(c["chunk_id"], c["is_overlap"], c["size"]) for c in contribs] == [
+        (6630, False, 10),
+        (6631, False, 20),
+        (6800, False, 30),
+        (6630, True, None),
+        (6631, True, None),
+        (6632, True, None),
+    ]
+
+    meta["version"] = 12
+    with open(tmp_path / "metadata.json", "w") as metadata_file:
+        json.dump(meta, metadata_file)
+    with pytest.raises(IngestError):
+        metadata.ContributionMetadata(str(tmp_path), str(tmp_path)).metadata
+
+
+def test_chunk_index_metadata(tmp_path: pathlib.Path) -> None:
+    case01 = os.path.join(util.DATADIR, "case01")
+    for f in ["database.json", "Object.json", "Source.json"]:
+        shutil.copy(os.path.join(case01, f), tmp_path)
+    for directory in ["Object", "Source"]:
+        os.mkdir(tmp_path / directory)
+        write_chunk_index(
+            tmp_path / directory / "chunk_index.bin",
+            [(6630, 1, 2, 0), (6631, 2, 1, 0), (6631, 3, 0, 5), (6800, 1, 0, 2)],
+        )
+    data = [{"directory": "Object", "chunk_index": "chunk_index.bin"}]
+    data_source = [{"directory": "Source", "chunk_index": "chunk_index.bin"}]
+    meta = {
+        "version": 13,
+        "database": "database.json",
+        "tables": [{"schema": "Source.json", "data": data_source}, {"schema": "Object.json", "data": data}],
+    }
+    with open(tmp_path / "metadata.json", "w") as metadata_file:
+        json.dump(meta, metadata_file)
+
+    contribution_metadata = metadata.ContributionMetadata(str(tmp_path), str(tmp_path))
+    specs = list(contribution_metadata.table_contribs_spec)
+    contribs = [(c["table"], c["chunk_id"], c["is_overlap"]) for spec in specs for c in spec.get_contrib()]
+    assert contribs == [
+        ("Object", 6630, False),
+        ("Object", 6631, False),
+        ("Object", 6631, True),
+        ("Object", 6800, True),
+        ("Source", 6630, False),
+        ("Source", 6631, False),
+    ]
+    chunk_index = specs[0].chunk_index
+    assert chunk_index is not None
+    assert chunk_index.rows(6630) == 2
+    assert chunk_index.overlap_rows(6631) == 5
+
+
+def test_compressed_metadata(tmp_path: pathlib.Path) -> None:
+    assert metadata.split_compression_ext("step1/chunk_1.txt.gz") == ("step1/chunk_1.txt", "gz")
+    assert metadata.split_compression_ext("Filter.tsv.zst") == ("Filter.tsv", "zst")
+    assert metadata.split_compression_ext("Filter.tsv") == ("Filter.tsv", None)
+
+    case01 = os.path.join(util.DATADIR, "case01")
+    for f in ["database.json", "Object.json"]:
+        shutil.copy(os.path.join(case01, f), tmp_path)
+    data = [{"directory": "Object", "chunks": [6630], "overlaps": [6631], "compression": "gz"}]
+    meta = {"version": 12, "database": "database.json", "tables": [{"schema": "Object.json", "data": data}]}
+    with open(tmp_path / "metadata.json", "w") as metadata_file:
+        json.dump(meta, metadata_file)
+
+    contribution_metadata = metadata.ContributionMetadata(str(tmp_path), "/", ["http://server1"])
+    contribs = [c for spec in contribution_metadata.table_contribs_spec for c in spec.get_contrib()]
+    assert [c["filepath"] for c in contribs] == [
+        "Object/chunk_6630.txt.gz",
+        "Object/chunk_6631_overlap.txt.gz",
+    ]
+
+    # Local input files are not decompressed
+    with pytest.raises(IngestError, match="requires http"):
+        list(metadata.ContributionMetadata(str(tmp_path), str(tmp_path)).table_contribs_spec)
+
+    data[0]["compression"] = "bz2"
+    with open(tmp_path / "metadata.json", "w") as metadata_file:
+        json.dump(meta, metadata_file)
+    with pytest.raises(IngestError, match="Unsupported compression"):
+        list(metadata.ContributionMetadata(str(tmp_path), "/", ["http://server1"]).table_contribs_spec)
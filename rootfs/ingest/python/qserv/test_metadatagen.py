@@ -0,0 +1,222 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for metadatagen.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import functools
+import http.server
+import json
+import logging
+import os
+import pathlib
+import shutil
+import threading
+from collections.abc import Generator
+from typing import Any, Dict
+
+import pytest
+import requests
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from . import metadata, util
+from .exception import IngestError
+from .metadatagen import FileEntry, InputScanner, _list_http, generate_metadata
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+_TEMPLATE: Dict[str, Any] = {
+    "version": 12,
+    "database": "database.json",
+    "tables": [
+        {"schema": "Object.json", "indexes": []},
+        {"schema": "Source.json", "indexes": []},
+        {"schema": "Filter.json", "indexes": []},
+    ],
+}
+
+
+_NGINX_INDEX = b"""<html>
+<head><title>Index of /step1_1/</title></head>
+<body>
+<h1>Index of /step1_1/</h1><hr><pre><a href="../">../</a>
+<a href="position/">position/</a>    04-Feb-2025 10:00     -
+<a href="chunk_57866.txt">chunk_57866.txt</a>    04-Feb-2025 10:00     123
+<a href="chunk_57866_overlap.txt">chunk_57866_overlap.txt</a>    04-Feb-2025 10:00     45
+</pre><hr></body>
+</html>
+"""
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _NginxIndexHandler(http.server.BaseHTTPRequestHandler):
+    """Serve a directory index with nginx autoindex HTML format."""
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(_NGINX_INDEX)))
+        self.end_headers()
+        self.wfile.write(_NGINX_INDEX)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def input_tree(tmp_path: pathlib.Path) -> pathlib.Path:
+    case01 = os.path.join(util.DATADIR, "case01")
+    for f in ["database.json", "Object.json", "Source.json", "Filter.json"]:
+        shutil.copy(os.path.join(case01, f), tmp_path)
+    files = {
+        "partition/case01/Object/chunk_6630.txt": "1,2\n",
+        "partition/case01/Object/chunk_6631.txt": "1,2\n3,4\n",
+        "partition/case01/Object/chunk_6631_overlap.txt": "5,6\n",
+        "partition/case01/Source/chunk_6630.txt": "1\n",
+        "partition/case01/Source/chunk_index.bin": "",
+        "Filter.tsv": "1\tu\n",
+    }
+    for path, content in files.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(content)
+    return tmp_path
+
+
+@pytest.fixture
+def server(input_tree: pathlib.Path) -> Generator[str, None, None]:
+    handler = functools.partial(_QuietHandler, directory=str(input_tree))
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def check_generated(metadata_url: str, data_url: str) -> None:
+    contents = InputScanner(data_url, workers=4).scan()
+    assert [c.directory for c in contents] == ["", "partition", "partition/case01"] + [
+        "partition/case01/Object",
+        "partition/case01/Source",
+    ]
+    generated = generate_metadata(metadata_url, _TEMPLATE, contents)
+    tables = generated["tables"]
+    assert tables[0]["data"] == [
+        {
+            "directory": "partition/case01/Object",
+            "chunks": [6630, 6631],
+            "chunk_sizes": [4, 8],
+            "overlaps": [6631],
+            "overlap_sizes": [4],
+        }
+    ]
+    assert tables[1]["data"] == [
+        {"directory": "partition/case01/Source", "chunks": [6630], "chunk_sizes": [2]}
+    ]
+    assert tables[2]["data"] == [{"directory": "", "files": ["Filter.tsv"], "file_sizes": [4]}]
+
+
+def test_generate_local(input_tree: pathlib.Path) -> None:
+    check_generated(str(input_tree), str(input_tree))
+
+    # Generated metadata can be used for ingest
+    generated = generate_metadata(str(input_tree), _TEMPLATE, InputScanner(str(input_tree)).scan())
+    with open(input_tree / "metadata.json", "w") as f:
+        json.dump(generated, f)
+    contribution_metadata = metadata.ContributionMetadata(str(input_tree), str(input_tree))
+    contribs = [
+        (c["table"], c["chunk_id"], c["is_overlap"], c["size"])
+        for spec in contribution_metadata.table_contribs_spec
+        for c in spec.get_contrib()
+    ]
+    # File sizes are read from metadata
+    assert contribs == [
+        ("Object", 6630, False, 4),
+        ("Object", 6631, False, 8),
+        ("Object", 6631, True, 4),
+        ("Source", 6630, False, 2),
+        ("Filter", None, None, 4),
+    ]
+
+
+def test_generate_http(server: str, input_tree: pathlib.Path) -> None:
+    check_generated(str(input_tree), server)
+
+
+def test_generate_compressed(input_tree: pathlib.Path) -> None:
+    object_dir = input_tree / "partition/case01/Object"
+    for path in [
+        object_dir / "chunk_6630.txt",
+        object_dir / "chunk_6631.txt",
+        object_dir / "chunk_6631_overlap.txt",
+        input_tree / "Filter.tsv",
+    ]:
+        path.rename(f"{path}.gz")
+    contents = InputScanner(str(input_tree)).scan()
+    generated = generate_metadata(str(input_tree), _TEMPLATE, contents)
+    tables = generated["tables"]
+    assert tables[0]["data"][0]["compression"] == "gz"
+    assert tables[0]["data"][0]["chunks"] == [6630, 6631]
+    assert "compression" not in tables[1]["data"][0]
+    assert tables[2]["data"][0]["files"] == ["Filter.tsv.gz"]
+
+    (object_dir / "chunk_6632.txt").write_text("1,2\n")
+    with pytest.raises(IngestError):
+        InputScanner(str(input_tree)).scan()
+
+
+def test_generate_parquet(input_tree: pathlib.Path) -> None:
+    (input_tree / "Filter.tsv").rename(input_tree / "Filter.parquet")
+    contents = InputScanner(str(input_tree)).scan()
+    generated = generate_metadata(str(input_tree), _TEMPLATE, contents)
+    assert generated["tables"][2]["data"][0]["files"] == ["Filter.csv"]
+
+
+def test_list_http_nginx() -> None:
+    httpd = http.server.HTTPServer(("127.0.0.1", 0), _NginxIndexHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        entries = _list_http(requests.Session(), f"http://127.0.0.1:{httpd.server_port}/step1_1/")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert entries == [
+        FileEntry("position", True, None),
+        FileEntry("chunk_57866.txt", False, 123),
+        FileEntry("chunk_57866_overlap.txt", False, 45),
+    ]
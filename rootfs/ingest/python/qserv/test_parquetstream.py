@@ -0,0 +1,96 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for parquetstream.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import datetime
+import logging
+import os
+import pathlib
+from typing import Any, List
+
+import pytest
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from . import metadata, parquetstream, util
+from .exception import MissingDependencyError
+from .parquetstream import ParquetConverter, TextFormat
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+
+def test_text_format() -> None:
+    fileformats = metadata.default_fileformats()
+    assert TextFormat.from_fileformat(fileformats[metadata.CSV]) == TextFormat(fields_terminated_by=",")
+    assert TextFormat.from_fileformat(fileformats[metadata.TXT]) == TextFormat()
+
+    data_url = os.path.join(util.DATADIR, "case01")
+    fileformats = metadata.ContributionMetadata(data_url, data_url).fileformats
+    assert TextFormat.from_fileformat(fileformats[metadata.TXT]) == TextFormat("\t", "", "\\", "\n")
+
+
+def test_format_rows() -> None:
+    fmt = TextFormat(fields_terminated_by=",")
+    columns: List[List[Any]] = [
+        [1, None, 3],
+        [1.5, float("nan"), -0.25],
+        ["a,b", "c\\d", "e\nf\0"],
+        [True, False, None],
+        [datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.date(2024, 1, 2), None],
+        [[1, 2], {"x": "y"}, b"bytes"],
+    ]
+    assert fmt.format_rows(columns).decode() == (
+        '1,1.5,a\\,b,1,2024-01-02 03:04:05,[1\\, 2]\n'
+        '\\N,\\N,c\\\\d,0,2024-01-02,{"x": "y"}\n'
+        "3,-0.25,e\\\nf\\0,\\N,\\N,bytes\n"
+    )
+
+    fmt = TextFormat(fields_terminated_by=",", fields_enclosed_by='"')
+    assert fmt.format_rows([["a\"b"], [2]]) == b'"a\\"b",2\n'
+
+
+def test_parquet_converter_missing(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(parquetstream, "pq", None)
+    with pytest.raises(MissingDependencyError, match="pyarrow"):
+        ParquetConverter("Filter.parquet")
+
+
+def test_parquet_converter(tmp_path: pathlib.Path) -> None:
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pa.table({"id": [1, 2, 3], "name": ["a", None, "c\td"]})
+    pq.write_table(table, tmp_path / "Filter.parquet", row_group_size=2)
+
+    converter = ParquetConverter(str(tmp_path / "Filter.parquet"), batch_size=1)
+    assert list(converter) == [b"1\ta\n", b"2\t\\N\n", b"3\tc\\\td\n"]
@@ -0,0 +1,142 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for preflight.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import functools
+import gzip
+import http.server
+import logging
+import pathlib
+import threading
+from typing import Any, List
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from .dataserver import DataServer
+from .loadbalancerurl import LoadBalancedURL, LoadBalancerAlgorithm
+from .preflight import PreflightChecker
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+
+class _CountingHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve a directory and count HEAD requests."""
+
+    heads: List[str] = []
+
+    def do_HEAD(self) -> None:
+        self.heads.append(self.path)
+        super().do_HEAD()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def write_input(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "Object").mkdir()
+    (tmp_path / "Object" / "chunk_1.txt").write_text("1,2\n")
+    (tmp_path / "Object" / "chunk_2.txt").write_text("")
+
+
+def test_check_local(tmp_path: pathlib.Path) -> None:
+    write_input(tmp_path)
+    checker = PreflightChecker(LoadBalancedURL(str(tmp_path)), workers=2)
+    checks = checker.check_all(
+        [("Object", "Object/chunk_1.txt"), ("Object", "Object/chunk_2.txt"), ("Object", "Object/chunk_3.txt")]
+    )
+    assert [(c.filepath, c.size) for c in checks] == [
+        ("Object/chunk_1.txt", 4),
+        ("Object/chunk_2.txt", 0),
+        ("Object/chunk_3.txt", None),
+    ]
+    assert checks[0].error is None
+    assert checks[1].error == "Empty file"
+    assert checks[2].error is not None and checks[2].error.startswith("FileNotFoundError")
+
+
+def test_check_range(tmp_path: pathlib.Path) -> None:
+    write_input(tmp_path)
+    checker = PreflightChecker(LoadBalancedURL(str(tmp_path)), workers=2)
+    check = checker.check("Object", "Object/chunk_1.txt?range=2-3")
+    assert (check.filepath, check.size, check.error) == ("Object/chunk_1.txt?range=2-3", 2, None)
+    check = checker.check("Object", "Object/chunk_1.txt?range=2-4")
+    assert check.error is not None and check.error.startswith("Byte range exceeds file size")
+
+
+def test_check_http_loadbalancers(tmp_path: pathlib.Path) -> None:
+    write_input(tmp_path)
+    _CountingHandler.heads = []
+    servers = []
+    for _ in range(2):
+        handler = functools.partial(_CountingHandler, directory=str(tmp_path))
+        httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+    try:
+        loadbalancers = [f"http://127.0.0.1:{httpd.server_port}" for httpd in servers]
+        lb_url = LoadBalancedURL("/", LoadBalancerAlgorithm(loadbalancers))
+        checker = PreflightChecker(lb_url, workers=4)
+        contribfiles = [("Object", "Object/chunk_1.txt")] * 4 + [("Object", "Object/chunk_3.txt")]
+        checks = checker.check_all(contribfiles)
+    finally:
+        for httpd in servers:
+            httpd.shutdown()
+            httpd.server_close()
+    assert [c.size for c in checks[:4]] == [4, 4, 4, 4]
+    assert checks[4].error == "HTTP error 404"
+    # Requests are spread across load balancers
+    hosts = {c.url.split("/")[2] for c in checks}
+    assert len(hosts) == 2
+    assert len(_CountingHandler.heads) == 5
+
+
+def test_check_dataserver(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "chunk_1.txt.gz").write_bytes(gzip.compress(b"1,2\n"))
+    (tmp_path / "chunk_2.txt").write_bytes(b"1,2\n" * 100)
+    httpd = DataServer(str(tmp_path), "127.0.0.1", 0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        lb_url = LoadBalancedURL("/", LoadBalancerAlgorithm([f"http://127.0.0.1:{httpd.server_port}"]))
+        check = PreflightChecker(lb_url).check("Object", "chunk_1.txt.gz")
+        range_check = PreflightChecker(lb_url).check("Object", "chunk_2.txt?range=0-9")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    # Checked under the name requested by workers
+    assert check.url.endswith("/chunk_1.txt")
+    assert check.filepath == "chunk_1.txt.gz"
+    assert check.error is None
+    # The file of a byte range is checked, and the range length is recorded
+    assert range_check.url.endswith("/chunk_2.txt")
+    assert range_check.size == 10
@@ -0,0 +1,97 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for queuebackend.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import logging
+import os
+import pathlib
+
+import pytest
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from . import contribqueue, metadata, queuebackend, util
+from .exception import QueueError
+from .ingestconfig import QueuePoolConfig
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+
+def test_new_backend(tmp_path: pathlib.Path) -> None:
+    backend = queuebackend.new_backend(f"sqlite:///{tmp_path}/queue.db")
+    assert isinstance(backend, queuebackend.SQLiteQueueBackend)
+    with backend.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+    with pytest.raises(QueueError):
+        queuebackend.new_backend("postgresql://user@host/db")
+
+
+def test_pool_stats(tmp_path: pathlib.Path) -> None:
+    backend = queuebackend.new_backend(f"sqlite:///{tmp_path}/queue.db", QueuePoolConfig(pre_ping=False))
+    assert backend.pool_config.pre_ping is False
+    with backend.engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+        stats = backend.pool_stats.snapshot()
+        assert stats["checked_out"] == 1
+    stats = backend.pool_stats.snapshot()
+    assert stats["checked_out"] == 0
+    assert stats["max_checked_out"] == 1
+    assert stats["checkouts"] >= 1
+    assert stats["connects"] >= 1
+
+
+def test_sqlite_lock_contribfiles(tmp_path: pathlib.Path) -> None:
+    queue_url = f"sqlite:///{tmp_path}/queue.db"
+    data_url = os.path.join(util.DATADIR, "case01")
+    contribution_metadata = metadata.ContributionMetadata(data_url, data_url)
+
+    queue_manager = contribqueue.QueueManager(queue_url, contribution_metadata)
+    queue_manager.insert_contribfiles()
+    queue_manager.init_mutex()
+    queue_manager.set_transaction_size(2)
+
+    other_manager = contribqueue.QueueManager(queue_url, contribution_metadata)
+    other_manager.pod = "other-pod"
+    other_manager.set_transaction_size(2)
+
+    contribfiles = queue_manager.lock_contribfiles()
+    other_contribfiles = other_manager.lock_contribfiles()
+    assert len(contribfiles) == 19
+    assert len(other_contribfiles) == 18
+    assert set(contribfiles).isdisjoint(other_contribfiles)
+
+    queue_manager.unlock_contribfiles(True)
+    other_manager.unlock_contribfiles(True)
+    assert queue_manager.all_succeed()
@@ -0,0 +1,69 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for queuemetrics.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import json
+import logging
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from .queuemetrics import LatencyHistogram, QueueMetrics, StatementKind
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+
+def test_latency_histogram() -> None:
+    histogram = LatencyHistogram()
+    for latency in [0.0005, 0.001, 0.003, 0.7, 42.0]:
+        histogram.observe(latency)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"]["0.001"] == 2
+    assert snapshot["buckets"]["0.005"] == 1
+    assert snapshot["buckets"]["1.0"] == 1
+    assert snapshot["buckets"]["+Inf"] == 1
+    assert snapshot["count"] == 5
+    assert snapshot["max"] == 42.0
+
+
+def test_queue_metrics() -> None:
+    metrics = QueueMetrics()
+    metrics.observe_latency(StatementKind.LOCK, 0.02)
+    metrics.count_retry(StatementKind.UNLOCK, "deadlock")
+    metrics.count_giveup(StatementKind.UNLOCK)
+    snapshot = json.loads(json.dumps(metrics.snapshot()))
+    assert snapshot["latency"]["lock"]["count"] == 1
+    assert snapshot["latency"]["select"]["count"] == 0
+    assert snapshot["retries"] == {"lock": 0, "select": 0, "unlock": 1, "count": 0, "other": 0}
+    assert snapshot["giveups"]["unlock"] == 1
+    assert snapshot["retry_reasons"] == {"deadlock": 1}
@@ -0,0 +1,80 @@
+# This file is part of qserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Unit tests for retrypolicy.py.
+
+@author  Fabrice Jammes, IN2P3
+
+"""
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import logging
+import sqlite3
+
+from sqlalchemy.exc import OperationalError
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from .retrypolicy import ErrorClass, RetryPolicy, classify_error
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+
+def test_classify_error() -> None:
+    def mysql_error(code: int) -> OperationalError:
+        return OperationalError("", {}, Exception(code, "Injected error"))
+
+    assert classify_error(mysql_error(1213)) == ErrorClass.DEADLOCK
+    assert classify_error(mysql_error(1205)) == ErrorClass.LOCK_WAIT
+    assert classify_error(mysql_error(2013)) == ErrorClass.CONNECTION_LOST
+    assert classify_error(mysql_error(1064)) is None
+    locked = sqlite3.OperationalError("database is locked")
+    assert classify_error(OperationalError("", {}, locked)) == ErrorClass.LOCK_WAIT
+    assert classify_error(ValueError()) is None
+
+
+def test_next_sleep() -> None:
+    policy = RetryPolicy(cap_sec=2.0)
+    retry_state = policy.start()
+    for _ in range(policy.max_attempts[ErrorClass.LOCK_WAIT]):
+        sleep_sec = retry_state.next_sleep(ErrorClass.LOCK_WAIT)
+        assert sleep_sec is not None
+        assert policy.base_sec[ErrorClass.LOCK_WAIT] <= sleep_sec <= 2.0
+    assert retry_state.next_sleep(ErrorClass.LOCK_WAIT) is None
+    # Each error class has its own attempts limit
+    assert retry_state.next_sleep(ErrorClass.DEADLOCK) is not None
+
+    # Only the time budget bounds unbounded transactions
+    retry_state = policy.start(bound_attempts=False)
+    for _ in range(policy.max_attempts[ErrorClass.LOCK_WAIT] * 2):
+        assert retry_state.next_sleep(ErrorClass.LOCK_WAIT) is not None
+
+
+def test_next_sleep_budget() -> None:
+    retry_state = RetryPolicy(budget_sec=0).start()
+    assert retry_state.next_sleep(ErrorClass.CONNECTION_LOST) is None